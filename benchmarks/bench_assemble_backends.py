@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process PyAV backend of assemble_reel against the ffmpeg CLI
+path, for both render profiles, and report how closely the frames agree
+(frame count plus minimum per-frame luma PSNR; the two blend overlays in
+slightly different ways, so bitstreams differ).
+
+If PyAV's libavfilter lacks libass (the PyPI wheels do), both backends run
+without subtitle burn-in so the comparison stays like for like.
+
+Usage: python benchmarks/bench_assemble_backends.py [--seconds 20]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import av
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_assemble_overlays import FPS, make_fixtures
+from pipeline_modules.assemble_reel import assemble_reel
+from pipeline_modules.av_render import has_libass
+
+
+def compare(a: Path, b: Path):
+    """Return (frames in a, frames in b, min luma PSNR over paired frames)."""
+    worst, n_a, n_b = float("inf"), 0, 0
+    with av.open(str(a)) as ca, av.open(str(b)) as cb:
+        fa, fb = ca.decode(video=0), cb.decode(video=0)
+        for x, y in zip(fa, fb):
+            ya = x.to_ndarray(format="gray").astype(np.float32)
+            mse = float(((ya - y.to_ndarray(format="gray")) ** 2).mean())
+            worst = min(worst, 99.0 if mse == 0 else 10 * np.log10(255 ** 2 / mse))
+            n_a, n_b = n_a + 1, n_b + 1
+        n_a += sum(1 for _ in fa)
+        n_b += sum(1 for _ in fb)
+    return n_a, n_b, worst
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--lines", type=int, default=40)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bg, audio, ass, smap, images, _ = make_fixtures(tmp, args.seconds, args.lines)
+        subs = ass if has_libass() else None
+        if subs is None:
+            print("PyAV has no libass: comparing without subtitle burn-in")
+
+        for profile in ("final", "draft"):
+            walls = {}
+            for backend in ("ffmpeg", "pyav"):
+                out = tmp / f"{profile}_{backend}.mp4"
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    assemble_reel(bg, audio, subs, smap, None, images, out, fonts_dir=None,
+                                  profile=profile, backend=backend)
+                walls[backend] = time.perf_counter() - t0
+                print(f"{profile:<6} {backend:<7} {walls[backend]:8.2f} s  "
+                      f"{args.seconds * FPS / walls[backend]:7.1f} source fps")
+            n_cli, n_av, psnr = compare(tmp / f"{profile}_ffmpeg.mp4", tmp / f"{profile}_pyav.mp4")
+            print(f"{profile:<6} pyav/cli speed {walls['ffmpeg'] / walls['pyav']:.2f}x, "
+                  f"frames {n_cli}/{n_av}, min PSNR {psnr:.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
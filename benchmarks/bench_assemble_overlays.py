@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the assemble_reel filter graph: per-sentence overlay chain (legacy)
+versus one scaled overlay per speaker, looped PNGs versus cached pre-scaled
+overlay assets.
+
+Synthetic inputs are generated with ffmpeg's lavfi sources, so the only
+requirement is ffmpeg/ffprobe on PATH (built with libass and libx264).
+
+Usage: python benchmarks/bench_assemble_overlays.py [--seconds 20] [--lines 40]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules import assemble_reel as ar
+from pipeline_modules.generate_ass import ASS_HEADER, seconds_to_ass
+from pipeline_modules.overlay_cache import overlay_asset
+
+FPS = 30
+SPEAKERS = ("Peter", "Stewie")
+
+
+def ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *args], check=True)
+
+
+def make_fixtures(tmp: Path, seconds: float, lines: int):
+    bg = tmp / "bg.mp4"
+    ffmpeg("-f", "lavfi", "-i", f"testsrc2=s=1080x1920:r={FPS}:d={seconds * 2}",
+           "-c:v", "libx264", "-preset", "ultrafast", "-g", str(FPS * 2), str(bg))
+    audio = tmp / "audio.wav"
+    ffmpeg("-f", "lavfi", "-i", f"sine=f=220:d={seconds}", "-ar", "48000", str(audio))
+    images = tmp / "images"
+    images.mkdir()
+    for i, spk in enumerate(SPEAKERS):
+        # Like a cut-out character: translucent body inside a fully transparent margin
+        ffmpeg("-f", "lavfi", "-i", f"color=c={('red', 'blue')[i]}@0.7:s=1000x1400,format=rgba",
+               "-vf", "pad=1200:1600:100:100:color=black@0", "-frames:v", "1", str(images / f"{spk}.png"))
+
+    step = seconds / lines
+    sentence_map = [{"index": k + 1, "speaker": SPEAKERS[k % 2], "start": round(k * step, 3),
+                     "end": round((k + 1) * step, 3), "text": f"Line {k + 1}."} for k in range(lines)]
+    smap = tmp / "sentence_map.json"
+    smap.write_text(json.dumps(sentence_map))
+    ass = tmp / "dialogue.ass"
+    ass.write_text(ASS_HEADER + "".join(
+        f"Dialogue: 0,{seconds_to_ass(e['start'])},{seconds_to_ass(e['end'])},Default,,0,0,0,,{e['text']}\n"
+        for e in sentence_map))
+    return bg, audio, ass, smap, images, sentence_map
+
+
+def legacy_graph(sentence_map, speakers, subs_ass):
+    """The pre-refactor graph: a new scale + overlay for every sentence."""
+    fc_parts = [f"[0:v]subtitles={subs_ass}[base]"]
+    last = "base"
+    for idx, e in enumerate(sentence_map):
+        inp = 2 + speakers.index(e["speaker"])
+        x_pos = "15" if e["speaker"].lower() in ar.LEFT_SPKRS else "main_w-overlay_w-20"
+        fc_parts.append(
+            f"[{inp}:v]scale=iw*0.20:-1[s{idx}];"
+            f"[{last}][s{idx}]overlay=x={x_pos}:y=H-h-{ar.BOTTOM_MARGIN}:"
+            f"enable='between(t,{e['start']},{e['end']})'[v{idx}]")
+        last = f"v{idx}"
+    return ";".join(fc_parts), last
+
+
+def run(label, cmd, frames):
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wall = time.perf_counter() - t0
+    print(f"{label:<34} {wall:8.2f} s  {frames / wall:7.1f} fps")
+    return wall
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--lines", type=int, default=40)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bg, audio, ass, smap, images, sentence_map = make_fixtures(tmp, args.seconds, args.lines)
+        frames = int(args.seconds * FPS)
+        speakers = list(SPEAKERS)
+
+        bg_dur = ar._probe_duration(bg)
+        legacy_inputs = ["-i", str(bg), "-i", str(audio)]
+        for spk in speakers:
+            legacy_inputs += ["-loop", "1", "-t", str(bg_dur), "-i", str(images / f"{spk}.png")]
+        fc, last = legacy_graph(sentence_map, speakers, ass)
+        before = run(f"legacy ({args.lines} overlays)", ar.encode_cmd(legacy_inputs, fc, last, tmp / "a.mp4"), frames)
+
+        dur = ar._probe_duration(audio)
+        inputs = ["-i", str(bg), "-i", str(audio)]
+        overlay_inputs = {}
+        for spk in speakers:
+            overlay_inputs[spk] = 2 + len(overlay_inputs)
+            inputs += ["-loop", "1", "-t", f"{dur:.3f}", "-i", str(images / f"{spk}.png")]
+        fc, last = ar.build_filter_graph(sentence_map, overlay_inputs, ass)
+        after = run(f"per-speaker ({len(overlay_inputs)} overlays)", ar.encode_cmd(inputs, fc, last, tmp / "b.mp4"), frames)
+
+        print(f"speed-up: {before / after:.2f}x")
+
+        cached_inputs = ["-i", str(bg), "-i", str(audio)]
+        for spk in speakers:
+            cached_inputs += ["-i", str(overlay_asset(images / f"{spk}.png", ar.overlay_scale(), tmp / "cache"))]
+        fc, last = ar.build_filter_graph(sentence_map, overlay_inputs, ass, prescaled=True)
+        cached = run("per-speaker, cached assets", ar.encode_cmd(cached_inputs, fc, last, tmp / "c.mp4"), frames)
+        print(f"speed-up over looped PNGs: {after / cached:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
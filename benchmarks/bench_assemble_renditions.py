@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-rendition output: one assemble_reel graph feeding every
+encoder (split/asplit) versus a separate full decode/filter/encode run per
+rendition.
+
+Fixtures come from bench_assemble_overlays (lavfi sources), so only
+ffmpeg/ffprobe on PATH are required.
+
+Usage: python benchmarks/bench_assemble_renditions.py [--seconds 20]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_assemble_overlays import SPEAKERS, make_fixtures
+from pipeline_modules import assemble_reel as ar
+
+RENDITIONS = {"main.mp4": {}, "mobile.mp4": "mobile", "thumb.jpg": "thumbnail", "preview.mp4": "preview"}
+
+
+def run(cmd):
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--lines", type=int, default=40)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bg, audio, ass, smap, images, sentence_map = make_fixtures(tmp, args.seconds, args.lines)
+        dur = ar._probe_duration(audio)
+        inputs = ["-t", f"{dur:.3f}", "-i", str(bg), "-i", str(audio)]
+        overlay_inputs = {}
+        for spk in SPEAKERS:
+            overlay_inputs[spk] = 2 + len(overlay_inputs)
+            inputs += ["-loop", "1", "-t", f"{dur:.3f}", "-i", str(images / f"{spk}.png")]
+        fc, last = ar.build_filter_graph(sentence_map, overlay_inputs, ass)
+        outputs = {tmp / name: ar.resolve_rendition(spec) for name, spec in RENDITIONS.items()}
+
+        t0 = time.perf_counter()
+        for path, r in outputs.items():
+            run(ar.multi_encode_cmd(inputs, fc, last, {path: r}))
+        separate = time.perf_counter() - t0
+        print(f"{'separate runs (' + str(len(outputs)) + ')':<28} {separate:8.2f} s")
+
+        t0 = time.perf_counter()
+        run(ar.multi_encode_cmd(inputs, fc, last, outputs))
+        single = time.perf_counter() - t0
+        print(f"{'one graph, all renditions':<28} {single:8.2f} s")
+        print(f"speed-up: {separate / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the segmented parallel render of assemble_reel against the
+single-pass render, and check the two are frame-exact: same frame count and
+timestamps, and per-frame PSNR within encoder noise (the segments are encoded
+independently, so bitstreams differ but every frame must line up). The
+draft profile is timed against the same single-pass final render.
+
+Fixtures come from bench_assemble_overlays (lavfi sources), so only
+ffmpeg/ffprobe on PATH are required.
+
+Usage: python benchmarks/bench_assemble_segmented.py [--seconds 30] [--jobs 4]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_assemble_overlays import FPS, make_fixtures
+from pipeline_modules.assemble_reel import assemble_reel
+
+_PSNR_MIN = re.compile(r"min:([0-9.]+|inf)")
+
+
+def frame_times(video: Path):
+    out = subprocess.check_output(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "frame=pts_time",
+         "-of", "csv=p=0", str(video)], text=True)
+    return [round(float(t), 4) for t in out.split()]
+
+
+def min_psnr(a: Path, b: Path) -> str:
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(a), "-i", str(b),
+                           "-lavfi", "[0:v][1:v]psnr", "-f", "null", "-"],
+                          capture_output=True, text=True, check=True)
+    found = _PSNR_MIN.findall(proc.stderr)
+    return found[-1] if found else "?"
+
+
+def timed(label, fn, frames):
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    print(f"{label:<28} {wall:8.2f} s  {frames / wall:7.1f} fps")
+    return wall
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=30.0)
+    ap.add_argument("--lines", type=int, default=40)
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bg, audio, ass, smap, images, _ = make_fixtures(tmp, args.seconds, args.lines)
+        frames = int(args.seconds * FPS)
+        single, segmented = tmp / "single.mp4", tmp / "segmented.mp4"
+
+        def render(out, jobs, profile="final"):
+            with open(os.devnull, "w") as null:
+                stdout, sys.stdout = sys.stdout, null
+                try:
+                    assemble_reel(bg, audio, ass, smap, None, images, out, fonts_dir=None, jobs=jobs,
+                                  profile=profile)
+                finally:
+                    sys.stdout = stdout
+
+        before = timed("single pass", lambda: render(single, 1), frames)
+        after = timed(f"segmented (jobs={args.jobs})", lambda: render(segmented, args.jobs), frames)
+        print(f"speed-up: {before / after:.2f}x")
+
+        a, b = frame_times(single), frame_times(segmented)
+        print(f"frames: single={len(a)} segmented={len(b)} timestamps {'match' if a == b else 'DIFFER'}")
+        print(f"min per-frame PSNR: {min_psnr(single, segmented)} dB")
+
+        draft = timed("draft profile, single pass", lambda: render(tmp / "draft.mp4", 1, "draft"), frames)
+        print(f"draft speed-up over final: {before / draft:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
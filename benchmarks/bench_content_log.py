@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the content log: per-event cost as the log grows.
+
+  pandas-csv    the previous db_logger: pd.concat per event and the whole CSV
+                rewritten by save_log after every event (skipped without pandas)
+  jsonl         db_logger.log_event + save_log after every event (one fsynced
+                append each: the worst case)
+  jsonl-batch   db_logger.log_event with the default flush batching
+
+Each mode logs --events events on top of a log pre-filled to each --sizes
+entry and reports the mean milliseconds per event, plus module import time.
+
+Usage: python benchmarks/bench_content_log.py [--sizes 1000 10000 50000] [--events 200]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules import db_logger
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+ROW = dict(account="Tech", topic="Why the sky is blue", status="Script Generated", notes="Success",
+           input_tokens=812, output_tokens=655, total_tokens=1467,
+           estimated_cost_usd=0.00858, estimated_cost_aud=0.01287)
+
+
+def old_log_event(df, **row):
+    new = pd.DataFrame([{"timestamp": "2025-01-01T00:00:00", **row}])
+    return new if df.empty else pd.concat([df, new], ignore_index=True)
+
+
+def bench_pandas(tmp: Path, size: int, events: int) -> float:
+    path = tmp / f"pandas_{size}.csv"
+    pd.DataFrame([{"timestamp": "2025-01-01T00:00:00", **ROW}] * size).to_csv(path, index=False)
+    df = pd.read_csv(path)
+    t0 = time.perf_counter()
+    for _ in range(events):
+        df = old_log_event(df, **ROW)
+        df.to_csv(path, index=False)
+    return (time.perf_counter() - t0) / events * 1000
+
+
+def bench_jsonl(tmp: Path, size: int, events: int, save_each: bool) -> float:
+    path = tmp / f"jsonl_{size}_{save_each}.jsonl"
+    log = db_logger.init_log(path)
+    for _ in range(size):
+        log.pending.append({"timestamp": "2025-01-01T00:00:00", **ROW})
+    log.flush()
+    t0 = time.perf_counter()
+    for _ in range(events):
+        db_logger.log_event(log, **ROW)
+        if save_each:
+            db_logger.save_log(log)
+    db_logger.save_log(log)
+    return (time.perf_counter() - t0) / events * 1000
+
+
+def import_ms(module: str) -> float:
+    code = f"import time; t=time.perf_counter(); import {module}; print((time.perf_counter()-t)*1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+    return float(out.stdout) if out.returncode == 0 else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--events", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'log size':>10}{'pandas-csv ms':>16}{'jsonl ms':>12}{'jsonl-batch ms':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for size in args.sizes:
+            old = bench_pandas(tmp, size, args.events) if pd is not None else float("nan")
+            each = bench_jsonl(tmp, size, args.events, save_each=True)
+            batched = bench_jsonl(tmp, size, args.events, save_each=False)
+            print(f"{size:>10}{old:>16.3f}{each:>12.3f}{batched:>16.4f}")
+
+    print(f"\nimport ms: pandas {import_ms('pandas'):.0f}, "
+          f"pipeline_modules.db_logger {import_ms('pipeline_modules.db_logger'):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark ASS generation on long-form inputs.
+
+Builds a synthetic transcript (default 100k words), writes it both as
+word_timestamps.json and as binary timing artefacts, then times
+build_ass_from_whisperx on each, a multi-style render from one pass, and
+compares sentence-end matching against the original linear prefix scan.
+
+Usage: python benchmarks/bench_generate_ass.py [--words 100000] [--window 4]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules.generate_ass import build_ass_from_whisperx, match_sentence_ends, render_ass_variants
+from pipeline_modules.timing_store import write_timing_artifacts
+
+
+def synth_transcript(n_words: int, seed: int = 7):
+    rnd = random.Random(seed)
+    words, sentences = [], []
+    t, idx = 0.0, 1
+    while len(words) < n_words:
+        n = rnd.randint(4, 16)
+        sent_start, toks = t, []
+        for k in range(n):
+            w = "".join(rnd.choice("abcdefghijklmnop") for _ in range(rnd.randint(2, 9)))
+            punct = rnd.choice([",", "", "", ""]) if k < n - 1 else rnd.choice([".", "?", "!"])
+            ws, we = t, t + rnd.uniform(0.12, 0.45)
+            t = we + rnd.choice([0.0, 0.0, 0.03, 0.2])
+            entry = {"word": w, "start": round(ws, 3), "end": round(we, 3), "sentence_index": idx, "punct": punct}
+            if rnd.random() < 0.5:
+                entry["phonemes"] = [{"symbol": "AH", "start": round(ws + 0.01, 3), "end": round(we - 0.01, 3)}]
+            words.append(entry)
+            toks.append(w + punct)
+        sentences.append({"index": idx, "speaker": ("Peter", "Stewie")[idx % 2],
+                          "start": round(sent_start, 3), "end": round(t, 3), "text": " ".join(toks)})
+        idx += 1
+    return words, sentences
+
+
+def legacy_sentence_scan(word_ends, sentence_ends, eps=0.04):
+    """The original O(sentences x words) matching loop, kept for comparison."""
+    out = {}
+    for sent_end in sentence_ends:
+        idx = None
+        for i, we in enumerate(word_ends):
+            if we <= sent_end + eps:
+                idx = i
+            else:
+                break
+        if idx is not None:
+            out[idx] = True
+    return out
+
+
+def timed(label: str, fn, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<40} {best * 1000:10.1f} ms")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--words", type=int, default=100_000)
+    ap.add_argument("--window", type=int, default=4)
+    ap.add_argument("--legacy-sentences", type=int, default=2000,
+                    help="cap on sentences fed to the legacy scan (it is quadratic)")
+    args = ap.parse_args()
+
+    words, sentences = synth_transcript(args.words)
+    print(f"{len(words)} words, {len(sentences)} sentences, window={args.window}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "word_timestamps.json").write_text(json.dumps(words))
+        (tmp / "sentence_map.json").write_text(json.dumps(sentences))
+        write_timing_artifacts(tmp / "timing", words, sentences)
+
+        timed("build_ass (JSON input)",
+              lambda: build_ass_from_whisperx(tmp / "word_timestamps.json", tmp / "a.ass", args.window))
+        timed("build_ass (binary timing input)",
+              lambda: build_ass_from_whisperx(tmp / "timing", tmp / "b.ass", args.window))
+        print(f"events written: {(tmp / 'b.ass').read_text().count('Dialogue:')}")
+        variants = {tmp / "v1.ass": {}, tmp / "v2.ass": {"mode": "karaoke"},
+                    tmp / "v3.ass": {"font": "Roboto", "highlight": "&H0000FFFF"}}
+        timed("3 style variants, one pass (binary)", lambda: render_ass_variants(tmp / "timing", variants, args.window))
+
+    word_ends = np.array([w["end"] for w in words])
+    sent_ends = np.array([s["end"] for s in sentences])
+    puncts = ["."] * len(sent_ends)
+    timed("sentence match (searchsorted, all)", lambda: match_sentence_ends(word_ends, sent_ends, puncts))
+    n_legacy = min(len(sent_ends), args.legacy_sentences)
+    t_legacy = timed(f"sentence match (legacy scan, {n_legacy})",
+                     lambda: legacy_sentence_scan(word_ends.tolist(), sent_ends[:n_legacy].tolist()), repeat=1)
+    if n_legacy < len(sent_ends):
+        print(f"{'  legacy extrapolated to all sentences':<40} {t_legacy * len(sent_ends) / n_legacy * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark idea_allocator.allocate against the local OpenAI stub server.
+
+Every request to the stub takes --latency seconds, so the wall time shows
+how many round-trips a full refill of all account queues costs: one per
+account when sequential (concurrency 1, the old behaviour), about one with
+concurrent requests on the pooled client, exactly one with --single-call.
+Each run must reach the stub with the expected number of requests; the
+benchmark fails rather than timing idea_allocator's offline stub topics.
+Queues and the topic index are written to a temporary directory.
+
+Usage: python benchmarks/bench_idea_allocator.py [--latency 0.5] [--per-account 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from openai_stub_server import serve
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--per-account", type=int, default=20)
+    args = ap.parse_args()
+
+    server, stats = serve(port=0, latency=args.latency)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_RPM"] = "600"
+    import idea_allocator
+    from pipeline_modules import job_queue
+
+    if idea_allocator._use_stub():
+        sys.exit(f"❌ idea_allocator would use offline stub topics ({idea_allocator._why_stub()}); "
+                 "install openai in this environment")
+    with tempfile.TemporaryDirectory() as tmp:
+        job_queue.QUEUE_DIR = Path(tmp)
+        idea_allocator.TOPIC_INDEX_DIR = Path(tmp) / "topic_index"
+        n = len(idea_allocator.ACCOUNTS)
+        runs = (("sequential (concurrency 1)", 1, False, n),
+                (f"concurrent (concurrency {n})", n, False, n),
+                ("single structured call", 1, True, 1))
+        for label, concurrency, single, expected in runs:
+            before = stats["requests"]
+            stats["max_in_flight"] = 0
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                idea_allocator.allocate(idea_allocator.ACCOUNTS, args.per_account, "seed", concurrency, single)
+            wall = time.perf_counter() - t0
+            requests = stats["requests"] - before
+            print(f"{label:<28} {wall:6.2f} s  {wall / args.latency:4.1f} round-trips  "
+                  f"{requests} requests, {stats['max_in_flight']} in flight")
+            if requests != expected:
+                server.shutdown()
+                sys.exit(f"❌ {label}: expected {expected} requests at the stub, got {requests}")
+        queued = {q: len(idea_allocator.load_queue(q)) for q in idea_allocator.ACCOUNTS.values()}
+        print("queued per account:", queued)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Offline quality-and-speed report: fp32 vs dynamic int8 XTTS and RVC on CPU.
+
+XTTS and RVC live in different venvs, so the report runs in two steps:
+
+  venv-xtts/bin/python benchmarks/bench_quantized_inference.py xtts --out /tmp/quant
+      synthesises FIXED_LINES with fp32 and int8 GPT weights (same seed per
+      line), writes both sets of wavs under --out and reports them
+  venv-rvc/bin/python benchmarks/bench_quantized_inference.py rvc --speaker Peter --out /tmp/quant
+      converts the fp32 XTTS wavs with fp32 and int8 RVC weights and reports them
+
+Per line it prints the real-time factor (inference time / audio duration, lower
+is faster) of both precisions and the spectral distance of int8 from fp32:
+  lsd_db   frame-wise log-spectral distance (dB) over the common length; only
+           meaningful when both runs produce aligned audio (RVC)
+  ltsd_db  distance between the long-term average log spectra (dB); robust to
+           the different token sequences sampling can give XTTS
+A JSON copy of the report is written next to the wavs.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+FIXED_LINES = [
+    ("Peter", "Hey Lois, I just found out the fridge has a light that turns off when you close it."),
+    ("Stewie", "Fascinating. And how long did it take you to conduct this groundbreaking research?"),
+    ("Peter", "About six hours. I had to keep opening it to check."),
+    ("Stewie", "Remind me to have the gene pool in this house formally investigated."),
+    ("Peter", "Okay, but what if the light is on when nobody's looking? Think about it."),
+    ("Stewie", "I have. Repeatedly. It is the single worst use of my intellect this week."),
+]
+SEED = 1234
+N_FFT, HOP = 1024, 256
+
+
+def log_spectrogram(wav: np.ndarray) -> np.ndarray:
+    """[frames, bins] log10 power spectrogram with a Hann window."""
+    wav = np.asarray(wav, dtype=np.float64)
+    if wav.ndim > 1:
+        wav = wav.mean(axis=1)
+    if len(wav) < N_FFT:
+        wav = np.pad(wav, (0, N_FFT - len(wav)))
+    n = 1 + (len(wav) - N_FFT) // HOP
+    frames = np.lib.stride_tricks.as_strided(wav, (n, N_FFT), (wav.strides[0] * HOP, wav.strides[0]))
+    power = np.abs(np.fft.rfft(frames * np.hanning(N_FFT), axis=1)) ** 2
+    # 80 dB floor below the peak, so near-silent bins don't dominate the distance
+    return np.log10(np.maximum(power, power.max() * 1e-8 + 1e-20))
+
+
+def spectral_distance(ref: np.ndarray, test: np.ndarray) -> dict:
+    a, b = log_spectrogram(ref), log_spectrogram(test)
+    n = min(len(a), len(b))
+    lsd = np.sqrt(((10 * (a[:n] - b[:n])) ** 2).mean(axis=1)).mean()
+    ltsd = np.sqrt(((10 * (a.mean(axis=0) - b.mean(axis=0))) ** 2).mean())
+    return {"lsd_db": round(float(lsd), 3), "ltsd_db": round(float(ltsd), 3)}
+
+
+def report(rows, title: str, out: Path):
+    print(f"\n{title}")
+    print(f"{'line':<6}{'fp32 RTF':>10}{'int8 RTF':>10}{'speed-up':>10}{'lsd dB':>9}{'ltsd dB':>9}")
+    for r in rows:
+        print(f"{r['line']:<6}{r['fp32_rtf']:>10.3f}{r['int8_rtf']:>10.3f}"
+              f"{r['fp32_rtf'] / r['int8_rtf']:>9.2f}x{r['lsd_db']:>9.2f}{r['ltsd_db']:>9.2f}")
+    fp32, int8 = (sum(r[k] for r in rows) / len(rows) for k in ("fp32_rtf", "int8_rtf"))
+    print(f"{'mean':<6}{fp32:>10.3f}{int8:>10.3f}{fp32 / int8:>9.2f}x"
+          f"{np.mean([r['lsd_db'] for r in rows]):>9.2f}{np.mean([r['ltsd_db'] for r in rows]):>9.2f}")
+    out.write_text(json.dumps(rows, indent=2))
+    print(f"Report written to {out}")
+
+
+def run_xtts_report(out: Path):
+    import torch
+    from TTS.api import TTS
+
+    from pipeline_modules.run_xtts_batch import quantize_xtts
+
+    model = "tts_models/multilingual/multi-dataset/xtts_v2"
+    samples_root = REPO_ROOT / "xtts" / "speaker_samples"
+    tts = TTS(model_name=model, progress_bar=False, gpu=False)
+    sr = tts.synthesizer.output_sample_rate
+
+    def synthesise(precision):
+        timings = []
+        for i, (name, text) in enumerate(FIXED_LINES, 1):
+            samples = [str(p) for p in sorted((samples_root / name.lower()).glob("*.wav"))]
+            torch.manual_seed(SEED)
+            t0 = time.perf_counter()
+            wav = np.asarray(tts.tts(text=text, speaker_wav=samples, language="en", temperature=0.8))
+            wall = time.perf_counter() - t0
+            path = out / f"xtts_{precision}" / f"{i:02d}_{name}.wav"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            sf.write(str(path), wav, sr)
+            timings.append((path, wall / (len(wav) / sr)))
+        return timings
+
+    fp32 = synthesise("fp32")
+    quantize_xtts(tts, model)
+    int8 = synthesise("int8")
+    rows = []
+    for (p_ref, rtf_ref), (p_q, rtf_q) in zip(fp32, int8):
+        dist = spectral_distance(sf.read(str(p_ref))[0], sf.read(str(p_q))[0])
+        rows.append({"line": p_ref.stem.split("_")[0], "fp32_rtf": round(rtf_ref, 4),
+                     "int8_rtf": round(rtf_q, 4), **dist})
+    report(rows, "XTTS fp32 vs int8 GPT", out / "xtts_report.json")
+
+
+def run_rvc_report(out: Path, speaker: str):
+    from pipeline_modules import convert_batch
+
+    inputs = sorted((out / "xtts_fp32").glob(f"*_{speaker}.wav"))
+    if not inputs:
+        raise SystemExit(f"No {speaker} wavs in {out / 'xtts_fp32'}; run the xtts step first")
+    pth, _ = convert_batch.validate_model(speaker)
+
+    def convert_all(vc, precision):
+        rtfs = []
+        for src in inputs:
+            dst = out / f"rvc_{precision}" / src.name
+            t0 = time.perf_counter()
+            convert_batch.convert(vc, src, dst)
+            rtfs.append((time.perf_counter() - t0) / sf.info(str(src)).duration)
+        return rtfs
+
+    vc = convert_batch.load_model(speaker)
+    # Untimed pass: VC loads HuBERT and the F0 model lazily on first use
+    convert_all(vc, "warmup")
+    fp32 = convert_all(vc, "fp32")
+    convert_batch.quantize_vc(vc, speaker, pth)
+    int8 = convert_all(vc, "int8")
+    rows = []
+    for src, rtf_ref, rtf_q in zip(inputs, fp32, int8):
+        ref, _ = sf.read(str(out / "rvc_fp32" / src.name))
+        test, _ = sf.read(str(out / "rvc_int8" / src.name))
+        rows.append({"line": src.stem.split("_")[0], "fp32_rtf": round(rtf_ref, 4),
+                     "int8_rtf": round(rtf_q, 4), **spectral_distance(ref, test)})
+    report(rows, f"RVC ({speaker}) fp32 vs int8 HuBERT + synthesiser", out / f"rvc_{speaker.lower()}_report.json")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("step", choices=("xtts", "rvc"))
+    ap.add_argument("--out", type=Path, default=Path("/tmp/quant_report"))
+    ap.add_argument("--speaker", default="Peter", help="RVC model to report on (rvc step)")
+    args = ap.parse_args()
+    args.out.mkdir(parents=True, exist_ok=True)
+    if args.step == "xtts":
+        run_xtts_report(args.out)
+    else:
+        run_rvc_report(args.out, args.speaker)
+
+
+if __name__ == "__main__":
+    main()
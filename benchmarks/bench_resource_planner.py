@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent stage workers with and without the resource planner.
+
+One worker per stage runs at the same time, as when several pipelines share
+a box: xtts, rvc and align are stood in for by a fixed amount of matrix
+multiplication (torch if importable, else NumPy/BLAS), ffmpeg by an x264
+encode of a lavfi test source. Unplanned, every worker sizes its pools to
+the whole machine; planned, each gets its stage_env() slice, pins itself
+with apply_stage_plan() and ffmpeg gets ffmpeg_thread_args(). Reports each
+worker's wall time and the makespan.
+
+On a single-CPU host the planned and unplanned runs are the same schedule;
+run it on a multi-core (ideally multi-socket) box.
+
+Usage: python benchmarks/bench_resource_planner.py [--size 1024] [--reps 40] [--seconds 20]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules.resource_planner import (
+    THREAD_ENV_VARS, cpu_topology, ffmpeg_thread_args, format_cpulist, plan_resources, stage_env,
+)
+
+INFERENCE_STAGES = ("xtts", "rvc", "align")
+
+# Stand-in for a torch inference stage: fixed work, so wall time is comparable
+MATMUL_WORKER = """
+import sys
+sys.path.insert(0, {root!r})
+from pipeline_modules.resource_planner import apply_stage_plan
+try:
+    import torch
+    a = torch.rand({size}, {size})
+    mm = torch.mm
+except ImportError:
+    import numpy as np
+    a = np.random.rand({size}, {size}).astype(np.float32)
+    mm = np.matmul
+apply_stage_plan()
+for _ in range({reps}):
+    b = mm(a, a)
+"""
+
+
+def worker_cmds(args, plan):
+    """{stage: (argv, env overrides)} for one concurrent run; plan=None runs unplanned."""
+    code = MATMUL_WORKER.format(root=str(REPO_ROOT), size=args.size, reps=args.reps)
+    cmds = {}
+    for stage in INFERENCE_STAGES:
+        cmds[stage] = ([sys.executable, "-c", code], stage_env(plan[stage]) if plan else {})
+    ffmpeg = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+              "-f", "lavfi", "-i", f"testsrc2=size=1080x1920:rate=30:duration={args.seconds}",
+              "-c:v", "libx264", "-preset", "fast", "-crf", "23"]
+    if plan:
+        ffmpeg += ffmpeg_thread_args(plan["ffmpeg"]["threads"])
+    cmds["ffmpeg"] = (ffmpeg + ["-f", "null", "-"], stage_env(plan["ffmpeg"]) if plan else {})
+    return cmds
+
+
+def run_concurrent(cmds, plan):
+    base = {k: v for k, v in os.environ.items() if k not in THREAD_ENV_VARS}
+    t0 = time.perf_counter()
+    procs = {}
+    for stage, (argv, env) in cmds.items():
+        # ffmpeg cannot pin itself; bind it to its slice before exec
+        pin = None
+        if plan and stage == "ffmpeg" and hasattr(os, "sched_setaffinity"):
+            pin = lambda cpus=plan[stage]["cpus"]: os.sched_setaffinity(0, cpus)
+        procs[stage] = subprocess.Popen(argv, env={**base, **env}, preexec_fn=pin)
+    walls = {}
+    pending = dict(procs)
+    while pending:
+        for stage, p in list(pending.items()):
+            if p.poll() is not None:
+                if p.returncode:
+                    raise subprocess.CalledProcessError(p.returncode, p.args)
+                walls[stage] = time.perf_counter() - t0
+                del pending[stage]
+        time.sleep(0.01)
+    return walls, max(walls.values())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=1024, help="matrix size of the inference stand-ins")
+    ap.add_argument("--reps", type=int, default=40, help="matmuls per inference stand-in")
+    ap.add_argument("--seconds", type=float, default=20.0, help="length of the ffmpeg test encode")
+    args = ap.parse_args()
+
+    topology = cpu_topology()
+    plan = plan_resources([*INFERENCE_STAGES, "ffmpeg"], topology)
+    print(f"CPUs {sum(map(len, topology.values()))} on {len(topology)} NUMA node(s)")
+    for stage, e in plan.items():
+        print(f"  {stage:<7} cpus {format_cpulist(e['cpus']):<12} {e['threads']} threads")
+
+    results = {}
+    for label, p in (("unplanned", None), ("planned", plan)):
+        walls, makespan = run_concurrent(worker_cmds(args, p), p)
+        results[label] = makespan
+        per_stage = "  ".join(f"{s} {w:6.2f}s" for s, w in walls.items())
+        print(f"{label:<10} makespan {makespan:7.2f} s   {per_stage}")
+    print(f"speed-up: {results['unplanned'] / results['planned']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
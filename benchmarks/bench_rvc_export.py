@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark exported (TorchScript) RVC synthesisers against eager net_g.
+
+For each speaker: model set-up time (VC.get_vc vs loading the export), the
+parity of exported and eager output, and the synthesiser's real-time factor
+(inference time / seconds of audio, lower is faster) over several utterance
+lengths. Exports are created first if missing (see pipeline_modules/rvc_export.py).
+
+Run in venv-rvc: python benchmarks/bench_rvc_export.py Peter [Stewie] [--precision int8]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from rvc.modules.vc.modules import VC
+
+from pipeline_modules import rvc_export
+from pipeline_modules.convert_batch import quantize_vc, validate_model
+
+FRAMES_PER_SECOND = 100  # synthesiser input rate: HuBERT's 50 Hz features upsampled 2x
+SECONDS = (2, 5, 10)
+REPEATS = 3
+
+
+def rtf(module, version: str, if_f0: bool, seconds: float) -> float:
+    inputs = rvc_export.example_inputs(version, if_f0, int(seconds * FRAMES_PER_SECOND))
+    rvc_export._run(module, inputs)  # warm-up: allocator and, for TorchScript, the profiling run
+    t0 = time.perf_counter()
+    for _ in range(REPEATS):
+        rvc_export._run(module, inputs)
+    return (time.perf_counter() - t0) / REPEATS / seconds
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("speakers", nargs="+")
+    ap.add_argument("--precision", choices=("fp32", "int8"), default="fp32")
+    args = ap.parse_args()
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads")
+
+    for speaker in args.speakers:
+        pth, _ = validate_model(speaker)
+        t0 = time.perf_counter()
+        vc = VC()
+        vc.get_vc(str(pth))
+        t_eager = time.perf_counter() - t0
+        if args.precision == "int8":
+            quantize_vc(vc, speaker, pth)
+        if rvc_export.load_exported(pth, args.precision) is None:
+            rvc_export.export(vc, pth, args.precision)
+
+        t0 = time.perf_counter()
+        exported = rvc_export.load_exported(pth, args.precision)
+        rvc_export.warm_start(VC(), exported)
+        t_export = time.perf_counter() - t0
+
+        version, if_f0 = vc.version, bool(vc.if_f0)
+        eager = rvc_export._Infer(vc.net_g).eval()
+        diff = rvc_export.parity(exported.module, eager, version, if_f0)
+        print(f"\n{speaker} ({args.precision}, {version}, f0={int(if_f0)})")
+        print(f"  set-up: get_vc {t_eager:.2f} s, export {t_export:.2f} s")
+        print(f"  parity: max |exported - eager| = {diff:.2e}")
+        print(f"  {'audio':>7}{'eager RTF':>11}{'export RTF':>12}{'speed-up':>10}")
+        for seconds in SECONDS:
+            a, b = rtf(eager, version, if_f0, seconds), rtf(exported.module, version, if_f0, seconds)
+            print(f"  {seconds:>6}s{a:>11.4f}{b:>12.4f}{a / b:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch script generation against the local OpenAI stub server.
+
+  per-topic   the old path: a fresh ScriptGenerator (client, template, CSV log)
+              and a live USD->AUD fetch for every topic, one call at a time
+  batch       ScriptGenerator.generate_scripts: one pooled async client,
+              --concurrency calls in flight, FX rate fetched once (TTL cache)
+  offline     pipeline_modules.script_batch with the local batch client:
+              write the request JSONL, submit, poll, ingest; costed at the
+              Batch API discount
+
+The FX fetch is simulated with --fx-latency seconds of delay. --rpm makes the
+stub enforce a requests-per-minute limit for the batch run that the client is
+not told about (it paces at 600 rpm), so the run has to learn the limit from
+the rate-limit headers and 429s; the report shows how many 429s it hit and
+that every topic still succeeded.
+Scripts, logs and the FX cache go to a temporary directory.
+
+Usage: python benchmarks/bench_script_batch.py [--topics 12] [--latency 0.5] [--concurrency 4] [--rpm 0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from openai_stub_server import serve
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topics", type=int, default=12)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--fx-latency", type=float, default=0.3)
+    ap.add_argument("--rpm", type=int, default=0, help="stub rate limit for the batch run (0: none)")
+    args = ap.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "stub"
+    from pipeline_modules import db_logger
+    from pipeline_modules import script_generator as sg
+
+    fx_calls = [0]
+
+    def fake_fetch():
+        fx_calls[0] += 1
+        time.sleep(args.fx_latency)
+        return 1.52
+
+    sg._fetch_usd_aud = fake_fetch
+    jobs = [{"topic": f"benchmark topic {i}", "tone": "humorous", "account": "bench"} for i in range(args.topics)]
+    template = "data/prompts/prompt_template.txt"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sg.FX_CACHE_PATH = tmp / "fx.json"
+
+        server, stats = serve(port=0, latency=args.latency)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        sg.FX_TTL_SECONDS = 0  # old behaviour: a live fetch per script
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for job in jobs:
+                gen = sg.ScriptGenerator("stub", template, tmp / "old" / "log.jsonl")
+                script = gen.generate_script(job["topic"], job["tone"], job["account"])
+                gen.save_script(script, job["topic"], tmp / "old")
+        wall_old, fx_old = time.perf_counter() - t0, fx_calls[0]
+        cost_old = sum(e["estimated_cost_usd"] or 0 for e in db_logger.read_events(tmp / "old" / "log.jsonl"))
+        server.shutdown()
+
+        server, stats = serve(port=0, latency=args.latency, rpm=args.rpm)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        sg.FX_TTL_SECONDS = 24 * 3600
+        sg._fx_memo.clear()
+        sg.FX_CACHE_PATH.unlink(missing_ok=True)
+        fx_calls[0] = 0
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen = sg.ScriptGenerator("stub", template, tmp / "new" / "log.jsonl")
+            results = gen.generate_scripts(jobs, tmp / "new", concurrency=args.concurrency, rpm=600)
+        wall_new = time.perf_counter() - t0
+        cost_new = gen.content_log.total("estimated_cost_usd")
+        server.shutdown()
+
+        from pipeline_modules import script_batch
+        server, _ = serve(port=0, latency=args.latency)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        script_batch.BATCH_DIR = tmp / "batches"
+        script_batch.READY_DIR = tmp / "offline"
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen = sg.ScriptGenerator("stub", template, tmp / "offline" / "log.jsonl")
+            client = script_batch.LocalBatchClient(workers=args.concurrency)
+            batch_dir = script_batch.submit(jobs, client, gen)
+            script_batch.poll(client, batch_dir, interval=0.1)
+            summary = script_batch.ingest(client, batch_dir, gen)
+        wall_offline = time.perf_counter() - t0
+        server.shutdown()
+
+    ok = sum("path" in r for r in results)
+    print(f"{'mode':<12}{'wall s':>8}{'per topic s':>13}{'FX fetches':>12}{'cost USD':>10}")
+    print(f"{'per-topic':<12}{wall_old:>8.2f}{wall_old / args.topics:>13.3f}{fx_old:>12}{cost_old:>10.4f}")
+    print(f"{'batch':<12}{wall_new:>8.2f}{wall_new / args.topics:>13.3f}{fx_calls[0]:>12}{cost_new:>10.4f}")
+    print(f"{'offline':<12}{wall_offline:>8.2f}{wall_offline / args.topics:>13.3f}{'-':>12}"
+          f"{summary['cost_usd']:>10.4f}   ({summary['scripts']}/{args.topics} ingested)")
+    print(f"batch: {ok}/{args.topics} scripts, {stats['max_in_flight']} max in flight, "
+          f"{stats['rate_limited']} requests answered 429")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark streaming script generation feeding TTS line by line.
+
+The local OpenAI stub streams a fixed fenced-JSON dialogue a few characters
+per chunk (--chunk-delay between chunks, standing in for token generation),
+and TTS is simulated with --tts-seconds of work per line.
+
+  wait-then-tts   stream_script with no callback, then synthesise every line
+                  (what generate_script + run_xtts do today)
+  streaming       stream_script(on_line=queue.put) with a TTS worker thread
+                  synthesising each line as soon as it is parsed
+
+Reported: time to the first line reaching TTS and end-to-end wall time.
+Beforehand, the incremental parser is checked against json.loads of the
+full document over many random chunkings.
+
+Usage: python benchmarks/bench_script_stream.py [--chunk-delay 0.01] [--tts-seconds 0.4]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from openai_stub_server import serve
+from pipeline_modules.script_stream import ScriptLineParser
+
+SCRIPT = {
+    "topic": "Why the sky is blue",
+    "tone": "humorous",
+    "characters": [
+        {"name": "Peter", "lines": [
+            "Stewie, why is the sky blue? Is it just showing off?",
+            "So the air is basically a giant blue filter? Like sunglasses for the planet?",
+            "Wait, then why are sunsets orange? Did the sky run out of blue?",
+            "Huh. So the blue gets \"used up\" on the way. That's kind of sad, actually.",
+            "Okay, I'm telling Lois the sky is blue because it hogs all the short waves.",
+        ]},
+        {"name": "Stewie", "lines": [
+            "Sunlight is every colour at once, you oaf, and air scatters the short blue waves far more than red.",
+            "Not quite. The blue light bounces around everywhere, so it reaches your eyes from every direction.",
+            "At sunset the light crosses much more air, so most of the blue is scattered away before it gets here.",
+            "Only you could find melancholy in Rayleigh scattering. Café philosophy at its worst.",
+            "Tell her whatever you like. She'll understand it better than you did — the bar is on the floor.",
+        ]},
+    ],
+}
+
+
+def check_parser(rounds: int = 200) -> int:
+    text = "```json\n" + json.dumps(SCRIPT, indent=2, ensure_ascii=False) + "\n```"
+    expected = [(c["name"], line) for c in SCRIPT["characters"] for line in c["lines"]]
+    rng = random.Random(1)
+    for _ in range(rounds):
+        got = []
+        parser = ScriptLineParser(lambda line: got.append((line.character, line.text)))
+        i = 0
+        while i < len(text):
+            n = rng.randint(1, 12)
+            parser.feed(text[i:i + n])
+            i += n
+        assert got == expected, f"parser mismatch: {got[:3]}..."
+    return len(expected)
+
+
+def fake_tts(line, seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunk-delay", type=float, default=0.01, help="seconds between 8-character chunks")
+    ap.add_argument("--tts-seconds", type=float, default=0.4, help="simulated synthesis time per line")
+    args = ap.parse_args()
+
+    n_lines = check_parser()
+    print(f"parser: {n_lines} lines matched json.loads over 200 random chunkings")
+
+    content = "```json\n" + json.dumps(SCRIPT, indent=2, ensure_ascii=False) + "\n```"
+    server, _ = serve(port=0, latency=0.2, chunk_delay=args.chunk_delay, reply=lambda body: content)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    from pipeline_modules import script_generator as sg
+    sg._fetch_usd_aud = lambda: 1.5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sg.FX_CACHE_PATH = Path(tmp) / "fx.json"
+        gen = sg.ScriptGenerator("stub", "data/prompts/prompt_template.txt", Path(tmp) / "log.jsonl")
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            script = json.loads(gen.stream_script("Why the sky is blue", "humorous"))
+        first_wait = time.perf_counter() - t0
+        for c in script["characters"]:
+            for line in c["lines"]:
+                fake_tts(line, args.tts_seconds)
+        total_wait = time.perf_counter() - t0
+
+        lines, first = queue.Queue(), []
+
+        def worker():
+            while (line := lines.get()) is not None:
+                if not first:
+                    first.append(time.perf_counter() - t0)
+                fake_tts(line, args.tts_seconds)
+
+        t0 = time.perf_counter()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen.stream_script("Why the sky is blue", "humorous", on_line=lines.put)
+        lines.put(None)
+        thread.join()
+        total_stream = time.perf_counter() - t0
+    server.shutdown()
+
+    print(f"{'mode':<16}{'first line s':>14}{'end-to-end s':>14}")
+    print(f"{'wait-then-tts':<16}{first_wait:>14.2f}{total_wait:>14.2f}")
+    print(f"{'streaming':<16}{first[0]:>14.2f}{total_stream:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark script validation and repair.
+
+  validate      microseconds per script for the active validator (compiled
+                fastjsonschema when installed) and the hand-written fallback
+  repair        corrupted variants of a good script: which check_script fixes,
+                which it rejects, and how long each takes
+  reject        time from a bad script to ScriptValidationError, against the
+                seconds of XTTS work a single line costs when it is not caught
+
+Usage: python benchmarks/bench_script_validation.py [--rounds 20000]
+"""
+import argparse
+import copy
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules import script_schema
+from pipeline_modules.script_schema import ScriptValidationError, check_script
+
+SCRIPT = {
+    "topic": "Why the sky is blue",
+    "tone": "humorous",
+    "characters": [
+        {"name": "Peter", "lines": [f"Peter line {i}: is the sky just showing off again?" for i in range(10)]},
+        {"name": "Stewie", "lines": [f"Stewie line {i}: air scatters short blue waves, you oaf." for i in range(10)]},
+    ],
+}
+
+
+def corrupted():
+    """(label, script text) variants of SCRIPT with one defect each."""
+    def variant(mutate):
+        s = copy.deepcopy(SCRIPT)
+        mutate(s)
+        return json.dumps(s)
+
+    long_line = " ".join(["This sentence keeps going well past what XTTS can say in one breath."] * 8)
+    return [
+        ("valid", json.dumps(SCRIPT)),
+        ("fenced", "```json\n" + json.dumps(SCRIPT, indent=2) + "\n```"),
+        ("name case", variant(lambda s: s["characters"][0].update(name="peter"))),
+        ("next turn", variant(lambda s: s["characters"].append({"name": "Peter", "lines": ["Me again."]}))),
+        ("back-to-back turns", variant(lambda s: s["characters"].insert(1, {"name": "Peter", "lines": ["Me again."]}))),
+        ("long line", variant(lambda s: s["characters"][1]["lines"].append(long_line))),
+        ("empty line", variant(lambda s: s["characters"][0]["lines"].append("   "))),
+        ("extra key", variant(lambda s: s.update(notes="draft"))),
+        ("missing tone", variant(lambda s: s.pop("tone"))),
+        ("unknown speaker", variant(lambda s: s["characters"][0].update(name="Brian"))),
+        ("no characters", variant(lambda s: s.update(characters=[]))),
+        ("truncated", json.dumps(SCRIPT)[:-40]),
+    ]
+
+
+def per_call_us(fn, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=20000)
+    ap.add_argument("--xtts-line-seconds", type=float, default=4.0,
+                    help="synthesis time of one line, for the cost of a late failure")
+    args = ap.parse_args()
+
+    compiled = script_schema.fastjsonschema is not None
+    print(f"{'validator':<22}{'us/script':>12}")
+    print(f"{'active (' + ('compiled' if compiled else 'fallback') + ')':<22}"
+          f"{per_call_us(lambda: script_schema.validate(SCRIPT), args.rounds):>12.1f}")
+    print(f"{'fallback':<22}{per_call_us(lambda: script_schema._fallback_errors(SCRIPT), args.rounds):>12.1f}")
+    text = json.dumps(SCRIPT)
+    print(f"{'parse+repair+validate':<22}{per_call_us(lambda: check_script(text), args.rounds // 4):>12.1f}")
+
+    print(f"\n{'variant':<20}{'result':<10}{'us':>8}  detail")
+    worst = 0.0
+    for label, text in corrupted():
+        rounds = max(1, args.rounds // 20)
+        us = per_call_us(lambda: _check(text), rounds)
+        try:
+            _, fixes = check_script(text)
+            result, detail = ("repaired" if fixes else "ok"), "; ".join(fixes)
+        except ScriptValidationError as e:
+            result, detail = "rejected", "; ".join(e.errors)
+            worst = max(worst, us)
+        print(f"{label:<20}{result:<10}{us:>8.1f}  {detail[:70]}")
+
+    print(f"\nslowest rejection {worst:.0f} us vs ~{args.xtts_line_seconds:g} s of XTTS per line "
+          f"synthesised before a late failure ({args.xtts_line_seconds * 1e6 / max(worst, 1):,.0f}x)")
+
+
+def _check(text):
+    try:
+        check_script(text)
+    except ScriptValidationError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the near-duplicate topic index (scripts/topic_index.py) at scale.
+
+Builds an index of N synthetic topics in a temp dir, then reports:
+  - build rate (topics/s, including the on-disk appends) and reload time
+  - lookup latency (mean and p99) for unseen topics and for near-duplicates
+  - recall: share of lightly perturbed copies (case, punctuation, an added or
+    dropped word) flagged as duplicates
+  - false positives: share of fresh topics flagged as duplicates, both for
+    random-vocabulary topics and for the allocator's stub topics, which share
+    a long "<account seed>: " prefix and differ only in the ending
+
+Usage: python benchmarks/bench_topic_index.py [--topics 200000] [--queries 2000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from topic_index import TopicIndex  # noqa: E402
+from idea_allocator import ACCOUNTS, _stub_ideas  # noqa: E402
+
+OPENERS = ["why", "how", "the truth about", "the real reason", "what happens when", "the history of",
+           "the science of", "the strange story of", "the secret life of", "what nobody tells you about"]
+FILLERS = ["really", "actually", "surprisingly", "secretly", "quietly", "famously"]
+
+
+def make_vocab(rng: random.Random, n: int = 5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(n)]
+
+
+def make_topic(rng: random.Random, vocab) -> str:
+    return f"{rng.choice(OPENERS)} {' '.join(rng.sample(vocab, rng.randint(4, 7)))}"
+
+
+def perturb(rng: random.Random, topic: str) -> str:
+    words = topic.split()
+    kind = rng.randrange(3)
+    if kind == 0:
+        words.insert(rng.randrange(1, len(words)), rng.choice(FILLERS))
+    elif kind == 1 and len(words) > 5:
+        del words[rng.randrange(1, len(words))]
+    out = " ".join(words)
+    return out.capitalize() + rng.choice(["?", "!", "", "..."])
+
+
+def timed_lookups(index: TopicIndex, topics):
+    times, hits = [], 0
+    for t in topics:
+        t0 = time.perf_counter()
+        hit = index.lookup(t)
+        times.append(time.perf_counter() - t0)
+        hits += hit is not None
+    times.sort()
+    return statistics.mean(times) * 1000, times[int(len(times) * 0.99)] * 1000, hits / len(topics)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topics", type=int, default=200_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+    rng = random.Random(7)
+    vocab = make_vocab(rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = TopicIndex(Path(tmp))
+        corpus = [make_topic(rng, vocab) for _ in range(args.topics)]
+        t0 = time.perf_counter()
+        accepted, rejected = index.filter_new([{"topic": t} for t in corpus], source="bench")
+        build = time.perf_counter() - t0
+        print(f"Indexed {len(accepted)} topics in {build:.1f} s ({len(accepted) / build:,.0f}/s), "
+              f"{len(rejected)} rejected as duplicates while building")
+
+        t0 = time.perf_counter()
+        reloaded = TopicIndex(Path(tmp))
+        print(f"Reloaded {len(reloaded)} topics from disk in {time.perf_counter() - t0:.2f} s")
+
+        fresh = [make_topic(rng, vocab) for _ in range(args.queries)]
+        dupes = [perturb(rng, rng.choice(corpus)) for _ in range(args.queries)]
+        mean_f, p99_f, fp = timed_lookups(index, fresh)
+        mean_d, p99_d, recall = timed_lookups(index, dupes)
+        print(f"{'queries':<16}{'mean ms':>9}{'p99 ms':>9}{'flagged':>9}")
+        print(f"{'fresh':<16}{mean_f:>9.3f}{p99_f:>9.3f}{fp:>8.1%}   (false positives)")
+        print(f"{'near-duplicate':<16}{mean_d:>9.3f}{p99_d:>9.3f}{recall:>8.1%}   (recall)")
+
+    # Distinct endings on a shared prefix: every one of these is a new topic
+    with tempfile.TemporaryDirectory() as tmp:
+        prefixed = [i for account in ACCOUNTS for i in _stub_ideas(account, 12)]
+        accepted, rejected = TopicIndex(Path(tmp)).filter_new(prefixed, source="bench")
+        print(f"{'shared prefix':<16}{'':>18}{len(rejected) / len(prefixed):>8.1%}   (false positives, "
+              f"{len(prefixed)} stub topics)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark logkit tracing.
+
+  overhead      calling-thread cost per span with the queue-based run logger
+                against a FileHandler writing synchronously (plain, and with an
+                fsync per record standing in for a slow or network disk)
+  propagation   an orchestrator span launching stage subprocesses the way
+                run_pipeline does (trace_env() in the child environment); each
+                stage opens load_model / infer / write spans. The run log is
+                exported with chrome_trace and checked: one trace id, every
+                parent resolvable, each stage nested under its orchestrator span.
+
+Usage: python benchmarks/bench_tracing.py [--spans 20000] [--stages 3] [--keep trace.json]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules import logkit
+
+STAGE_CODE = textwrap.dedent("""
+    import sys, time
+    from pathlib import Path
+    sys.path.insert(0, {root!r})
+    from pipeline_modules import logkit
+    logkit.run_logger(Path({log_dir!r}))
+    with logkit.span("stage.load_model", model="demo"):
+        time.sleep(0.05)
+    for i in range(4):
+        with logkit.span("stage.infer", line=i):
+            time.sleep(0.01)
+            with logkit.span("stage.write", line=i):
+                time.sleep(0.002)
+""")
+
+
+def per_span_us(lg: logging.Logger, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        with logkit.span("bench", lg, i=i):
+            pass
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+class FsyncFileHandler(logging.FileHandler):
+    def emit(self, record):
+        super().emit(record)
+        os.fsync(self.stream.fileno())
+
+
+def blocking_logger(path: Path, fsync: bool = False) -> logging.Logger:
+    fh = (FsyncFileHandler if fsync else logging.FileHandler)(path, encoding="utf-8")
+    fh.setFormatter(logkit.JsonFormatter())
+    lg = logging.getLogger("bench.blocking")
+    lg.setLevel(logging.INFO)
+    lg.handlers.clear()
+    lg.addHandler(fh)
+    lg.propagate = False
+    return lg
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spans", type=int, default=20000)
+    ap.add_argument("--stages", type=int, default=3)
+    ap.add_argument("--keep", type=Path, help="also write the Chrome trace here")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ[logkit.RUN_ID_ENV] = "bench"
+        queued = logkit.run_logger(tmp)
+        queued.propagate = False
+        sync = per_span_us(blocking_logger(tmp / "blocking.jsonl"), args.spans)
+        synced = per_span_us(blocking_logger(tmp / "fsync.jsonl", fsync=True), max(1, args.spans // 10))
+        t0 = time.perf_counter()
+        q = per_span_us(queued, args.spans)
+        logkit._stop_listeners()
+        drained = time.perf_counter() - t0
+        print(f"{'handler':<22}{'us/span (caller)':>18}")
+        print(f"{'FileHandler (sync)':<22}{sync:>18.1f}")
+        print(f"{'FileHandler + fsync':<22}{synced:>18.1f}")
+        print(f"{'QueueHandler':<22}{q:>18.1f}   (all {args.spans} written after {drained:.2f}s)")
+
+        # Fresh run log for the propagation check
+        os.environ[logkit.RUN_ID_ENV] = "trace"
+        logkit._run_loggers.clear()
+        lg = logkit.run_logger(tmp)
+        os.environ[logkit.TRACE_ID_ENV] = os.urandom(16).hex()
+        os.environ.pop(logkit.PARENT_SPAN_ENV, None)
+        code = STAGE_CODE.format(root=str(REPO_ROOT), log_dir=str(tmp))
+        with logkit.span("job", lg, topic="demo"):
+            for k in range(args.stages):
+                with logkit.span(f"stage{k}", lg):
+                    env = {**os.environ, **logkit.trace_env()}
+                    subprocess.run([sys.executable, "-c", code], check=True, env=env)
+        logkit._stop_listeners()
+
+        spans = logkit.read_spans(tmp / "trace.jsonl")
+        trace = logkit.chrome_trace(spans)
+        by_id = {s["span_id"]: s for s in spans}
+        roots = [s for s in spans if s["parent_id"] is None]
+        orphans = [s for s in spans if s["parent_id"] is not None and s["parent_id"] not in by_id]
+        stage_roots = [s for s in spans if s["span"] == "stage.load_model"]
+        nested = all(by_id[s["parent_id"]]["span"].startswith("stage") and by_id[s["parent_id"]]["pid"] != s["pid"]
+                     for s in stage_roots)
+        print(f"\npropagation: {len(spans)} spans, {len({s['pid'] for s in spans})} processes, "
+              f"{len({s['trace_id'] for s in spans})} trace id, {len(roots)} root, {len(orphans)} orphans, "
+              f"stages nested under orchestrator spans: {nested}")
+        print(f"chrome trace: {len(trace['traceEvents'])} events, "
+              f"processes {sorted(e['args']['name'] for e in trace['traceEvents'] if e['ph'] == 'M')}")
+        if args.keep:
+            args.keep.write_text(json.dumps(trace), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -64,7 +64,7 @@ def main():
 
     print("Generating ASS subtitles for word highlights…")
     generate_ass_subtitles(
-        BASE_DIR / "data/final/word_timestamps.json",
+        BASE_DIR / "data/final/timing",
         BASE_DIR / "data/final/dialogue.ass"
     )
 
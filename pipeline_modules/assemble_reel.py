@@ -1,10 +1,74 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import math
+import os
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
 from pathlib import Path
 
+from pipeline_modules.background_library import GOP_SECONDS
+from pipeline_modules.ffmpeg_progress import run_ffmpeg
+from pipeline_modules.overlay_cache import overlay_asset
+from pipeline_modules.resource_planner import ffmpeg_thread_args, planned_threads
+
 LEFT_SPKRS = {"peter"}          # speakers whose PNG appears left
 BOTTOM_MARGIN = 80  # pixels from bottom; was effectively 300 via hardcoded y
+OVERLAY_SCALE = 0.20  # speaker PNG width relative to its source width
+RANGE_JOIN_GAP = 0.05  # merge a speaker's on-screen ranges separated by less than this (s)
+FONTS_DIR = Path(__file__).parent.parent.resolve() / "data" / "fonts"  # bundled fonts for libass
+FONT_SUFFIXES = {".ttf", ".otf", ".ttc"}
+MIN_SEGMENT_SECONDS = 4  # below this, per-process startup outweighs the parallel gain
+REEL_WIDTH = 1080  # overlay scale and pixel margins above are tuned for this width
+
+RENDER_PROFILES = {
+    # Delivery render: background at its own size and frame rate
+    "final": {"size": None, "fps": None, "preset": "fast", "crf": 23, "audio_bitrate": "192k"},
+    # QA preview for subtitle sync and overlay placement; libass rescales from PlayRes
+    "draft": {"size": (540, 960), "fps": 15, "preset": "ultrafast", "crf": 30, "audio_bitrate": "64k"},
+}
+
+LOUDNORM = "loudnorm=I=-14:TP=-1.0:LRA=11"
+
+RENDITION_DEFAULTS = {
+    "kind": "video",          # "video" (mp4) or "image" (single frame, e.g. JPEG)
+    "size": None,             # output width; height follows the aspect ratio
+    "fps": None,
+    "duration": None,         # cut after this many seconds (looping previews)
+    "at": 1.0,                # image renditions: timestamp of the grabbed frame
+    "preset": "fast",
+    "crf": 23,
+    "maxrate": None,          # VBV cap for bandwidth-limited variants
+    "audio": True,
+    "audio_bitrate": "192k",
+}
+
+# Named renditions that can be requested alongside the main output
+RENDITIONS = {
+    "mobile": {"size": 720, "crf": 26, "maxrate": "2500k", "audio_bitrate": "96k"},
+    "thumbnail": {"kind": "image", "at": 1.0},
+    "preview": {"size": 540, "fps": 15, "duration": 6.0, "crf": 28, "audio": False},
+}
+
+def resolve_rendition(spec) -> dict:
+    """Merge a rendition name or dict of overrides (a dict may name a base via "rendition")."""
+    if isinstance(spec, str):
+        spec = {"rendition": spec}
+    spec = dict(spec)
+    base = spec.pop("rendition", None)
+    if base is not None and base not in RENDITIONS:
+        raise ValueError(f"Unknown rendition {base!r}; choose from {sorted(RENDITIONS)}")
+    return {**RENDITION_DEFAULTS, **RENDITIONS.get(base, {}), **spec}
+
+def _bundled_fonts_dir(fonts_dir):
+    """Return fonts_dir if it holds any font files, else None (fall back to system fonts)."""
+    if fonts_dir is None or not fonts_dir.is_dir():
+        return None
+    if any(p.suffix.lower() in FONT_SUFFIXES for p in fonts_dir.iterdir()):
+        return fonts_dir
+    return None
 
 def _probe_duration(video: Path) -> float:
     out = subprocess.check_output(
@@ -13,6 +77,281 @@ def _probe_duration(video: Path) -> float:
     )
     return float(out.strip())
 
+def _probe_frame_rate(video: Path) -> Fraction:
+    out = subprocess.check_output(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
+         "stream=r_frame_rate", "-of", "default=nw=1:nk=1", str(video)]
+    )
+    return Fraction(out.decode().strip())
+
+def speaker_ranges(sentence_map, gap: float = RANGE_JOIN_GAP):
+    """Group sentence times by speaker (discovery order) and merge touching ranges."""
+    ranges = {}
+    for e in sentence_map:
+        ranges.setdefault(e["speaker"], []).append((float(e["start"]), float(e["end"])))
+    merged = {}
+    for spk, rs in ranges.items():
+        out = []
+        for start, end in sorted(rs):
+            if out and start <= out[-1][1] + gap:
+                out[-1] = (out[-1][0], max(out[-1][1], end))
+            else:
+                out.append((start, end))
+        merged[spk] = out
+    return merged
+
+def overlay_scale(profile: str = "final") -> float:
+    """Speaker PNG scale factor for a profile (matches the graph's scale expression)."""
+    size = RENDER_PROFILES[profile]["size"]
+    return round(OVERLAY_SCALE * (size[0] / REEL_WIDTH if size else 1.0), 2)
+
+def _still_input(png: Path, prescaled: bool, duration: str, rate_args=()):
+    """ffmpeg input args for an overlay image: cached assets are read as one frame."""
+    if prescaled:
+        return ["-i", str(png)]
+    return ["-loop", "1", *rate_args, "-t", duration, "-i", str(png)]
+
+def enable_expr(ranges) -> str:
+    return "+".join(f"between(t,{start},{end})" for start, end in ranges)
+
+def build_filter_graph(sentence_map, overlay_inputs, subs_ass: Path, fonts_dir=None, pts_offset=None,
+                       profile: str = "final", prescaled: bool = False):
+    """Return (filter_complex, output label) for subtitles plus one overlay per speaker.
+
+    overlay_inputs maps speaker -> ffmpeg input index of that speaker's PNG. Each
+    PNG is scaled once and overlaid once, enabled over all of its speaker's ranges.
+    subs_ass=None leaves out the burn-in. pts_offset (an ffmpeg expression in
+    seconds) shifts every input onto the reel timeline so subtitles and enable
+    ranges stay global in a segment render; the output is shifted back to start
+    at zero.
+    profile picks the output size and frame rate from RENDER_PROFILES; overlay
+    scale and margins follow the output width. prescaled inputs are
+    overlay_cache assets: already at reel size, given as a single frame that
+    overlay repeats after EOF.
+    """
+    prof = RENDER_PROFILES[profile]
+    k = prof["size"][0] / REEL_WIDTH if prof["size"] else 1.0
+    shift = f"setpts=PTS-STARTPTS+({pts_offset})/TB," if pts_offset is not None else ""
+    resize = f"fps={prof['fps']}," if prof["fps"] else ""
+    resize += "scale={}:{},".format(*prof["size"]) if prof["size"] else ""
+    subs_opts = f":fontsdir={fonts_dir}" if fonts_dir else ""
+    burn = f"subtitles={subs_ass}{subs_opts}" if subs_ass is not None else "null"
+    # 0:v = bg video → (draft: drop fps, downscale) → burn subs → label [base]
+    fc_parts = [f"[0:v]{shift}{resize}{burn}[base]"]
+    last_label = "base"
+
+    for n, (spk, ranges) in enumerate(speaker_ranges(sentence_map).items()):
+        if spk not in overlay_inputs or not ranges:
+            continue
+        inp = overlay_inputs[spk]
+        x_pos = f"{round(15 * k)}" if spk.lower() in LEFT_SPKRS else f"main_w-overlay_w-{round(20 * k)}"
+        label_scale = f"s{n}"
+        label_out = f"v{n}"
+        if prescaled:
+            prep, blend = shift.rstrip(",") or "null", ":eof_action=repeat"
+        else:
+            prep, blend = f"{shift}scale=iw*{OVERLAY_SCALE * k:.2f}:-1", ""
+        fc_parts.append(
+            f"[{inp}:v]{prep}[{label_scale}];"
+            f"[{last_label}][{label_scale}]overlay="
+            f"x={x_pos}:y=H-h-{round(BOTTOM_MARGIN * k)}{blend}:enable='{enable_expr(ranges)}'"
+            f"[{label_out}]"
+        )
+        last_label = label_out
+    if pts_offset is not None:
+        fc_parts.append(f"[{last_label}]setpts=PTS-STARTPTS[vseg]")
+        last_label = "vseg"
+    return ";".join(fc_parts), last_label
+
+def encode_cmd(ff_inputs, filter_complex: str, video_label: str, output_mp4: Path, profile: str = "final"):
+    prof = RENDER_PROFILES[profile]
+    return [
+        "ffmpeg", "-y",
+        *ff_inputs,
+        "-filter_complex", filter_complex,
+        "-map", f"[{video_label}]",
+        "-map", "1:a:0",
+        # Apply integrated loudness normalisation
+        "-af", LOUDNORM,
+        "-c:v", "libx264", "-preset", prof["preset"], "-crf", str(prof["crf"]),
+        # Stay within the resource planner's thread budget, if any
+        *ffmpeg_thread_args(),
+        # Ensure audio is broadly compatible (48 kHz stereo AAC)
+        "-c:a", "aac", "-b:a", prof["audio_bitrate"], "-ar", "48000", "-ac", "2",
+        # Make the MP4 start quickly when streamed
+        "-movflags", "+faststart",
+        "-shortest",
+        str(output_mp4)
+    ]
+
+def _rendition_filters(r: dict) -> str:
+    chain = []
+    if r["kind"] == "image":
+        chain.append(f"select='gte(t,{r['at']})'")
+    if r["duration"]:
+        chain.append(f"trim=duration={r['duration']},setpts=PTS-STARTPTS")
+    if r["fps"]:
+        chain.append(f"fps={r['fps']}")
+    if r["size"]:
+        chain.append(f"scale={r['size']}:-2")
+    return ",".join(chain)
+
+_RATE_UNITS = {"": 1, "k": 1000, "m": 1000 ** 2, "g": 1000 ** 3}
+
+def parse_bitrate(rate) -> int:
+    """Bits per second from an ffmpeg rate: 2500000, "2500k", "2.5M"."""
+    text = str(rate).strip().lower()
+    unit = text[-1] if text[-1:] in _RATE_UNITS else ""
+    try:
+        return int(float(text[:len(text) - len(unit)]) * _RATE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid bitrate {rate!r}; expected e.g. 2500000, '2500k' or '2.5M'") from None
+
+def _encoder_args(r: dict, audio: bool):
+    if r["kind"] == "image":
+        return ["-frames:v", "1", "-q:v", "2"]
+    args = ["-c:v", "libx264", "-preset", r["preset"], "-crf", str(r["crf"]), *ffmpeg_thread_args()]
+    if r["maxrate"]:
+        rate = parse_bitrate(r["maxrate"])
+        args += ["-maxrate", str(rate), "-bufsize", str(rate * 2)]
+    if audio:
+        args += ["-c:a", "aac", "-b:a", r["audio_bitrate"], "-ar", "48000", "-ac", "2", "-shortest"]
+    return args
+
+def multi_encode_cmd(ff_inputs, filter_complex: str, video_label: str, outputs):
+    """One ffmpeg run that writes every rendition in outputs ({path: resolved rendition}).
+
+    The composited video is split once per distinct encoder setup and the
+    normalised audio asplit once per audio-bearing encode, so decoding,
+    subtitles and overlays run a single time. Renditions with identical
+    settings share one encode and are written through the tee muxer.
+    """
+    groups = {}
+    for path, r in outputs.items():
+        key = json.dumps({k: r[k] for k in sorted(r)})
+        groups.setdefault(key, (r, []))[1].append(Path(path))
+    groups = list(groups.values())
+
+    fc = [filter_complex]
+    v_labels = [video_label]
+    if len(groups) > 1:
+        v_labels = [f"r{n}" for n in range(len(groups))]
+        fc.append(f"[{video_label}]split={len(groups)}" + "".join(f"[{lbl}]" for lbl in v_labels))
+    n_audio = sum(1 for r, _ in groups if r["kind"] == "video" and r["audio"])
+    a_labels = [f"a{n}" for n in range(n_audio)]
+    if n_audio:
+        fc.append(f"[1:a]{LOUDNORM}" + (f",asplit={n_audio}" if n_audio > 1 else "")
+                  + "".join(f"[{lbl}]" for lbl in a_labels))
+
+    out_args = []
+    for n, ((r, paths), v_label) in enumerate(zip(groups, v_labels)):
+        filters = _rendition_filters(r)
+        if filters:
+            fc.append(f"[{v_label}]{filters}[o{n}]")
+            v_label = f"o{n}"
+        audio = r["kind"] == "video" and r["audio"]
+        out_args += ["-map", f"[{v_label}]"]
+        if audio:
+            out_args += ["-map", f"[{a_labels.pop(0)}]"]
+        out_args += _encoder_args(r, audio)
+        # Make the MP4 start quickly when streamed
+        mux_opts = {"video": ["-movflags", "+faststart"], "image": ["-update", "1"]}[r["kind"]]
+        if len(paths) == 1:
+            out_args += [*mux_opts, str(paths[0])]
+        else:
+            slave = "[f=mp4:movflags=+faststart]" if r["kind"] == "video" else "[f=image2:update=1]"
+            out_args += ["-flags", "+global_header", "-f", "tee", "|".join(f"{slave}{p}" for p in paths)]
+
+    return ["ffmpeg", "-y", *ff_inputs, "-filter_complex", ";".join(fc), *out_args]
+
+def plan_segments(total_frames: int, fps: Fraction, jobs: int, gop_seconds: float = GOP_SECONDS):
+    """Split [0, total_frames) into at most `jobs` (first, last) frame ranges.
+
+    Boundaries are whole multiples of the background GOP, so with a library
+    background (keyframe-aligned offset) every segment's seek lands on a keyframe.
+    """
+    gop_frames = max(1, round(gop_seconds * fps))
+    min_frames = max(gop_frames, math.ceil(MIN_SEGMENT_SECONDS * fps / gop_frames) * gop_frames)
+    step = math.ceil(total_frames / max(1, jobs) / gop_frames) * gop_frames
+    step = max(step, min_frames)
+    return [(f0, min(f0 + step, total_frames)) for f0 in range(0, total_frames, step)]
+
+def segment_cmd(video_mp4: Path, bg_offset: float, overlay_pngs, sentence_map, overlay_inputs,
+                subs_ass: Path, fonts_dir, src_fps: Fraction, fps: Fraction, first: int, last: int,
+                threads: int, out: Path, profile: str = "final", prescaled: bool = False):
+    """Encode output frames [first, last) of the reel, video only, on the reel's global timeline."""
+    prof = RENDER_PROFILES[profile]
+    t0 = first / fps
+    seg_dur = (last - first) / fps
+    # Seek half a source frame early: accurate seek then keeps the frame at t0 onwards
+    seek = float(bg_offset + t0 - Fraction(1, 2) / src_fps) if first else bg_offset
+    bg_seek = ["-ss", f"{seek:.6f}"] if seek > 0 else []
+    ff_inputs = [*bg_seek, "-t", f"{float(seg_dur + 1 / fps):.6f}", "-i", str(video_mp4)]
+    png_rate = ["-framerate", str(prof["fps"])] if prof["fps"] else []
+    for png in overlay_pngs:
+        ff_inputs += _still_input(png, prescaled, f"{float(seg_dur + 1 / fps):.6f}", png_rate)
+    # Overlay indices shift down by one: no audio input in a segment render
+    seg_overlays = {spk: idx - 1 for spk, idx in overlay_inputs.items()}
+    fc, label = build_filter_graph(sentence_map, seg_overlays, subs_ass, fonts_dir,
+                                   pts_offset=f"{t0.numerator}/{t0.denominator}", profile=profile,
+                                   prescaled=prescaled)
+    return [
+        "ffmpeg", "-y", "-loglevel", "error",
+        *ff_inputs,
+        "-filter_complex", fc,
+        "-map", f"[{label}]",
+        # setpts leaves the frame rate unset; pin it to the background's
+        "-r", f"{fps.numerator}/{fps.denominator}", "-frames:v", str(last - first),
+        "-c:v", "libx264", "-preset", prof["preset"], "-crf", str(prof["crf"]),
+        *ffmpeg_thread_args(threads),
+        "-an", str(out),
+    ]
+
+def mux_cmd(concat_list: Path, audio_wav: Path, output_mp4: Path, profile: str = "final"):
+    """Join encoded segments without re-encoding and encode the audio once."""
+    prof = RENDER_PROFILES[profile]
+    return [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", str(concat_list),
+        "-i", str(audio_wav),
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-af", LOUDNORM,
+        "-c:v", "copy",
+        "-c:a", "aac", "-b:a", prof["audio_bitrate"], "-ar", "48000", "-ac", "2",
+        "-movflags", "+faststart",
+        "-shortest",
+        str(output_mp4)
+    ]
+
+def render_segmented(video_mp4: Path, audio_wav: Path, subs_ass: Path, sentence_map, overlay_inputs,
+                     overlay_pngs, fonts_dir, output_mp4: Path, dur: float, bg_offset: float,
+                     jobs: int, env=None, profile: str = "final", prescaled: bool = False):
+    """Render keyframe-aligned segments in parallel processes, then concat and mux audio."""
+    src_fps = _probe_frame_rate(video_mp4)
+    fps = Fraction(RENDER_PROFILES[profile]["fps"] or src_fps)
+    # Same frame count the single-pass `-t dur` input trim yields
+    total_frames = math.ceil(dur * fps - 1e-6)
+    segments = plan_segments(total_frames, fps, jobs)
+    # Split the planner's budget (or the whole machine) between concurrent segments
+    threads = max(1, (planned_threads() or os.cpu_count() or 1) // len(segments))
+    print(f"🔨  Segmented render: {len(segments)} segments × {threads} threads, {total_frames} frames")
+
+    with tempfile.TemporaryDirectory(dir=output_mp4.parent) as tmp:
+        tmp = Path(tmp)
+        outs = [tmp / f"seg_{k:04d}.mp4" for k in range(len(segments))]
+        cmds = [segment_cmd(video_mp4, bg_offset, overlay_pngs, sentence_map, overlay_inputs, subs_ass,
+                            fonts_dir, src_fps, fps, first, last, threads, out, profile, prescaled)
+                for (first, last), out in zip(segments, outs)]
+        with ThreadPoolExecutor(max_workers=len(cmds)) as pool:
+            list(pool.map(lambda kc: run_ffmpeg(kc[1], f"assemble.segment{kc[0]}", env), enumerate(cmds)))
+
+        concat_list = tmp / "segments.txt"
+        concat_list.write_text("".join(f"file '{o.as_posix()}'\n" for o in outs))
+        cmd = mux_cmd(concat_list, audio_wav, output_mp4, profile)
+        print("🔨  FFmpeg:", " ".join(cmd))
+        run_ffmpeg(cmd, "assemble.mux")
+
 def assemble_reel(
     video_mp4: Path,
     audio_wav: Path,
@@ -21,7 +360,30 @@ def assemble_reel(
     _script_json: Path,
     images_dir: Path,
     output_mp4: Path,
+    fonts_dir: Path | None = FONTS_DIR,
+    bg_offset: float = 0.0,
+    jobs: int = 1,
+    profile: str = "final",
+    renditions=None,
+    backend: str = "ffmpeg",
+    overlay_cache: bool = True,
 ):
+    """Burn subtitles and speaker overlays onto the background and mux the final audio.
+
+    bg_offset seeks into the background before decoding; with a background
+    library segment (see background_library.pick_background) it is keyframe aligned.
+    jobs > 1 renders GOP-aligned segments in parallel processes and joins them
+    with the concat demuxer; the frames match the single-pass render.
+    profile="draft" renders a quick 540x960 preview from the same inputs (see
+    RENDER_PROFILES). renditions ({path: name or dict}, see RENDITIONS) adds
+    outputs to the same single-pass graph; only their encoders differ.
+    backend="pyav" renders in-process with av_render instead of the ffmpeg CLI
+    (single pass, no renditions). overlay_cache feeds the CLI graph pre-scaled
+    speaker images from overlay_cache instead of looping the
+    full-size PNGs.
+    """
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile {profile!r}; choose from {sorted(RENDER_PROFILES)}")
     sentence_map = json.loads(sentence_map_json.read_text())
 
     # keep discovery order
@@ -30,66 +392,87 @@ def assemble_reel(
         if e["speaker"] not in unique_speakers:
             unique_speakers.append(e["speaker"])
 
-    ff_inputs = ["-i", str(video_mp4), "-i", str(audio_wav)]
-    dur = _probe_duration(video_mp4)
+    if backend == "pyav":
+        if jobs > 1 or renditions:
+            raise ValueError("the pyav backend renders a single pass without renditions")
+        from pipeline_modules.av_render import render_reel
+
+        overlay_pngs = {}
+        for spk in unique_speakers:
+            img = images_dir / f"{spk}.png"
+            if img.exists():
+                overlay_pngs[spk] = img
+            else:
+                print(f"⚠️  PNG missing for {spk}, overlay skipped")
+        frames = render_reel(video_mp4, audio_wav, subs_ass, sentence_map, overlay_pngs, output_mp4,
+                             _bundled_fonts_dir(fonts_dir), bg_offset, profile)
+        print(f"✅ Reel saved → {output_mp4} ({frames} frames, pyav)")
+        return
+    if backend != "ffmpeg":
+        raise ValueError(f"Unknown backend {backend!r}; use 'ffmpeg' or 'pyav'")
 
+    # The reel is as long as its audio: decode only that much background and
+    # never loop stills for the whole background
+    dur = _probe_duration(audio_wav)
+    bg_seek = ["-ss", f"{bg_offset:.3f}"] if bg_offset > 0 else []
+    ff_inputs = [*bg_seek, "-t", f"{dur:.3f}", "-i", str(video_mp4), "-i", str(audio_wav)]
+
+    # Looped stills are decoded once per frame (draft: at the draft rate); cached
+    # overlay assets are a single pre-scaled frame
+    fps = RENDER_PROFILES[profile]["fps"]
+    png_rate = ["-framerate", str(fps)] if fps else []
+    overlay_inputs = {}
+    overlay_pngs = []
     for spk in unique_speakers:
         img = images_dir / f"{spk}.png"
         if img.exists():
-            ff_inputs += ["-loop", "1", "-t", str(dur), "-i", str(img)]
+            if overlay_cache:
+                img = overlay_asset(img, overlay_scale(profile))
+            overlay_inputs[spk] = 2 + len(overlay_inputs)
+            overlay_pngs.append(img)
+            ff_inputs += _still_input(img, overlay_cache, f"{dur:.3f}", png_rate)
         else:
             print(f"⚠️  PNG missing for {spk}, overlay skipped")
 
-    # 0:v = bg video → burn subs → label [base]
-    fc_parts = [
-        f"[0:v]subtitles={subs_ass}[base]"
-    ]
-    last_label = "base"
-
-    for idx, e in enumerate(sentence_map):
-        spk       = e["speaker"]
-        start,end = e["start"], e["end"]
-        if spk not in unique_speakers:
-            continue
-
-        inp   = 2 + unique_speakers.index(spk)       # PNG input index
-        sideL = spk.lower() in LEFT_SPKRS
-        x_pos = "15" if sideL else "main_w-overlay_w-20"
-        label_scale = f"s{idx}"                      # unique
-        label_out   = f"v{idx}"
+    fonts_dir = _bundled_fonts_dir(fonts_dir)
+    env = None
+    if fonts_dir and (fonts_dir / "fonts.conf").exists():
+        # Restrict fontconfig to the bundled fonts so libass skips the system font scan
+        env = os.environ.copy()
+        env["FONTCONFIG_FILE"] = str(fonts_dir / "fonts.conf")
 
-        fc_parts.append(
-            f"[{inp}:v]scale=iw*0.20:-1[{label_scale}];"
-            f"[{last_label}][{label_scale}]overlay="
-            f"x={x_pos}:y=H-h-{BOTTOM_MARGIN}:enable='between(t,{start},{end})'"
-            f"[{label_out}]"
-        )
-        last_label = label_out
-
-    cmd = [
-        "ffmpeg", "-y",
-        *ff_inputs,
-        "-filter_complex", ";".join(fc_parts),
-        "-map", f"[{last_label}]",
-        "-map", "1:a:0",
-        # Apply integrated loudness normalisation
-        "-af", "loudnorm=I=-14:TP=-1.0:LRA=11",
-        "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-        # Ensure audio is broadly compatible (48 kHz stereo AAC)
-        "-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-ac", "2",
-        # Make the MP4 start quickly when streamed
-        "-movflags", "+faststart",
-        "-shortest",
-        str(output_mp4)
-    ]
+    if renditions and jobs > 1:
+        raise ValueError("renditions are produced from a single-pass graph; use jobs=1")
+    if jobs > 1:
+        render_segmented(video_mp4, audio_wav, subs_ass, sentence_map, overlay_inputs, overlay_pngs,
+                         fonts_dir, output_mp4, dur, bg_offset, jobs, env, profile, overlay_cache)
+        print(f"✅ Reel saved → {output_mp4}")
+        return
 
+    filter_complex, last_label = build_filter_graph(sentence_map, overlay_inputs, subs_ass, fonts_dir,
+                                                    profile=profile, prescaled=overlay_cache)
+    if renditions:
+        prof = RENDER_PROFILES[profile]
+        outputs = {output_mp4: resolve_rendition(
+            {k: prof[k] for k in ("preset", "crf", "audio_bitrate")})}
+        outputs.update({Path(p): resolve_rendition(spec) for p, spec in renditions.items()})
+        cmd = multi_encode_cmd(ff_inputs, filter_complex, last_label, outputs)
+    else:
+        cmd = encode_cmd(ff_inputs, filter_complex, last_label, output_mp4, profile)
     print("🔨  FFmpeg:", " ".join(cmd))
-    subprocess.run(cmd, check=True)
+    run_ffmpeg(cmd, f"assemble.{profile}", env)
     print(f"✅ Reel saved → {output_mp4}")
+    for p in renditions or ():
+        print(f"✅ Rendition saved → {p}")
 
 if __name__ == "__main__":
     BASE_DIR = Path(__file__).parent.parent.resolve()
 
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profile", choices=sorted(RENDER_PROFILES), default="final")
+    ap.add_argument("--jobs", type=int, default=1, help="parallel segment renders (1 = single pass)")
+    args = ap.parse_args()
+
     assemble_reel(
         video_mp4 = BASE_DIR / "data/backgrounds/bg_full.mp4",
         audio_wav = BASE_DIR / "data/final/preview_audio.wav",
@@ -97,5 +480,7 @@ if __name__ == "__main__":
         sentence_map_json = BASE_DIR / "data/final/sentence_map.json",
         _script_json = BASE_DIR / "data/scripts/bluetooth.json",  # You can change this if needed
         images_dir = BASE_DIR / "data/images",
-        output_mp4 = BASE_DIR / "data/final/reel_final.mp4"
-    )
\ No newline at end of file
+        output_mp4 = BASE_DIR / f"data/final/reel_{args.profile}.mp4",
+        jobs = args.jobs,
+        profile = args.profile,
+    )
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+In-process PyAV render backend for assemble_reel.
+
+The background is decoded and pushed through a libavfilter graph (timestamp
+reset, draft fps/scale, libass burn-in), speaker PNGs are pre-scaled once and
+alpha-blended straight into the YUV planes with NumPy using per-frame
+visibility masks precomputed from sentence_map, and video and audio are
+encoded without forking ffmpeg/ffprobe.
+
+Subtitle burn-in needs a libavfilter built with libass. The PyPI `av` wheels
+ship without it, so install PyAV against a system FFmpeg that has libass
+(`pip install av --no-binary av`) to use this backend with subtitles.
+"""
+import math
+from fractions import Fraction
+from pathlib import Path
+
+import av
+import numpy as np
+
+from pipeline_modules.assemble_reel import (
+    BOTTOM_MARGIN, LEFT_SPKRS, LOUDNORM, OVERLAY_SCALE, REEL_WIDTH, RENDER_PROFILES, speaker_ranges,
+)
+from pipeline_modules.resource_planner import planned_threads
+
+def has_libass() -> bool:
+    return "subtitles" in av.filter.filters_available
+
+def probe_duration(path: Path) -> float:
+    with av.open(str(path)) as c:
+        return c.duration / av.time_base
+
+def visibility_masks(sentence_map, speakers, n_frames: int, fps) -> np.ndarray:
+    """Bool array [speaker, frame]: True where the CLI overlay's enable expression would be."""
+    t = np.arange(n_frames) / float(fps)
+    ranges = speaker_ranges(sentence_map)
+    masks = np.zeros((len(speakers), n_frames), dtype=bool)
+    for i, spk in enumerate(speakers):
+        for start, end in ranges.get(spk, ()):
+            masks[i] |= (t >= start) & (t <= end)
+    return masks
+
+def _plane(frame, i) -> np.ndarray:
+    """Writable (height, width) view of plane i, honouring its line size."""
+    p = frame.planes[i]
+    return np.frombuffer(p, np.uint8).reshape(p.height, p.line_size)[:, :p.width]
+
+class Overlay:
+    """A speaker PNG scaled once and split into premultiplied YUV planes for blending."""
+
+    def __init__(self, png: Path, scale: float, frame_w: int, frame_h: int, left: bool, k: float):
+        with av.open(str(png)) as c:
+            src = next(c.decode(video=0))
+        w = max(2, round(src.width * scale) // 2 * 2)
+        h = max(2, round(src.height * w / src.width) // 2 * 2)
+        yuva = src.reformat(width=w, height=h, format="yuva420p")
+        self.w, self.h = w, h
+        x = round(15 * k) if left else frame_w - w - round(20 * k)
+        y = frame_h - h - round(BOTTOM_MARGIN * k)
+        # Chroma is subsampled 2x2, so keep the position on even pixels
+        self.x, self.y = max(0, x) // 2 * 2, max(0, y) // 2 * 2
+
+        alpha = _plane(yuva, 3).astype(np.uint16)
+        alpha_c = alpha.reshape(h // 2, 2, w // 2, 2).mean(axis=(1, 3)).round().astype(np.uint16)
+        self.planes = []
+        for i, a in ((0, alpha), (1, alpha_c), (2, alpha_c)):
+            self.planes.append((255 - a, _plane(yuva, i).astype(np.uint16) * a))
+
+    def blend(self, frame):
+        for i, (inv, pre) in enumerate(self.planes):
+            sub = 1 if i == 0 else 2
+            x, y = self.x // sub, self.y // sub
+            roi = _plane(frame, i)[y:y + pre.shape[0], x:x + pre.shape[1]]
+            acc = roi * inv[:roi.shape[0], :roi.shape[1]] + pre[:roi.shape[0], :roi.shape[1]] + 128
+            roi[:] = (acc + (acc >> 8)) >> 8  # exact rounding of acc / 255
+
+def _video_graph(stream, size, fps, subs_ass, fonts_dir):
+    graph = av.filter.Graph()
+    nodes = [graph.add_buffer(template=stream), graph.add("setpts", "PTS-STARTPTS")]
+    if fps:
+        nodes.append(graph.add("fps", str(fps)))
+    if size:
+        nodes.append(graph.add("scale", f"{size[0]}:{size[1]}"))
+    if subs_ass is not None:
+        opts = {"filename": str(subs_ass)}
+        if fonts_dir:
+            opts["fontsdir"] = str(fonts_dir)
+        nodes.append(graph.add("subtitles", **opts))
+    nodes += [graph.add("format", "yuv420p"), graph.add("buffersink")]
+    graph.link_nodes(*nodes).configure()
+    return graph
+
+def _audio_graph(stream):
+    graph = av.filter.Graph()
+    graph.link_nodes(
+        graph.add_abuffer(template=stream),
+        graph.add("loudnorm", LOUDNORM.split("=", 1)[1]),
+        graph.add("aresample", "48000"),
+        graph.add("aformat", "sample_fmts=fltp:channel_layouts=stereo"),
+        graph.add("abuffersink"),
+    ).configure()
+    return graph
+
+def _drain(graph):
+    while True:
+        try:
+            yield graph.pull()
+        except (av.error.BlockingIOError, av.error.EOFError):
+            return
+
+def render_reel(video_mp4: Path, audio_wav: Path, subs_ass, sentence_map, overlay_pngs, output_mp4: Path,
+                fonts_dir=None, bg_offset: float = 0.0, profile: str = "final", progress=None):
+    """Render the reel in-process; overlay_pngs maps speaker -> PNG path.
+
+    subs_ass=None skips subtitle burn-in. progress, if given, is called as
+    progress(frames_done, frames_total) after every encoded frame.
+    """
+    if subs_ass is not None and not has_libass():
+        raise RuntimeError("PyAV's libavfilter has no 'subtitles' filter (built without libass); "
+                           "reinstall av against an FFmpeg with libass or use backend='ffmpeg'")
+    prof = RENDER_PROFILES[profile]
+    dur = probe_duration(audio_wav)
+
+    with av.open(str(video_mp4)) as bg, av.open(str(audio_wav)) as aud, \
+            av.open(str(output_mp4), "w", options={"movflags": "+faststart"}) as out:
+        v_in = bg.streams.video[0]
+        v_in.thread_type = "AUTO"
+        fps = Fraction(prof["fps"] or v_in.average_rate)
+        width, height = prof["size"] or (v_in.codec_context.width, v_in.codec_context.height)
+        n_frames = math.ceil(dur * fps - 1e-6)
+
+        k = width / REEL_WIDTH
+        speakers = list(overlay_pngs)
+        overlays = [Overlay(overlay_pngs[s], OVERLAY_SCALE * k, width, height, s.lower() in LEFT_SPKRS, k)
+                    for s in speakers]
+        masks = visibility_masks(sentence_map, speakers, n_frames, fps)
+
+        v_out = out.add_stream("libx264", rate=fps)
+        v_out.width, v_out.height, v_out.pix_fmt = width, height, "yuv420p"
+        v_out.options = {"preset": prof["preset"], "crf": str(prof["crf"])}
+        if planned_threads():
+            v_out.thread_count = planned_threads()
+        a_out = out.add_stream("aac", rate=48000)
+        a_out.layout = "stereo"
+        a_out.bit_rate = int(prof["audio_bitrate"].rstrip("k")) * 1000
+
+        graph = _video_graph(v_in, prof["size"], prof["fps"], subs_ass, fonts_dir)
+        if bg_offset > 0:
+            bg.seek(int(bg_offset / v_in.time_base), stream=v_in)
+        skip_before = bg_offset - 0.5 / float(v_in.average_rate)
+
+        done = 0
+
+        def emit(frames):
+            nonlocal done
+            for f in frames:
+                if done >= n_frames:
+                    return
+                if masks[:, done].any():
+                    # Decoded frames can share buffers with the decoder's references
+                    f.make_writable()
+                    for ov, visible in zip(overlays, masks[:, done]):
+                        if visible:
+                            ov.blend(f)
+                f.pts, f.time_base = done, 1 / fps
+                out.mux(v_out.encode(f))
+                done += 1
+                if progress:
+                    progress(done, n_frames)
+
+        for frame in bg.decode(v_in):
+            if frame.time is not None and frame.time < skip_before:
+                continue
+            graph.push(frame)
+            emit(_drain(graph))
+            if done >= n_frames:
+                break
+        else:
+            # Background ran out first: flush frames held back by fps/subtitles
+            graph.push(None)
+            emit(_drain(graph))
+        out.mux(v_out.encode())
+
+        a_in = aud.streams.audio[0]
+        agraph = _audio_graph(a_in)
+        for frame in aud.decode(a_in):
+            agraph.push(frame)
+            for f in _drain(agraph):
+                out.mux(a_out.encode(f))
+        agraph.push(None)
+        for f in _drain(agraph):
+            out.mux(a_out.encode(f))
+        out.mux(a_out.encode())
+    return done
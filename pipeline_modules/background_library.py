@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Background clip library.
+
+Source footage is transcoded once, offline, into 1080x1920 mezzanine segments
+at the reel frame rate with a keyframe every GOP_SECONDS. index.json records
+each segment's duration and detected scene cuts. At render time
+pick_background() returns a segment plus a keyframe-aligned offset, so
+assemble_reel seeks straight to it, decodes only what the reel uses and never
+rescales. Offsets are taken from the first keyframe after a scene cut when
+one leaves room for the reel, so the background opens on a fresh shot rather
+than mid-shot.
+
+Usage:
+  python -m pipeline_modules.background_library ingest <video> [<video> ...]
+  python -m pipeline_modules.background_library pick <duration_seconds>
+"""
+import argparse
+import json
+import math
+import random
+import re
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+LIBRARY_DIR = BASE_DIR / "data" / "backgrounds" / "library"
+INDEX_NAME = "index.json"
+
+TARGET_W, TARGET_H = 1080, 1920
+TARGET_FPS = 30
+GOP_SECONDS = 2          # fixed keyframe interval; render-time seeks land on these
+SEGMENT_SECONDS = 120    # must be a multiple of GOP_SECONDS
+SCENE_THRESHOLD = 0.35   # ffmpeg scene score above which a frame counts as a cut
+INDEX_VERSION = 1
+
+_PTS_TIME = re.compile(r"pts_time:([0-9.]+)")
+
+def _probe_duration(path: Path) -> float:
+    out = subprocess.check_output(
+        ["ffprobe", "-v", "error", "-show_entries",
+         "format=duration", "-of", "default=nw=1:nk=1", str(path)]
+    )
+    return float(out.strip())
+
+def load_index(library_dir: Path = LIBRARY_DIR) -> dict:
+    path = library_dir / INDEX_NAME
+    if not path.exists():
+        return {"version": INDEX_VERSION, "width": TARGET_W, "height": TARGET_H,
+                "fps": TARGET_FPS, "gop_seconds": GOP_SECONDS, "sources": {}, "segments": []}
+    return json.loads(path.read_text())
+
+def save_index(index: dict, library_dir: Path = LIBRARY_DIR) -> None:
+    library_dir.mkdir(parents=True, exist_ok=True)
+    tmp = library_dir / f"{INDEX_NAME}.tmp"
+    tmp.write_text(json.dumps(index, indent=2))
+    tmp.replace(library_dir / INDEX_NAME)
+
+def _source_key(src: Path) -> str:
+    st = src.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def detect_scene_cuts(video: Path, threshold: float = SCENE_THRESHOLD):
+    """Return timestamps (s) of frames whose scene-change score exceeds threshold."""
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", str(video), "-an",
+         "-vf", f"select='gt(scene,{threshold})',showinfo", "-f", "null", "-"],
+        capture_output=True, text=True, check=True,
+    )
+    return [round(float(t), 3) for t in _PTS_TIME.findall(proc.stderr)]
+
+def transcode_to_segments(src: Path, out_dir: Path, fps: int = TARGET_FPS,
+                          gop_seconds: int = GOP_SECONDS, segment_seconds: int = SEGMENT_SECONDS):
+    """Scale/crop src to 1080x1920 at a fixed fps and GOP, split at keyframes into segments."""
+    if segment_seconds % gop_seconds:
+        raise ValueError("segment_seconds must be a multiple of gop_seconds")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    gop = fps * gop_seconds
+    pattern = out_dir / f"{src.stem}_%04d.mp4"
+    cmd = [
+        "ffmpeg", "-y", "-i", str(src), "-an",
+        "-vf", (f"scale={TARGET_W}:{TARGET_H}:force_original_aspect_ratio=increase,"
+                f"crop={TARGET_W}:{TARGET_H},fps={fps},setsar=1,format=yuv420p"),
+        "-c:v", "libx264", "-preset", "slow", "-crf", "18",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-force_key_frames", f"expr:gte(t,n_forced*{gop_seconds})",
+        # Keyframes only exist every GOP, so a half-GOP delta absorbs the B-frame
+        # pts delay without ever cutting at the wrong keyframe
+        "-f", "segment", "-segment_time", str(segment_seconds), "-segment_time_delta", f"{gop_seconds / 2}",
+        "-reset_timestamps", "1", "-segment_format_options", "movflags=+faststart",
+        str(pattern),
+    ]
+    print("🔨  FFmpeg:", " ".join(cmd))
+    subprocess.run(cmd, check=True)
+    return sorted(out_dir.glob(f"{src.stem}_*.mp4"))
+
+def ingest(sources, library_dir: Path = LIBRARY_DIR, fps: int = TARGET_FPS,
+           gop_seconds: int = GOP_SECONDS, segment_seconds: int = SEGMENT_SECONDS,
+           force: bool = False) -> dict:
+    """Transcode local source videos into the library once and update its index."""
+    index = load_index(library_dir)
+    if index.get("fps") != fps or index.get("gop_seconds") != gop_seconds:
+        if index["segments"]:
+            raise ValueError(f"Library at {library_dir} was built with fps={index.get('fps')}, "
+                             f"gop={index.get('gop_seconds')}s; ingest into a separate directory")
+        index.update({"fps": fps, "gop_seconds": gop_seconds})
+
+    for src in map(Path, sources):
+        if not src.exists():
+            print(f"⚠️  Source not found, skipped: {src}")
+            continue
+        key = _source_key(src)
+        if not force and index["sources"].get(src.name) == key:
+            print(f"⏩ Already ingested: {src.name}")
+            continue
+
+        seg_dir = library_dir / src.stem
+        for old in seg_dir.glob(f"{src.stem}_*.mp4"):
+            old.unlink()
+        index["segments"] = [s for s in index["segments"] if s["source"] != src.name]
+
+        for seg in transcode_to_segments(src, seg_dir, fps, gop_seconds, segment_seconds):
+            entry = {
+                "file": seg.relative_to(library_dir).as_posix(),
+                "source": src.name,
+                "duration": round(_probe_duration(seg), 3),
+                "scene_cuts": detect_scene_cuts(seg),
+            }
+            index["segments"].append(entry)
+            print(f"✅ {entry['file']}: {entry['duration']:.1f}s, {len(entry['scene_cuts'])} scene cuts")
+        index["sources"][src.name] = key
+        save_index(index, library_dir)
+    return index
+
+def pick_background(duration: float, library_dir: Path = LIBRARY_DIR, rng=None):
+    """Return (segment path, keyframe-aligned start offset) covering duration, or None.
+
+    Offsets are multiples of the library GOP, so an input-side -ss lands on a
+    keyframe and nothing before it is decoded. Starts right after a scene cut
+    are preferred; segments without a usable cut fall back to any GOP offset.
+    """
+    index = load_index(library_dir)
+    rng = rng or random.Random()
+    gop = float(index.get("gop_seconds", GOP_SECONDS))
+    fits = [s for s in index["segments"] if s["duration"] >= duration]
+    if not fits:
+        return None
+    cut_starts = [(seg, start) for seg in fits for start in scene_starts(seg, duration, gop)]
+    if cut_starts:
+        seg, offset = rng.choice(cut_starts)
+        return library_dir / seg["file"], offset
+    seg = rng.choice(fits)
+    slots = int((seg["duration"] - duration) // gop)
+    offset = rng.randint(0, slots) * gop if slots > 0 else 0.0
+    return library_dir / seg["file"], float(offset)
+
+def scene_starts(seg: dict, duration: float, gop: float = GOP_SECONDS):
+    """Keyframe offsets at or just after each scene cut that leave duration seconds of segment."""
+    starts = {0.0} if seg["scene_cuts"][:1] == [0.0] else set()
+    for cut in seg["scene_cuts"]:
+        start = math.ceil(round(cut / gop, 6)) * gop
+        if start + duration <= seg["duration"]:
+            starts.add(float(start))
+    return sorted(starts)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_ing = sub.add_parser("ingest", help="transcode local videos into the library")
+    p_ing.add_argument("sources", nargs="+", type=Path)
+    p_ing.add_argument("--library", type=Path, default=LIBRARY_DIR)
+    p_ing.add_argument("--fps", type=int, default=TARGET_FPS)
+    p_ing.add_argument("--gop-seconds", type=int, default=GOP_SECONDS)
+    p_ing.add_argument("--segment-seconds", type=int, default=SEGMENT_SECONDS)
+    p_ing.add_argument("--force", action="store_true", help="re-ingest sources already in the index")
+    p_pick = sub.add_parser("pick", help="print a segment and offset for a reel length")
+    p_pick.add_argument("duration", type=float)
+    p_pick.add_argument("--library", type=Path, default=LIBRARY_DIR)
+    args = ap.parse_args()
+
+    if args.cmd == "ingest":
+        ingest(args.sources, args.library, args.fps, args.gop_seconds, args.segment_seconds, args.force)
+    else:
+        picked = pick_background(args.duration, args.library)
+        print("No segment long enough" if picked is None else f"{picked[0]} @ {picked[1]:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import sys
-import subprocess
 from pathlib import Path
 
+from pipeline_modules.ffmpeg_progress import run_ffmpeg
+
 try:
     from pydub import AudioSegment
 except ImportError:
@@ -37,7 +38,7 @@ def combine_wavs(input_dir: Path, output_path: Path, speed: float = 1.05):
         "-c:a", "pcm_s16le",
         str(output_path)
     ]
-    subprocess.run(cmd, check=True)
+    run_ffmpeg(cmd, "combine_audio")
 
     # Remove temp
     temp_path.unlink()
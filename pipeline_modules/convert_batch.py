@@ -8,6 +8,11 @@ import soundfile as sf
 import gc
 from rvc.modules.vc.modules import VC
 
+from pipeline_modules.logkit import span
+from pipeline_modules.quantize import cached_quantized, check_precision
+from pipeline_modules.resource_planner import apply_stage_plan
+from pipeline_modules.rvc_export import load_exported, warm_start
+
 logging.basicConfig(level=logging.INFO)
 
 BASE_DIR     = Path(__file__).parent.parent.resolve()
@@ -21,6 +26,10 @@ F0_METHOD    = os.getenv("F0_METHOD", "rmvpe")   # best quality; keep by default
 RESAMPLE_SR  = int(os.getenv("RVC_RESAMPLE_SR", "0"))   # 0 = keep original SR for quality
 PER_FILE_GC  = True
 SKIP_IF_EXISTS = os.getenv("SKIP_IF_EXISTS", "1") == "1"  # skip already-converted clips
+# int8 = dynamic int8 HuBERT and synthesiser Linear/LSTM layers (see pipeline_modules/quantize.py)
+RVC_PRECISION = check_precision(os.getenv("RVC_PRECISION", "fp32"), "RVC_PRECISION")
+# Load weights/<speaker>/<speaker>.<precision>.ts.pt (see pipeline_modules/rvc_export.py) when present
+USE_EXPORTED = os.getenv("RVC_EXPORTED", "1") == "1"
 
 def get_speaker_name(fp: Path) -> str:
     # filename must be <index>_<Speaker>.wav
@@ -50,9 +59,36 @@ def load_model(speaker: str) -> VC:
     pth, idx = validate_model(speaker)
     logging.info(f"🧠 Loading RVC model for {speaker}")
     vc = VC()
+    exported = load_exported(pth, RVC_PRECISION) if USE_EXPORTED else None
+    if exported is not None:
+        warm_start(vc, exported)
+        logging.info(f"⚡ Using exported {RVC_PRECISION} synthesiser for {speaker}")
+        if RVC_PRECISION == "int8":
+            quantize_hubert(vc)
+        return vc
     vc.get_vc(str(pth))   # loads model
+    if RVC_PRECISION == "int8":
+        quantize_vc(vc, speaker, pth)
     return vc
 
+def quantize_vc(vc: VC, speaker: str, pth: Path):
+    """Swap the loaded synthesiser and HuBERT for cached dynamic-int8 versions."""
+    vc.net_g = cached_quantized(vc.net_g, f"rvc_{speaker.lower()}", pth)
+    quantize_hubert(vc)
+    logging.info(f"🧮 Using int8 RVC weights for {speaker}")
+
+def quantize_hubert(vc: VC):
+    hubert_path = Path(os.getenv("hubert_path", BASE_DIR / "assets/hubert/hubert_base.pt"))
+    if not hubert_path.exists():
+        logging.warning(f"⚠️ HuBERT not found at {hubert_path}; only the synthesiser is quantised")
+    else:
+        if vc.hubert_model is None:
+            # VC loads HuBERT lazily on first inference; load it now so it can be swapped too
+            from fairseq import checkpoint_utils
+            models, _, _ = checkpoint_utils.load_model_ensemble_and_task([str(hubert_path)], suffix="")
+            vc.hubert_model = models[0].float().eval()
+        vc.hubert_model = cached_quantized(vc.hubert_model, "hubert", hubert_path)
+
 def convert(vc: VC, file_path: Path, output_path: Path):
     speaker = get_speaker_name(file_path)
     idx_file = INDEX_DIR / f"{speaker.lower()}.index" if USE_INDEX else None
@@ -64,7 +100,7 @@ def convert(vc: VC, file_path: Path, output_path: Path):
     index_file  = str(idx_file) if idx_file and idx_file.exists() else None
 
     try:
-        with torch.inference_mode():
+        with span("rvc.infer", file=file_path.name), torch.inference_mode():
             tgt_sr, audio_opt, _, err = vc.vc_inference(
                 sid=0,
                 input_audio_path=str(file_path),
@@ -89,7 +125,8 @@ def convert(vc: VC, file_path: Path, output_path: Path):
         return
 
     try:
-        sf.write(str(output_path), audio_opt, tgt_sr)
+        with span("rvc.write", file=output_path.name):
+            sf.write(str(output_path), audio_opt, tgt_sr)
         logging.info(f"✅ Saved: {output_path}")
     finally:
         if PER_FILE_GC:
@@ -108,6 +145,8 @@ def convert(vc: VC, file_path: Path, output_path: Path):
                 pass
 
 def batch_convert():
+    # Pin to the resource planner's CPU slice and size torch to it (no-op when unplanned)
+    apply_stage_plan()
     logging.info(f"🔍 Scanning base files in {INPUT_DIR}")
     speaker_to_files = {}
     for fp in sorted(INPUT_DIR.rglob("*.wav")):
@@ -116,7 +155,8 @@ def batch_convert():
 
     for speaker, files in speaker_to_files.items():
         logging.info(f"\n🎤 *** Speaker: {speaker} ({len(files)} clips) ***")
-        vc = load_model(speaker)
+        with span("rvc.load_model", speaker=speaker, precision=RVC_PRECISION):
+            vc = load_model(speaker)
         for fp in files:
             out_fp = OUTPUT_DIR / fp.name
             if SKIP_IF_EXISTS and out_fp.exists():
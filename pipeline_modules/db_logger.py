@@ -1,25 +1,142 @@
-import pandas as pd
-from pathlib import Path
+#!/usr/bin/env python3
+"""
+Append-only content log: one JSON object per event in data/logs/content_log.jsonl.
+
+init_log/log_event/save_log keep their old call pattern (log = log_event(log, ...)),
+but log_event only buffers the event, so logging costs the same however large
+the log is. Buffered events are written in one append and fsynced every
+FLUSH_EVENTS events or FLUSH_SECONDS, on save_log() and at exit. The file is
+never rewritten, so concurrent stages can append to the same log.
+
+A legacy content_log.csv next to the log is imported once and renamed to
+content_log.csv.migrated; passing the .csv path to init_log still works.
+
+Usage:
+  python -m pipeline_modules.db_logger report [--by account|status|topic|day] [--since 2025-01-01]
+  python -m pipeline_modules.db_logger export [--format csv|jsonl] [--out FILE] [--since ...] [--status ...]
+  python -m pipeline_modules.db_logger migrate [CSV]
+"""
+import argparse
+import atexit
+import csv
+import json
+import os
+import sys
+import time
+import weakref
 from datetime import datetime
+from pathlib import Path
 
-def init_log(filepath):
-    """Loads an existing log or creates a new Df with proper columns"""
-    if Path(filepath).exists():
-        return pd.read_csv(filepath)
-    else:
-        columns = [
-            'timestamp', 'account', 'topic', 'status', 'notes', 'input_tokens',
-            'output_tokens', 'total_tokens', 'estimated_cost_usd', 'estimated_cost_aud'
-        ]
-        return pd.DataFrame(columns=columns)
-    
-def log_event(df, account, topic, status, notes,
-              input_tokens=None, output_tokens=None, 
+COLUMNS = [
+    'timestamp', 'account', 'topic', 'status', 'notes', 'input_tokens',
+    'output_tokens', 'total_tokens', 'estimated_cost_usd', 'estimated_cost_aud'
+]
+NUMERIC = ('input_tokens', 'output_tokens', 'total_tokens', 'estimated_cost_usd', 'estimated_cost_aud')
+DEFAULT_LOG = Path(__file__).resolve().parent.parent / "data" / "logs" / "content_log.jsonl"
+FLUSH_EVENTS = int(os.environ.get("CONTENT_LOG_FLUSH_EVENTS", "50"))
+FLUSH_SECONDS = float(os.environ.get("CONTENT_LOG_FLUSH_SECONDS", "2"))
+
+_open_logs = weakref.WeakSet()
+
+class EventLog:
+    """Handle on the JSONL log: buffers new events and reads everything back on demand."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        _open_logs.add(self)
+
+    def append(self, event):
+        self.pending.append(event)
+        if len(self.pending) >= FLUSH_EVENTS or time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self.pending)
+        # One write on an O_APPEND descriptor, so appends from other processes never interleave mid-line
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.pending = []
+
+    def __iter__(self):
+        """Every event in order: what is on disk, then what is still buffered."""
+        yield from read_events(self.path)
+        yield from list(self.pending)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def total(self, column):
+        return sum(e.get(column) or 0 for e in self)
+
+@atexit.register
+def _flush_all():
+    for log in list(_open_logs):
+        try:
+            log.flush()
+        except OSError as e:
+            print(f"⚠️ Could not flush {log.path}: {e}", file=sys.stderr)
+
+def read_events(path):
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            if raw.strip():
+                try:
+                    yield json.loads(raw)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append; the rest is still good
+                    continue
+
+def _number(value, kind):
+    if value in (None, ""):
+        return None
+    try:
+        return kind(float(value))
+    except ValueError:
+        return None
+
+def migrate_csv(csv_path, log_path):
+    """Imports a legacy pandas-written CSV into the JSONL log; returns the number of events."""
+    csv_path = Path(csv_path)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    log = EventLog(log_path)
+    for row in rows:
+        event = {c: row.get(c) or None for c in COLUMNS}
+        event.update({c: _number(row.get(c), float if c.startswith("estimated") else int) for c in NUMERIC})
+        log.pending.append(event)
+    log.flush()
+    csv_path.rename(csv_path.with_name(csv_path.name + ".migrated"))
+    print(f"✅ Migrated {len(rows)} events from {csv_path.name} to {Path(log_path).name}")
+    return len(rows)
+
+def init_log(filepath=DEFAULT_LOG):
+    """Opens the event log at filepath (a .csv path means the .jsonl beside it), importing a legacy CSV once"""
+    path = Path(filepath)
+    legacy = path if path.suffix == ".csv" else path.with_suffix(".csv")
+    path = path.with_suffix(".jsonl")
+    if legacy.exists():
+        migrate_csv(legacy, path)
+    return EventLog(path)
+
+def log_event(log, account, topic, status, notes,
+              input_tokens=None, output_tokens=None,
               total_tokens=None, estimated_cost_usd=None, estimated_cost_aud=None):
     """
-    Appends a new row to the log DataFrame.
+    Appends a new event to the log (buffered; O(1)) and returns the log.
     """
-    new_row = {
+    log.append({
         'timestamp': datetime.now().isoformat(),
         'account': account,
         'topic': topic,
@@ -30,14 +147,91 @@ def log_event(df, account, topic, status, notes,
         'total_tokens': total_tokens,
         'estimated_cost_usd': estimated_cost_usd,
         'estimated_cost_aud': estimated_cost_aud
-    }
-    if df.empty:
-        df = pd.DataFrame([new_row])
-    else:
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    return df
+    })
+    return log
+
+def save_log(log, filepath=None):
+    """Writes and fsyncs any buffered events (filepath is accepted for the old call pattern)"""
+    log.flush()
 
+def select(events, since=None, until=None, status=None, account=None):
+    for e in events:
+        ts = e.get("timestamp") or ""
+        if since and ts < since:
+            continue
+        if until and ts >= until:
+            continue
+        if status and e.get("status") != status:
+            continue
+        if account and e.get("account") != account:
+            continue
+        yield e
+
+def report(events, by="account"):
+    """{group: {events, failed, tokens, cost_usd, cost_aud}}, one streaming pass over the log."""
+    groups = {}
+    for e in events:
+        key = (e.get("timestamp") or "")[:10] if by == "day" else e.get(by)
+        g = groups.setdefault(key or "-", {"events": 0, "failed": 0, "tokens": 0, "cost_usd": 0.0, "cost_aud": 0.0})
+        g["events"] += 1
+        g["failed"] += "fail" in str(e.get("status", "")).lower()
+        g["tokens"] += e.get("total_tokens") or 0
+        g["cost_usd"] += e.get("estimated_cost_usd") or 0
+        g["cost_aud"] += e.get("estimated_cost_aud") or 0
+    return groups
+
+def print_report(groups, by):
+    print(f"{by:<24}{'events':>8}{'failed':>8}{'tokens':>12}{'USD':>10}{'AUD':>10}")
+    totals = {"events": 0, "failed": 0, "tokens": 0, "cost_usd": 0.0, "cost_aud": 0.0}
+    for key in sorted(groups, key=str):
+        g = groups[key]
+        print(f"{str(key)[:23]:<24}{g['events']:>8}{g['failed']:>8}{g['tokens']:>12}"
+              f"{g['cost_usd']:>10.4f}{g['cost_aud']:>10.4f}")
+        for k in totals:
+            totals[k] += g[k]
+    print(f"{'total':<24}{totals['events']:>8}{totals['failed']:>8}{totals['tokens']:>12}"
+          f"{totals['cost_usd']:>10.4f}{totals['cost_aud']:>10.4f}")
+
+def export(events, out, fmt="csv"):
+    if fmt == "jsonl":
+        for e in events:
+            out.write(json.dumps(e, ensure_ascii=False) + "\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for e in events:
+        writer.writerow(e)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--log", type=Path, default=DEFAULT_LOG)
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name in ("report", "export"):
+        p = sub.add_parser(name)
+        p.add_argument("--since", help="ISO date/time, inclusive")
+        p.add_argument("--until", help="ISO date/time, exclusive")
+        p.add_argument("--status")
+        p.add_argument("--account")
+    sub.choices["report"].add_argument("--by", choices=["account", "status", "topic", "day"], default="account")
+    sub.choices["export"].add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    sub.choices["export"].add_argument("--out", type=Path, help="defaults to stdout")
+    sub.add_parser("migrate").add_argument("csv", type=Path, nargs="?", default=DEFAULT_LOG.with_suffix(".csv"))
+    args = ap.parse_args(argv)
+
+    if args.command == "migrate":
+        if not args.csv.exists():
+            sys.exit(f"❌ {args.csv} not found")
+        migrate_csv(args.csv, args.log)
+        return
+    log = init_log(args.log)
+    events = select(log, args.since, args.until, args.status, args.account)
+    if args.command == "report":
+        print_report(report(events, args.by), args.by)
+    elif args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            export(events, f, args.format)
+    else:
+        export(events, sys.stdout, args.format)
 
-def save_log(df, filepath):
-    """Saves the log DF to csv"""
-    df.to_csv(filepath, index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Run ffmpeg with machine-readable progress.
+
+run_ffmpeg() adds `-progress pipe:1 -nostats`, parses the key=value blocks
+ffmpeg writes to stdout (one per -stats_period), logs each as an
+"ffmpeg_progress" event (frame, fps, speed, out_time_s, bitrate_kbps) through
+logkit into data/logs/<run_id>.jsonl, and appends one summary row per render
+to data/logs/render_summary.csv so encode throughput can be compared across
+hosts and commits.
+"""
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pipeline_modules.logkit import DEFAULT_LOG_DIR, append_run_summary, current_run_id, run_logger, span
+
+RENDER_SUMMARY_CSV = DEFAULT_LOG_DIR / "render_summary.csv"
+
+SUMMARY_FIELDS = ("run_id", "ts", "host", "cpus", "stage", "output", "returncode", "wall_s",
+                  "frames", "avg_fps", "speed", "out_time_s", "bitrate_kbps", "total_size")
+
+_summary_lock = threading.Lock()  # segment renders finish concurrently
+
+def _number(value: str):
+    """Parse an ffmpeg progress value ("24.5", "1.23x", "512.0kbits/s", "N/A")."""
+    value = value.strip().rstrip("x")
+    if value.endswith("kbits/s"):
+        value = value[:-len("kbits/s")]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def parse_progress(lines):
+    """Yield one dict per ffmpeg -progress block (terminated by a progress= line)."""
+    block = {}
+    for line in lines:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        if key != "progress":
+            block[key] = value
+            continue
+        out_us = _number(block.get("out_time_us", "")) or _number(block.get("out_time_ms", ""))
+        yield {
+            "frame": int(_number(block.get("frame", "")) or 0),
+            "fps": _number(block.get("fps", "")),
+            "speed": _number(block.get("speed", "")),
+            "out_time_s": round(out_us / 1e6, 3) if out_us is not None else None,
+            "bitrate_kbps": _number(block.get("bitrate", "")),
+            "total_size": int(_number(block.get("total_size", "")) or 0),
+            "done": value == "end",
+        }
+        block = {}
+
+def with_progress(cmd):
+    """Insert the progress options right after the ffmpeg executable."""
+    return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+def run_ffmpeg(cmd, stage: str, env=None, summary_csv: Path = RENDER_SUMMARY_CSV) -> dict:
+    """Run an ffmpeg command like subprocess.run(check=True), logging progress and a summary.
+
+    Returns the summary row; raises CalledProcessError if ffmpeg fails (after
+    the failed render has been logged and summarised).
+    """
+    lg = run_logger()
+    extra = {"stage": stage, "run_id": current_run_id()}
+    output = str(cmd[-1])
+    t0 = time.perf_counter()
+    last = {}
+    lg.info("ffmpeg_start", extra={**extra, "output": output, "cmd": " ".join(map(str, cmd))})
+    with span(f"ffmpeg.{stage}", output=output) as s:
+        with subprocess.Popen(with_progress(cmd), stdout=subprocess.PIPE, text=True, env=env) as proc:
+            for event in parse_progress(proc.stdout):
+                last = event
+                lg.info("ffmpeg_progress", extra={**extra, **event})
+        s.set(returncode=proc.returncode, frames=last.get("frame", 0), speed=last.get("speed"))
+    wall = time.perf_counter() - t0
+
+    frames = last.get("frame", 0)
+    summary = {
+        "run_id": extra["run_id"],
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": socket.gethostname() or platform.node(),
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "stage": stage,
+        "output": output,
+        "returncode": proc.returncode,
+        "wall_s": round(wall, 3),
+        "frames": frames,
+        "avg_fps": round(frames / wall, 2) if wall > 0 else None,
+        "speed": last.get("speed"),
+        "out_time_s": last.get("out_time_s"),
+        "bitrate_kbps": last.get("bitrate_kbps"),
+        "total_size": last.get("total_size"),
+    }
+    summary = {k: summary[k] for k in SUMMARY_FIELDS}
+    # The run log has its own "ts" on every line, so the event carries the CSV's as finished_at
+    event = {("finished_at" if k == "ts" else k): v for k, v in summary.items()}
+    (lg.info if proc.returncode == 0 else lg.error)("ffmpeg_finish", extra={**extra, **event})
+    with _summary_lock:
+        append_run_summary(summary_csv, summary)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    rate = f"{summary['avg_fps']} fps, " if frames else ""
+    print(f"⏱️  {stage}: {wall:.1f}s ({rate}{summary['speed'] or '?'}x realtime)")
+    return summary
@@ -2,19 +2,82 @@ import json
 import re
 from pathlib import Path
 
-ASS_HEADER = """[Script Info]
+import numpy as np
+
+from pipeline_modules.timing_store import is_timing_dir, load_timing_artifacts
+
+ASS_HEADER_TEMPLATE = """[Script Info]
 ScriptType: v4.00+
 PlayResX: 1080
 PlayResY: 1920
 
 [V4+ Styles]
 Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,64,&H00FFFFFF,&H000000FF,&H00000000,&H64000000,1,0,0,0,100,100,0,0,1,2,0,2,10,10,1200,1
-
+{styles}
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
 
+KARAOKE_TAGS = {"karaoke": "k", "karaoke_fill": "kf"}
+SUBTITLE_MODES = ("highlight", *KARAOKE_TAGS)
+
+# One subtitle look. Per-account variants override any of these keys; colours are &HAABBGGRR.
+# In highlight mode the current word switches to `highlight`; in karaoke modes words start
+# in `primary` and turn `highlight` as they are spoken.
+DEFAULT_STYLE = {
+    "name": None,  # defaults to "Default" (highlight) or "Karaoke"
+    "mode": "highlight",
+    "font": "Arial",
+    "size": 64,
+    "primary": "&H00FFFFFF",
+    "secondary": "&H000000FF",
+    "highlight": "&H0000FF00",
+    "outline_colour": "&H00000000",
+    "back_colour": "&H64000000",
+    "bold": 1,
+    "outline": 2,
+    "shadow": 0,
+    "alignment": 2,
+    "margin_l": 10,
+    "margin_r": 10,
+    "margin_v": 1200,
+}
+
+# Tunables for timing feel
+LEAD_SEC = 0.04
+COMPRESS = 0.95
+COMMA_GAP = 0.16
+PUNCT_SHOW_CAP = 0.14
+SAFETY_MARGIN = 0.01
+SENTENCE_END_EPS = 0.04
+
+# Words processed per streaming step; rounded to a whole number of windows
+CHUNK_WORDS = 8192
+
+def resolve_style(style=None) -> dict:
+    out = dict(DEFAULT_STYLE)
+    out.update(style or {})
+    if out["mode"] not in SUBTITLE_MODES:
+        raise ValueError(f"Unknown subtitle mode {out['mode']!r}, expected one of {SUBTITLE_MODES}")
+    if not out["name"]:
+        out["name"] = "Default" if out["mode"] == "highlight" else "Karaoke"
+    return out
+
+def style_line(style: dict) -> str:
+    primary, secondary = style["primary"], style["secondary"]
+    if style["mode"] != "highlight":
+        # \\k fills from SecondaryColour to PrimaryColour
+        primary, secondary = style["highlight"], style["primary"]
+    return (f"Style: {style['name']},{style['font']},{style['size']},{primary},{secondary},"
+            f"{style['outline_colour']},{style['back_colour']},{style['bold']},0,0,0,100,100,0,0,1,"
+            f"{style['outline']},{style['shadow']},{style['alignment']},"
+            f"{style['margin_l']},{style['margin_r']},{style['margin_v']},1\n")
+
+def ass_header(style=None) -> str:
+    return ASS_HEADER_TEMPLATE.format(styles=style_line(resolve_style(style)))
+
+ASS_HEADER = ass_header()
+
 def seconds_to_ass(t: float) -> str:
     h = int(t // 3600)
     m = int((t % 3600) // 60)
@@ -22,54 +85,81 @@ def seconds_to_ass(t: float) -> str:
     cs = int((t - int(t)) * 100)
     return f"{h:d}:{m:02d}:{s:02d}.{cs:02d}"
 
-def build_ass_from_whisperx(word_json_path: Path, ass_out_path: Path, window_size: int = 4):
-    # Tunables for timing feel
-    LEAD_SEC = 0.04
-    COMPRESS = 0.95
-    COMMA_GAP = 0.16
-    FULLSTOP_GAP = 0.32
-    PUNCT_SHOW_CAP = 0.14
-    SAFETY_MARGIN = 0.01
+def ass_times(t):
+    """Vectorised seconds_to_ass for an array of times."""
+    t = np.asarray(t, dtype=np.float64)
+    h = (t // 3600).astype(np.int64)
+    m = ((t % 3600) // 60).astype(np.int64)
+    sec = (t % 60).astype(np.int64)
+    cs = ((t - np.trunc(t)) * 100).astype(np.int64)
+    return [f"{a:d}:{b:02d}:{c:02d}.{d:02d}" for a, b, c, d in zip(h.tolist(), m.tolist(), sec.tolist(), cs.tolist())]
 
-    data = json.loads(word_json_path.read_text())
-    # Optional sentence map to recover exact sentence-ending punctuation like ? and !
-    sentence_punct_by_end_index = {}
-    sentence_map_path = word_json_path.parent / "sentence_map.json"
-    if sentence_map_path.exists():
-        try:
-            sent_map = json.loads(sentence_map_path.read_text())
-            # Expect a list of sentences, each with at least {"text", "start", "end"}
-            # We will later align by end time to the last word index within the sentence
-            sentence_entries = []
-            if isinstance(sent_map, list):
-                sentence_entries = sent_map
-            elif isinstance(sent_map, dict):
-                # Common variants
-                sentence_entries = sent_map.get("sentences") or sent_map.get("segments") or []
-            # Pre-extract desired ending punctuation
-            def trailing_punct(s: str) -> str:
-                if not isinstance(s, str):
-                    return ""
-                s = s.strip()
-                m = re.search(r"([\.!?…]+)\s*$", s)
-                return m.group(1)[-1] if m else ""
-            sentence_meta = []
-            for seg in sentence_entries:
-                t = seg.get("text") if isinstance(seg, dict) else None
-                st = seg.get("start") if isinstance(seg, dict) else None
-                en = seg.get("end") if isinstance(seg, dict) else None
-                if t is None or st is None or en is None:
-                    continue
-                p = trailing_punct(t)
-                if p:
-                    try:
-                        sentence_meta.append({"end": float(en), "punct": p})
-                    except Exception:
-                        pass
-        except Exception:
-            sentence_meta = []
-    else:
+def ass_centis(t):
+    """Times as integer centiseconds, truncated exactly like seconds_to_ass."""
+    t = np.asarray(t, dtype=np.float64)
+    whole = np.trunc(t)
+    return ((t // 3600).astype(np.int64) * 360000 + ((t % 3600) // 60).astype(np.int64) * 6000
+            + (t % 60).astype(np.int64) * 100 + ((t - whole) * 100).astype(np.int64))
+
+def centis_to_ass(cs: int) -> str:
+    return f"{cs // 360000:d}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+def _trailing_punct(s: str) -> str:
+    if not isinstance(s, str):
+        return ""
+    s = s.strip()
+    m = re.search(r"([\.!?…]+)\s*$", s)
+    return m.group(1)[-1] if m else ""
+
+def _load_sentence_meta_json(sentence_map_path: Path):
+    """Optional sentence map to recover exact sentence-ending punctuation like ? and !"""
+    if not sentence_map_path.exists():
+        return []
+    try:
+        sent_map = json.loads(sentence_map_path.read_text())
+        # Expect a list of sentences, each with at least {"text", "start", "end"}
+        # We will later align by end time to the last word index within the sentence
+        sentence_entries = []
+        if isinstance(sent_map, list):
+            sentence_entries = sent_map
+        elif isinstance(sent_map, dict):
+            # Common variants
+            sentence_entries = sent_map.get("sentences") or sent_map.get("segments") or []
         sentence_meta = []
+        for seg in sentence_entries:
+            t = seg.get("text") if isinstance(seg, dict) else None
+            st = seg.get("start") if isinstance(seg, dict) else None
+            en = seg.get("end") if isinstance(seg, dict) else None
+            if t is None or st is None or en is None:
+                continue
+            p = _trailing_punct(t)
+            if p:
+                try:
+                    sentence_meta.append({"end": float(en), "punct": p})
+                except Exception:
+                    pass
+        return sentence_meta
+    except Exception:
+        return []
+
+def _sentence_arrays(sentence_meta):
+    """Split sentence meta into (end times array, punctuation list)."""
+    ends = np.array([m["end"] for m in sentence_meta], dtype=np.float64)
+    return ends, [m["punct"] for m in sentence_meta]
+
+def _sorted_words(texts, puncts, start, end, base_start, base_end):
+    """Bundle per-word columns, stably sorted by start time."""
+    order = np.argsort(start, kind="stable")
+    if np.any(order[1:] < order[:-1]):
+        texts = [texts[k] for k in order]
+        puncts = [puncts[k] for k in order]
+        start, end, base_start, base_end = start[order], end[order], base_start[order], base_end[order]
+    return {"text": texts, "punct": puncts, "start": start, "end": end,
+            "base_start": base_start, "base_end": base_end}
+
+def _load_words_json(word_json_path: Path):
+    """Parse and normalise a word JSON file into sorted per-word columns."""
+    data = json.loads(word_json_path.read_text())
 
     # Normalise input: accept list of words, or dicts with word_segments/words, or segments->words
     words_raw = []
@@ -87,7 +177,7 @@ def build_ass_from_whisperx(word_json_path: Path, ass_out_path: Path, window_siz
                     words_raw.extend(seg_words)
 
     # Coerce to unified schema: {text, start, end}
-    normalised_words = []
+    texts, puncts, starts, ends, base_starts, base_ends = [], [], [], [], [], []
     for w in words_raw:
         if not isinstance(w, dict):
             continue
@@ -107,136 +197,281 @@ def build_ass_from_whisperx(word_json_path: Path, ass_out_path: Path, window_siz
             end_f = float(end)
         except Exception:
             continue
-        item = {"text": text, "start": start_f, "end": end_f, "punct": w.get("punct", "")}
-        if isinstance(w.get("phonemes"), list):
-            item["phonemes"] = w["phonemes"]
-        normalised_words.append(item)
+        # Phoneme span (first phone start, last phone end) tightens the word timing when present
+        span = (start_f, end_f)
+        ph = w.get("phonemes")
+        if isinstance(ph, list) and ph:
+            try:
+                span = (float(ph[0].get("start", start_f)), float(ph[-1].get("end", end_f)))
+            except Exception:
+                pass
+        texts.append(text)
+        puncts.append(w.get("punct", "") or "")
+        starts.append(start_f)
+        ends.append(end_f)
+        base_starts.append(span[0])
+        base_ends.append(span[1])
+
+    return _sorted_words(texts, puncts, np.array(starts, dtype=np.float64), np.array(ends, dtype=np.float64),
+                         np.array(base_starts, dtype=np.float64), np.array(base_ends, dtype=np.float64))
+
+def _load_words_binary(timing_dir: Path):
+    """Load all word columns and sentence punctuation from timing artefacts, sorted by start."""
+    art = load_timing_artifacts(timing_dir, mmap=True)
+    words = _binary_word_columns(art, 0, len(art.words))
+    words = _sorted_words(words["text"], words["punct"], words["start"], words["end"],
+                          words["base_start"], words["base_end"])
+    sentence_meta = []
+    for text, en in zip(art.sentence_texts(), art.sentences["end"]):
+        p = _trailing_punct(text)
+        if p:
+            sentence_meta.append({"end": float(en), "punct": p})
+    return words, sentence_meta
+
+def _binary_word_columns(art, lo: int, hi: int):
+    """Word columns for rows [lo, hi) of memory-mapped artefacts, with phoneme spans applied."""
+    rows = art.words[lo:hi]
+    start = np.array(rows["start"], dtype=np.float64)
+    end = np.array(rows["end"], dtype=np.float64)
+    base_start, base_end = start.copy(), end.copy()
+    ph_len = np.asarray(rows["ph_len"], dtype=np.int64)
+    has_ph = ph_len > 0
+    if has_ph.any():
+        first = np.asarray(rows["ph_off"], dtype=np.int64)[has_ph]
+        base_start[has_ph] = art.phonemes["start"][first]
+        base_end[has_ph] = art.phonemes["end"][first + ph_len[has_ph] - 1]
+    return {"text": art.word_texts(lo, hi), "punct": [str(p) for p in rows["punct"]],
+            "start": start, "end": end, "base_start": base_start, "base_end": base_end}
 
-    # Ensure chronological order
-    normalised_words.sort(key=lambda x: x["start"]) 
+def _is_sorted_chunked(arr, chunk: int) -> bool:
+    """Check arr is non-decreasing without materialising a full-length temporary."""
+    prev = None
+    for lo in range(0, len(arr), chunk):
+        block = np.asarray(arr[lo:lo + chunk])
+        if prev is not None and len(block) and block[0] < prev:
+            return False
+        if np.any(block[1:] < block[:-1]):
+            return False
+        if len(block):
+            prev = block[-1]
+    return True
 
-    # Align sentence end times to word indices so we can place exact punctuation like ? and !
+def _slice_words(words, lo: int, hi: int):
+    return {k: v[lo:hi] for k, v in words.items()}
+
+def _open_word_source(word_path: Path, chunk: int):
+    """Return (n_words, get_chunk(lo, hi), sentence_ends, punct_at(i)).
+
+    Timing directories in timeline order are read chunk by chunk from the memory map,
+    so memory stays flat in video length. JSON (and out-of-order artefacts) are
+    loaded and sorted up front, then fed through the same chunked engine.
+    """
+    if is_timing_dir(word_path):
+        art = load_timing_artifacts(word_path, mmap=True)
+        if _is_sorted_chunked(art.words["start"], chunk):
+            sents = art.sentences
+
+            def punct_at(i):
+                return _trailing_punct(art.string(sents["text_off"][i], sents["text_len"][i]))
+
+            return (len(art.words), lambda lo, hi: _binary_word_columns(art, lo, hi),
+                    np.asarray(sents["end"], dtype=np.float64), punct_at)
+        words, sentence_meta = _load_words_binary(word_path)
+    else:
+        words = _load_words_json(word_path)
+        sentence_meta = _load_sentence_meta_json(word_path.parent / "sentence_map.json")
+    sentence_ends = np.array([m["end"] for m in sentence_meta], dtype=np.float64)
+    puncts = [m["punct"] for m in sentence_meta]
+    return len(words["start"]), lambda lo, hi: _slice_words(words, lo, hi), sentence_ends, puncts.__getitem__
+
+def match_sentence_ends(word_ends, sentence_ends, sentence_puncts, eps: float = SENTENCE_END_EPS):
+    """Map each sentence end to the last word index whose end (and every earlier end) fits inside it.
+
+    Uses the running maximum of word ends so a single searchsorted per sentence
+    reproduces the original prefix scan in O((W + S) log W).
+    """
     sentence_end_index = {}
-    if sentence_meta:
-        # Build a list of word end times for binary search
-        word_ends = [w.get("end", 0.0) for w in normalised_words]
-        for meta in sentence_meta:
-            try:
-                sent_end = float(meta["end"]) if isinstance(meta.get("end"), (int, float)) else None
-                if sent_end is None:
-                    continue
-                # find the last word whose end is <= sent_end + small epsilon
-                eps = 0.04
-                idx = None
-                for i, we in enumerate(word_ends):
-                    if we <= sent_end + eps:
-                        idx = i
-                    else:
-                        break
-                if idx is not None:
-                    sentence_end_index[idx] = meta["punct"]
-            except Exception:
-                continue
+    if len(word_ends) == 0 or len(sentence_ends) == 0:
+        return sentence_end_index
+    running_max = np.maximum.accumulate(word_ends)
+    idx = np.searchsorted(running_max, sentence_ends + eps, side="right") - 1
+    for i, p in zip(idx.tolist(), sentence_puncts):
+        if i >= 0:
+            sentence_end_index[i] = p
+    return sentence_end_index
 
-    # Precompute adjusted timings with per‑word lead and compression
-    adjusted = []
-    for idx, w in enumerate(normalised_words):
-        base_start = float(w["start"])
-        base_end = float(w["end"])
-        ph = w.get("phonemes") if isinstance(w.get("phonemes"), list) else []
-        if ph:
-            try:
-                ph_start = float(ph[0].get("start", base_start))
-                ph_end = float(ph[-1].get("end", base_end))
-                base_start, base_end = ph_start, ph_end
-            except Exception:
-                pass
-        s = max(0.0, base_start - LEAD_SEC)
-        dur = max(0.0, base_end - base_start) * COMPRESS
-        e = s + dur
-        if idx + 1 < len(normalised_words):
-            next_s = float(normalised_words[idx + 1]["start"]) - LEAD_SEC
-            e = min(e, max(s, next_s - SAFETY_MARGIN))
-        adjusted.append({
-            "text": w["text"],
-            "start": s,
-            "end": e,
-            "punct": w.get("punct", ""),
-            "phonemes": ph,
-        })
-
-    lines = [ASS_HEADER]
-
-    # Helper to choose punctuation based on gap
-    def pick_punct(gap: float) -> str:
-        if gap >= FULLSTOP_GAP:
-            return "."
-        if gap >= COMMA_GAP:
-            return ","
-        return ""
+def adjust_timings(words, sentence_end_index):
+    """Return (start, end) arrays with lead, compression, safety margins and punctuation holds applied."""
+    start = words["start"]
+    n = len(start)
+    s = np.maximum(0.0, words["base_start"] - LEAD_SEC)
+    e = s + np.maximum(0.0, words["base_end"] - words["base_start"]) * COMPRESS
+    if n > 1:
+        # Never run into the next word's lead-in
+        next_s = start[1:] - LEAD_SEC
+        e[:-1] = np.minimum(e[:-1], np.maximum(s[:-1], next_s - SAFETY_MARGIN))
 
-    for i in range(0, len(adjusted), window_size):
-        clump = adjusted[i:i + window_size]
-        if not clump:
-            continue
+    # Tiny visual hold on words that end a clause, whether punctuated explicitly,
+    # by the sentence map, or inferred from a long enough gap to the next word
+    end = e.copy()
+    if n > 1:
+        next_start = s[1:]
+        gap = np.maximum(0.0, next_start - e[:-1])
+        has_punct = np.array([bool(p) for p in words["punct"][:-1]], dtype=bool)
+        if sentence_end_index:
+            ends_idx = np.fromiter((i for i, p in sentence_end_index.items() if p and i < n - 1), dtype=np.int64)
+            has_punct[ends_idx] = True
+        hold_mask = has_punct | (gap >= COMMA_GAP)
+        hold = np.minimum(PUNCT_SHOW_CAP, np.maximum(0.0, gap - SAFETY_MARGIN))
+        held = np.minimum(e[:-1] + hold, next_start - SAFETY_MARGIN)
+        end[:-1] = np.where(hold_mask, held, e[:-1])
+    return s, end
+
+def display_tokens(words, sentence_end_index):
+    """Word text with punctuation attached to its owning word (explicit, plus sentence-end if missing)."""
+    tokens = []
+    for gi, (text, punct) in enumerate(zip(words["text"], words["punct"])):
+        sp = sentence_end_index.get(gi, "")
+        if sp and sp not in punct:
+            punct = f"{punct}{sp}"
+        tokens.append(f"{text}{punct}")
+    return tokens
+
+def iter_timed_chunks(word_path: Path, window_size: int = 4, chunk_words: int = CHUNK_WORDS):
+    """Stream the timing pass: yield (tokens, starts, ends) for consecutive whole windows.
+
+    Each chunk carries one word of lookahead so next-word caps and holds match a
+    whole-file pass exactly, and sentence ends are matched against a running
+    maximum carried across chunks.
+    """
+    chunk = max(window_size, chunk_words // window_size * window_size)
+    n, get_chunk, sentence_ends, punct_at = _open_word_source(word_path, chunk)
+    thr = sentence_ends + SENTENCE_END_EPS
+    order = np.argsort(thr, kind="stable")
+    thr_sorted = thr[order]
+    carry = -np.inf
+    for lo in range(0, n, chunk):
+        hi = min(lo + chunk, n)
+        ext_hi = min(hi + 1, n)
+        words = get_chunk(lo, ext_hi)
+        m = hi - lo
+
+        # Sentences whose matched word falls inside this chunk
+        running_max = np.maximum.accumulate(np.concatenate(([carry], words["end"])))[1:]
+        s_lo = np.searchsorted(thr_sorted, running_max[0], side="left")
+        s_hi = np.searchsorted(thr_sorted, running_max[m], side="left") if ext_hi > hi else len(thr_sorted)
+        sentence_end_index = {}
+        if s_hi > s_lo:
+            picked = np.sort(order[s_lo:s_hi])  # original order, so later sentences win ties
+            local = np.searchsorted(running_max[:m], thr[picked], side="right") - 1
+            for si, li in zip(picked.tolist(), local.tolist()):
+                p = punct_at(si)
+                if p and li >= 0:
+                    sentence_end_index[li] = p
+        carry = running_max[m - 1]
+
+        starts, ends = adjust_timings(words, sentence_end_index)
+        tokens = display_tokens(_slice_words(words, 0, m), sentence_end_index)
+        yield tokens, starts[:m], ends[:m]
+
+def highlight_events(tokens, window_size: int):
+    """Yield (word index, left context, word, right context), one per word."""
+    for i in range(0, len(tokens), window_size):
+        clump = tokens[i:i + window_size]
+        # Template the window once: left/right context for each highlighted position
+        for j, tok in enumerate(clump):
+            yield i + j, " ".join(clump[:j]), tok, " ".join(clump[j + 1:])
+
+def karaoke_events(tokens, start_cs, end_cs, window_size: int):
+    """Yield (start cs, end cs, [(duration cs, word)]) with one event per window.
+
+    libass lays out each window once instead of once per highlighted word.
+    start_cs must already be non-decreasing.
+    """
+    for i in range(0, len(tokens), window_size):
+        clump = tokens[i:i + window_size]
+        bounds = start_cs[i:i + len(clump)].tolist()
+        bounds.append(max(int(end_cs[i + len(clump) - 1]), bounds[-1]))
+        yield bounds[0], bounds[-1], [(bounds[k + 1] - bounds[k], tok) for k, tok in enumerate(clump)]
+
+def iter_ass_events(word_path: Path, styles, window_size: int = 4, chunk_words: int = CHUNK_WORDS):
+    """Yield one list of Dialogue lines per style for each streamed chunk.
+
+    Timing, sentence matching and window templating run once per chunk and are
+    shared by every style; only the final text formatting differs per style.
+    """
+    styles = [resolve_style(st) for st in styles]
+    need_highlight = any(st["mode"] == "highlight" for st in styles)
+    need_karaoke = any(st["mode"] != "highlight" for st in styles)
+    cs_carry = 0
+    for tokens, starts, ends in iter_timed_chunks(word_path, window_size, chunk_words):
+        if need_highlight:
+            ass_starts, ass_ends = ass_times(starts), ass_times(ends)
+            hl = list(highlight_events(tokens, window_size))
+        if need_karaoke:
+            start_cs = np.maximum.accumulate(np.maximum(ass_centis(starts), cs_carry))
+            cs_carry = int(start_cs[-1])
+            kar = list(karaoke_events(tokens, start_cs, ass_centis(ends), window_size))
+
+        out = []
+        for st in styles:
+            name = st["name"]
+            if st["mode"] == "highlight":
+                on = f"{{\\b1\\c&H{st['highlight'][-6:]}&}}"
+                off = f"{{\\b0\\c{st['primary']}&}}"
+                lines = []
+                for gi, left, tok, right in hl:
+                    text = f"{on}{tok}{off}"
+                    if left:
+                        text = f"{left} {text}"
+                    if right:
+                        text = f"{text} {right}"
+                    lines.append(f"Dialogue: 0,{ass_starts[gi]},{ass_ends[gi]},{name},,0,0,0,,{text}\n")
+            else:
+                tag = KARAOKE_TAGS[st["mode"]]
+                lines = [
+                    f"Dialogue: 0,{centis_to_ass(cs0)},{centis_to_ass(cs1)},{name},,0,0,0,,"
+                    + " ".join(f"{{\\{tag}{d}}}{tok}" for d, tok in parts) + "\n"
+                    for cs0, cs1, parts in kar
+                ]
+            out.append(lines)
+        yield out
+
+def render_ass_variants(word_path: Path, outputs, window_size: int = 4, chunk_words: int = CHUNK_WORDS):
+    """Write several styled ASS files from one streamed pass over the timing data.
+
+    outputs maps each output path to a style dict (see DEFAULT_STYLE), e.g. one
+    per account. Events are written as they are produced, so memory stays flat.
+    """
+    paths = list(outputs)
+    styles = [outputs[p] for p in paths]
+    handles = []
+    try:
+        for path, st in zip(paths, styles):
+            fh = open(path, "w", encoding="utf-8")
+            handles.append(fh)
+            fh.write(ass_header(st))
+        for per_style in iter_ass_events(word_path, styles, window_size, chunk_words):
+            for fh, lines in zip(handles, per_style):
+                fh.writelines(lines)
+    finally:
+        for fh in handles:
+            fh.close()
+    return paths
+
+def build_ass_from_whisperx(word_json_path: Path, ass_out_path: Path, window_size: int = 4,
+                            mode: str = "highlight", style=None):
+    """Build word-highlight ASS subtitles from a word JSON file or a binary timing directory.
 
-        for j, w in enumerate(clump):
-            # Compute start and end, then optionally extend a touch at punctuation
-            start = w["start"]
-            end = w["end"]
-
-            # Index of this word across the whole sequence
-            global_index = i + j
-
-            # Determine the punctuation that truly belongs to this word
-            # Prefer explicit per-word punctuation, then sentence-end punctuation
-            effective_punct = (w.get("punct", "") or sentence_end_index.get(global_index, ""))
-
-            # If this word truly ends a sentence, give it a tiny visual hold
-            if effective_punct and global_index + 1 < len(adjusted):
-                next_word = adjusted[global_index + 1]
-                gap = max(0.0, next_word["start"] - end)
-                hold = min(PUNCT_SHOW_CAP, max(0.0, gap - SAFETY_MARGIN))
-                end = min(end + hold, next_word["start"] - SAFETY_MARGIN)
-            elif global_index + 1 < len(adjusted):
-                # Fallback: infer commas/full stops from gaps only when neither source provided punctuation
-                next_word = adjusted[global_index + 1]
-                gap = max(0.0, next_word["start"] - end)
-                inferred = pick_punct(gap)
-                if inferred:
-                    effective_punct = effective_punct or inferred
-                    hold = min(PUNCT_SHOW_CAP, max(0.0, gap - SAFETY_MARGIN))
-                    end = min(end + hold, next_word["start"] - SAFETY_MARGIN)
-
-            ass_start = seconds_to_ass(start)
-            ass_end = seconds_to_ass(end)
-
-            # Build the text for this window with punctuation attached to its owning word
-            phrase_parts = []
-            for k, word_data in enumerate(clump):
-                word_text = word_data["text"]
-                gi = i + k
-                # Punctuation to render for this word (explicit per-word, plus sentence-end if present)
-                word_punct = (word_data.get("punct", "") or "")
-                if gi in sentence_end_index and sentence_end_index[gi] and sentence_end_index[gi] not in word_punct:
-                    word_punct = f"{word_punct}{sentence_end_index[gi]}"
-
-                token = f"{word_text}{word_punct}"
-                if k == j:
-                    # Highlight the word together with its punctuation
-                    phrase_parts.append(f"{{\\b1\\c&H00FF00&}}{token}{{\\b0\\c&H00FFFFFF&}}")
-                else:
-                    phrase_parts.append(token)
-
-            text_line = " ".join(phrase_parts)
-
-            lines.append(f"Dialogue: 0,{ass_start},{ass_end},Default,,0,0,0,,{text_line}\n")
-
-    ass_out_path.write_text("".join(lines))
+    mode="highlight" emits one event per word with inline colour overrides;
+    "karaoke" / "karaoke_fill" emit one event per window using \\k / \\kf tags.
+    """
+    style = {**(style or {}), "mode": mode}
+    render_ass_variants(word_json_path, {ass_out_path: style}, window_size)
     print(f"✅ Wrote ASS subtitles to {ass_out_path}")
 
 if __name__ == "__main__":
     build_ass_from_whisperx(
         Path("data/final/preview_audio.json"),
         Path("data/final/dialogue.ass")
-    )
\ No newline at end of file
+    )
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
+import hashlib
 import json
 import subprocess
 from pathlib import Path
 import sys
 import os
 
+from pipeline_modules.logkit import span
+from pipeline_modules.resource_planner import apply_stage_plan
+from pipeline_modules.timing_store import TIMING_DIRNAME, write_timing_artifacts
+
 # Configuration
 SPEED = 1.05  # match combine_audio speed factor
 BASE_DIR = Path(__file__).parent.parent.resolve()
@@ -19,6 +24,63 @@ _WHISPERX_AVAILABLE = None  # unknown until checked
 # Lazy cache for the aligner
 _ALIGN_CACHE = {"model": None, "metadata": None, "device": "cpu"}
 
+# On-disk alignment results, keyed by (audio content hash, normalised text, align model id)
+ALIGN_LANGUAGE = "en"
+ALIGN_MODEL_NAME = os.getenv("WHISPERX_ALIGN_MODEL") or None  # None = whisperx default for the language
+ALIGN_MODEL_ID = f"{ALIGN_LANGUAGE}:{ALIGN_MODEL_NAME or 'default'}"
+ALIGN_RESULT_DIR = BASE_DIR / "data" / "cache" / "align"
+_ALIGN_RESULT_CACHE = True  # toggled by main(align_cache=...)
+_AUDIO_HASHES = {}  # (path, size, mtime) -> sha256, so each file is hashed once per process
+_KEEP_WORD_KEYS = ("word", "text", "start", "end")
+_KEEP_PHONE_KEYS = ("phone", "phoneme", "label", "start", "end", "duration")
+
+def _audio_hash(audio_path: Path) -> str:
+    st = audio_path.stat()
+    memo_key = (str(audio_path), st.st_size, st.st_mtime_ns)
+    digest = _AUDIO_HASHES.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(audio_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _AUDIO_HASHES[memo_key] = digest
+    return digest
+
+def _normalise_text(text: str) -> str:
+    return " ".join(text.split())
+
+def _align_cache_path(audio_path: Path, text: str) -> Path:
+    key = "\n".join([_audio_hash(audio_path), _normalise_text(text), ALIGN_MODEL_ID])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return ALIGN_RESULT_DIR / digest[:2] / f"{digest}.json"
+
+def _compact_words(words):
+    """Keep only the fields we consume so cache entries stay small and JSON safe."""
+    out = []
+    for w in words:
+        item = {k: w[k] for k in _KEEP_WORD_KEYS if k in w}
+        phones = w.get("phones") or w.get("phonemes") or []
+        if phones:
+            item["phones"] = [{k: ph[k] for k in _KEEP_PHONE_KEYS if k in ph} for ph in phones]
+        out.append(item)
+    return out
+
+def _load_cached_alignment(cache_path: Path):
+    try:
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+def _store_cached_alignment(cache_path: Path, words) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_compact_words(words), separators=(",", ":"), default=float), encoding="utf-8")
+        tmp.replace(cache_path)
+    except Exception as e:
+        print(f"⚠️  Could not write alignment cache {cache_path.name}: {e}")
+
 def _ensure_aligner_available() -> bool:
     """Try to import whisperx once and memoise the result."""
     global _WHISPERX_AVAILABLE, whisperx  # type: ignore
@@ -28,6 +90,8 @@ def _ensure_aligner_available() -> bool:
         import importlib
         whisperx = importlib.import_module("whisperx")  # type: ignore
         _WHISPERX_AVAILABLE = True
+        # whisperx has pulled in torch: size it to the planned thread budget
+        apply_stage_plan()
     except Exception:
         _WHISPERX_AVAILABLE = False
     return bool(_WHISPERX_AVAILABLE)
@@ -40,15 +104,31 @@ def _get_aligner():
     if _ALIGN_CACHE["model"] is not None:
         return _ALIGN_CACHE["model"], _ALIGN_CACHE["metadata"], _ALIGN_CACHE["device"]
     device = "cpu"
-    align_model, metadata = whisperx.load_align_model(language_code="en", device=device)  # type: ignore
+    with span("align.load_model", model=ALIGN_MODEL_NAME):
+        align_model, metadata = whisperx.load_align_model(  # type: ignore
+            language_code=ALIGN_LANGUAGE, device=device, model_name=ALIGN_MODEL_NAME
+        )
     _ALIGN_CACHE.update({"model": align_model, "metadata": metadata, "device": device})
     return align_model, metadata, device
 
 
 def align_sentence_to_phones(audio_path: Path, text: str):
-    """Return list of word dicts with optional phonemes for a sentence, or None if unavailable."""
+    """Return list of word dicts with optional phonemes for a sentence, or None if unavailable.
+
+    Results are cached on disk, so a hit never imports whisperx or loads the align model.
+    """
     if not _PHONEME_ALIGN:
         return None
+    cache_path = None
+    if _ALIGN_RESULT_CACHE:
+        try:
+            cache_path = _align_cache_path(audio_path, text)
+        except OSError:
+            cache_path = None
+        if cache_path is not None and cache_path.exists():
+            cached = _load_cached_alignment(cache_path)
+            if cached:
+                return cached
     if not _ensure_aligner_available():
         return None
     try:
@@ -57,12 +137,16 @@ def align_sentence_to_phones(audio_path: Path, text: str):
             return None
         # Build a single segment that spans the whole file with our transcript text
         segs = [{"text": text, "start": 0.0, "end": float(get_duration(audio_path))}]
-        audio = whisperx.load_audio(str(audio_path))
-        aligned = whisperx.align(segs, align_model, metadata, audio, device, return_char_alignments=False)
+        with span("align.load_audio", file=audio_path.name):
+            audio = whisperx.load_audio(str(audio_path))
+        with span("align.infer", file=audio_path.name, chars=len(text)):
+            aligned = whisperx.align(segs, align_model, metadata, audio, device, return_char_alignments=False)
         seg_list = aligned.get("segments") or []
         if not seg_list:
             return None
         words = seg_list[0].get("words") or []
+        if words and cache_path is not None:
+            _store_cached_alignment(cache_path, words)
         return words
     except Exception:
         return None
@@ -85,9 +169,15 @@ def fmt_srt_time(t: float) -> str:
     ms = int((t - int(t)) * 1000)
     return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
 
-def main(script_name: str, phoneme_align: bool = True):
-    global _PHONEME_ALIGN
+def main(script_name: str, phoneme_align: bool = True, align_cache: bool = True, json_export: bool = False):
+    """Build sentence/word timing maps for a script.
+
+    Binary timing artefacts are always written to data/final/timing; pass
+    json_export=True to also write an indented word_timestamps.json for debugging.
+    """
+    global _PHONEME_ALIGN, _ALIGN_RESULT_CACHE
     _PHONEME_ALIGN = bool(phoneme_align)
+    _ALIGN_RESULT_CACHE = bool(align_cache)
     # 1) Load script
     script_path = BASE_DIR / "data" / "scripts" / f"{script_name}.json"
     script = json.loads(script_path.read_text())
@@ -233,15 +323,18 @@ def main(script_name: str, phoneme_align: bool = True):
         cursor = end
         idx += 1
 
-    # 4) Write sentence_map.json
+    # 4) Write sentence_map.json (small, consumed by assemble_reel)
     sent_path = FINAL_DIR / "sentence_map.json"
-    sent_path.write_text(json.dumps(sentence_map, indent=2))
+    sent_path.write_text(json.dumps(sentence_map, indent=2 if json_export else None))
     print(f"Wrote sentence map to {sent_path}")
 
-    # 5) Write word_timestamps.json
-    word_path = FINAL_DIR / "word_timestamps.json"
-    word_path.write_text(json.dumps(word_entries, indent=2))
-    print(f"Wrote word timestamps to {word_path}")
+    # 5) Write columnar word/phoneme/sentence artefacts, plus JSON only when debugging
+    timing_dir = write_timing_artifacts(FINAL_DIR / TIMING_DIRNAME, word_entries, sentence_map)
+    print(f"Wrote binary timing artefacts to {timing_dir}")
+    if json_export:
+        word_path = FINAL_DIR / "word_timestamps.json"
+        word_path.write_text(json.dumps(word_entries, indent=2))
+        print(f"Wrote word timestamps to {word_path}")
 
     # 6) Write dialogue.srt
     srt_path = FINAL_DIR / "dialogue.srt"
@@ -254,11 +347,14 @@ def main(script_name: str, phoneme_align: bool = True):
     print(f"Wrote SRT to {srt_path}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2 or len(sys.argv) > 3:
-        print("Usage: generate_timing_maps.py <script_name_without_ext> [--no-phonemes]")
+    flags = sys.argv[2:]
+    if len(sys.argv) < 2 or any(f not in ("--no-phonemes", "--no-align-cache", "--json") for f in flags):
+        print("Usage: generate_timing_maps.py <script_name_without_ext> [--no-phonemes] [--no-align-cache] [--json]")
         sys.exit(1)
     script = sys.argv[1]
-    use_phones = True
-    if len(sys.argv) == 3 and sys.argv[2] == "--no-phonemes":
-        use_phones = False
-    main(script, phoneme_align=use_phones)
+    main(
+        script,
+        phoneme_align="--no-phonemes" not in flags,
+        align_cache="--no-align-cache" not in flags,
+        json_export="--json" in flags,
+    )
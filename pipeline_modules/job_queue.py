@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+The per-account job queues under data/queues/, shared by the idea allocator,
+its refill daemon, script_batch and run_next_job.
+
+Each queue is a JSON list of jobs in <name>.json. Jobs whose script an
+offline batch already generated sit in <name>_ready.json until
+run_next_job takes them, so they still count towards the queue's depth.
+"""
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+QUEUE_DIR = PROJECT_ROOT / "data" / "queues"
+READY_QUEUE_SUFFIX = "_ready"
+
+def load_queue(name):
+    f = QUEUE_DIR / f"{name}.json"
+    return json.loads(f.read_text()) if f.exists() else []
+
+def save_queue(name, items):
+    # Write then rename, so a reader never sees a half-written queue
+    QUEUE_DIR.mkdir(parents=True, exist_ok=True)
+    f = QUEUE_DIR / f"{name}.json"
+    tmp = f.with_suffix(".tmp")
+    tmp.write_text(json.dumps(items, indent=2))
+    tmp.replace(f)
+
+def dequeue(name):
+    """Pop the first job off a queue; None when it is empty."""
+    items = load_queue(name)
+    if not items:
+        return None
+    job = items.pop(0)
+    save_queue(name, items)
+    return job
+
+def queue_depth(name):
+    """Jobs waiting for a run: the queue plus its _ready queue."""
+    return len(load_queue(name)) + len(load_queue(name + READY_QUEUE_SUFFIX))
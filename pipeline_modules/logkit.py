@@ -1,54 +1,204 @@
 # pipeline_modules/logkit.py
+"""
+Structured JSONL event logs and cross-process tracing for pipeline runs.
+
+Every process of a run logs to data/logs/<run_id>.jsonl through a QueueHandler,
+so the calling thread only enqueues the record. A QueueListener thread
+formats and writes it, and the queue is drained at exit.
+
+span(name, lg=None, /, **attrs) times a block and logs one "span" event carrying
+trace_id, span_id, parent_id, pid/tid, start_us and dur_us. Spans nest through
+a context variable. trace_env() hands the trace id and the current span down
+to a subprocess through PIPELINE_TRACE_ID / PIPELINE_PARENT_SPAN, so a stage's
+spans hang off the orchestrator span that started it.
+
+  python -m pipeline_modules.logkit traces data/logs/<run_id>.jsonl
+  python -m pipeline_modules.logkit chrome-trace data/logs/<run_id>.jsonl [--trace ID] [-o trace.json]
+
+writes Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev) with one
+row per process and the spans as nested slices.
+"""
+import argparse
+import atexit
 import json
 import logging
 import os
+import queue
+import threading
 import time
-from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+DEFAULT_LOG_DIR = Path(__file__).parent.parent.resolve() / "data" / "logs"
+RUN_ID_ENV = "PIPELINE_RUN_ID"  # set once by the orchestrator so every stage logs to one file
+TRACE_ID_ENV = "PIPELINE_TRACE_ID"         # one trace per job, shared by every stage process
+PARENT_SPAN_ENV = "PIPELINE_PARENT_SPAN"   # span a subprocess's top-level spans are children of
+
+# Attributes every LogRecord has; anything else was passed through `extra=` ("extra" itself is merged below)
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName", "extra"}
+
+_current_span: ContextVar = ContextVar("pipeline_span", default=None)
+_listeners = []
+
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         base = {
-            "ts": datetime.utcnow().isoformat(timespec="milliseconds"),
+            # record.created, not now: with the queue handler formatting happens later on the listener thread
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
             "level": record.levelname,
             "msg": record.getMessage(),
         }
-        # record.extra will be merged if present
+        # logging sets `extra=` keys as record attributes, not as record.extra
+        base.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
         extra = getattr(record, "extra", {})
         if isinstance(extra, dict):
             base.update(extra)
-        return json.dumps(base, ensure_ascii=False)
+        return json.dumps(base, ensure_ascii=False, default=str)
+
+class TraceContext(logging.Filter):
+    """Tags every record with the trace and innermost span it was logged in."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "trace_id"):
+            record.trace_id, span_id = current_span_ids()
+            if span_id:
+                record.span_id = span_id
+        return True
+
+class _EnqueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats and copies every record on the calling thread.
+        # Event records carry plain JSON-able fields and no exc_info, so the listener can format them.
+        return record
 
 def get_event_logger(log_dir: Path, run_id: str) -> logging.Logger:
     log_dir.mkdir(parents=True, exist_ok=True)
     fh = logging.FileHandler(log_dir / f"{run_id}.jsonl", encoding="utf-8")
     fh.setFormatter(JsonFormatter())
+    # Callers only enqueue; formatting and the file write happen on the listener thread
+    q = queue.SimpleQueue()
+    listener = QueueListener(q, fh)
+    listener.start()
+    _listeners.append(listener)
+    qh = _EnqueueHandler(q)
+    qh.addFilter(TraceContext())
     lg = logging.getLogger(f"pipeline.{run_id}")
     lg.setLevel(logging.INFO)
     lg.handlers.clear()
-    lg.addHandler(fh)
+    lg.addHandler(qh)
     return lg
 
+@atexit.register
+def _stop_listeners() -> None:
+    """Drain the queues so no event is lost at exit."""
+    while _listeners:
+        _listeners.pop().stop()
+
+_run_loggers: Dict[str, logging.Logger] = {}
+
+def current_run_id() -> str:
+    """The run id shared through the environment; a process-local one is created if unset."""
+    rid = os.environ.get(RUN_ID_ENV)
+    if not rid:
+        rid = datetime.now().strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        os.environ[RUN_ID_ENV] = rid
+    return rid
+
+def run_logger(log_dir: Path = DEFAULT_LOG_DIR) -> logging.Logger:
+    """Event logger writing to <log_dir>/<run id>.jsonl, created once per process."""
+    rid = current_run_id()
+    if rid not in _run_loggers:
+        _run_loggers[rid] = get_event_logger(log_dir, rid)
+    return _run_loggers[rid]
+
 def stamp(extra: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
     out = dict(extra or {})
     out.update(kwargs)
     return out
 
+def current_trace_id() -> str:
+    """The job's trace id from the environment; a new one is created if unset."""
+    tid = os.environ.get(TRACE_ID_ENV)
+    if not tid:
+        tid = os.urandom(16).hex()
+        os.environ[TRACE_ID_ENV] = tid
+    return tid
+
+def current_span_ids():
+    """(trace_id, span_id) of the innermost open span, else the parent span passed down by the orchestrator."""
+    s = _current_span.get()
+    if s is not None:
+        return s.trace_id, s.span_id
+    return current_trace_id(), os.environ.get(PARENT_SPAN_ENV)
+
+def trace_env() -> Dict[str, str]:
+    """Environment that makes a subprocess's spans children of the current span."""
+    trace_id, span_id = current_span_ids()
+    env = {RUN_ID_ENV: current_run_id(), TRACE_ID_ENV: trace_id}
+    if span_id:
+        env[PARENT_SPAN_ENV] = span_id
+    return env
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = os.urandom(8).hex()
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        """Attach attributes known only once the work is under way (frame counts, sizes...)."""
+        self.attrs.update(attrs)
+
+@contextmanager
+def span(name: str, lg: Optional[logging.Logger] = None, /, **attrs):
+    """Time a block as a child of the current span; logs one "span" event when it ends.
+
+    name and lg are positional-only, so attrs may use those keys too.
+    """
+    trace_id, parent_id = current_span_ids()
+    s = Span(name, trace_id, parent_id, attrs)
+    token = _current_span.set(s)
+    start_us = time.time_ns() // 1000
+    t0 = time.perf_counter_ns()
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        dur_us = (time.perf_counter_ns() - t0) // 1000
+        _current_span.reset(token)
+        event = {
+            "run_id": current_run_id(), "trace_id": trace_id, "span_id": s.span_id, "parent_id": parent_id,
+            "span": name, "start_us": start_us, "dur_us": dur_us,
+            "pid": os.getpid(), "tid": threading.get_native_id(),
+            "status": "error" if error else "ok", "attrs": s.attrs,
+        }
+        if error:
+            event["error"] = error
+        (lg or run_logger()).log(logging.ERROR if error else logging.INFO, "span", extra=event)
+
+@contextmanager
 def timed(lg: logging.Logger, extra: Dict[str, Any], step: str):
-    """Context manager to time steps and log start and finish events."""
-    class _Timer:
-        def __enter__(self):
-            self.t0 = time.time()
-            lg.info("start", extra=stamp(extra, step=step))
-            return self
-        def __exit__(self, exc_type, exc, tb):
-            dt = int((time.time() - self.t0) * 1000)
-            if exc:
-                lg.error("error", extra=stamp(extra, step=step, error_type=str(exc_type), error_message=str(exc), duration_ms=dt))
-            else:
-                lg.info("finish", extra=stamp(extra, step=step, duration_ms=dt))
-    return _Timer()
+    """Context manager to time steps and log start and finish events, inside a span named after the step."""
+    # Fields go through JsonFormatter's "extra" dict: as record attributes, keys such as "name" would clash
+    with span(step, lg, **extra):
+        t0 = time.time()
+        lg.info("start", extra={"extra": stamp(extra, step=step)})
+        try:
+            yield
+        except BaseException as exc:
+            dt = int((time.time() - t0) * 1000)
+            lg.error("error", extra={"extra": stamp(extra, step=step, error_type=type(exc).__name__,
+                                                    error_message=str(exc), duration_ms=dt)})
+            raise
+        lg.info("finish", extra={"extra": stamp(extra, step=step, duration_ms=int((time.time() - t0) * 1000))})
 
 def append_run_summary(csv_path: Path, row: Dict[str, Any]) -> None:
     import csv
@@ -58,4 +208,63 @@ def append_run_summary(csv_path: Path, row: Dict[str, Any]) -> None:
         w = csv.DictWriter(f, fieldnames=list(row.keys()))
         if write_header:
             w.writeheader()
-        w.writerow(row)
\ No newline at end of file
+        w.writerow(row)
+
+def read_spans(log_path: Path, trace_id: Optional[str] = None):
+    spans = []
+    with open(log_path, encoding="utf-8") as f:
+        for raw in f:
+            try:
+                r = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if r.get("msg") == "span" and (trace_id is None or r.get("trace_id") == trace_id):
+                spans.append(r)
+    return spans
+
+def chrome_trace(spans) -> Dict[str, Any]:
+    """Chrome trace-event JSON: one complete ("X") event per span and one named row per process."""
+    by_id = {s["span_id"]: s for s in spans}
+    events, process_names = [], {}
+    for s in sorted(spans, key=lambda s: s["start_us"]):
+        args = {**s.get("attrs", {}), "span_id": s["span_id"], "parent_id": s.get("parent_id"), "status": s["status"]}
+        if "error" in s:
+            args["error"] = s["error"]
+        events.append({"name": s["span"], "cat": s["span"].split(".")[0], "ph": "X", "ts": s["start_us"],
+                       "dur": s["dur_us"], "pid": s["pid"], "tid": s["tid"], "args": args})
+        parent = by_id.get(s.get("parent_id"))
+        if parent is None or parent["pid"] != s["pid"]:
+            # A stage process is named after the orchestrator span that started it
+            process_names.setdefault(s["pid"], parent["span"] if parent else s["span"])
+    for pid, name in process_names.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{name} [{pid}]"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("traces", help="list the traces (jobs) in a run log").add_argument("log", type=Path)
+    p = sub.add_parser("chrome-trace", help="export spans as Chrome trace-event JSON")
+    p.add_argument("log", type=Path)
+    p.add_argument("--trace", help="only this trace id (default: every trace in the log)")
+    p.add_argument("-o", "--out", type=Path, help="default: <log>.trace.json")
+    args = ap.parse_args(argv)
+
+    if args.command == "traces":
+        roots = {}
+        for s in read_spans(args.log):
+            if s.get("parent_id") is None:
+                roots.setdefault(s["trace_id"], s)
+        for trace_id, s in roots.items():
+            attrs = " ".join(f"{k}={v}" for k, v in s.get("attrs", {}).items())
+            print(f"{trace_id}  {s['span']:<12}{s['dur_us'] / 1e6:>9.2f}s  {s['status']:<6}{attrs}")
+        return
+    spans = read_spans(args.log, args.trace)
+    if not spans:
+        raise SystemExit(f"No spans in {args.log}" + (f" for trace {args.trace}" if args.trace else ""))
+    out = args.out or args.log.with_suffix(".trace.json")
+    out.write_text(json.dumps(chrome_trace(spans)), encoding="utf-8")
+    print(f"✅ {len(spans)} spans from {len({s['pid'] for s in spans})} processes written to {out}")
+
+if __name__ == "__main__":
+    main()
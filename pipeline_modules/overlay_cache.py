@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered speaker overlay assets.
+
+assemble_reel used to loop each data/images/<speaker>.png at full resolution
+and scale it on every frame. overlay_asset() instead renders the PNG once at
+the size it is drawn in the reel and caches it under data/cache/overlays keyed
+by the source's content hash and the scale. The filter graph reads the cached
+image as a single frame (overlay repeats it after EOF), so renders do no
+per-frame PNG decoding or scaling.
+
+Assets keep straight alpha and are blended in overlay's default straight mode.
+RGB premultiplied by alpha turns transparent pixels into black, which ffmpeg
+converts to limited-range Y=16, not 0. The premultiplied blend d*(1-a)+s then
+adds that offset across the overlay's whole bounding box.
+"""
+import hashlib
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+OVERLAY_CACHE_DIR = BASE_DIR / "data" / "cache" / "overlays"
+CACHE_VERSION = 2  # bump when the asset recipe below changes
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def overlay_key(src: Path, scale: float) -> str:
+    params = f"v{CACHE_VERSION}\n{_file_hash(src)}\nscale={scale:g}\nstraight"
+    return hashlib.sha256(params.encode()).hexdigest()
+
+def overlay_asset(src: Path, scale: float, cache_dir: Path = OVERLAY_CACHE_DIR) -> Path:
+    """Return the cached scaled, straight-alpha RGBA PNG for src, rendering it on a miss."""
+    out = cache_dir / f"{src.stem}_{overlay_key(src, scale)[:16]}.png"
+    if out.exists():
+        return out
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.stem + ".tmp.png")
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(src),
+         "-vf", f"scale=iw*{scale:g}:-1,format=rgba",
+         "-frames:v", "1", str(tmp)],
+        check=True,
+    )
+    tmp.replace(out)
+    print(f"✅ Overlay cached → {out.name}")
+    return out
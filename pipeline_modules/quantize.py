@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Dynamic int8 quantisation for CPU inference.
+
+quantize_dynamic swaps nn.Linear and nn.LSTM/GRU for int8 versions that
+quantise activations on the fly; convolutions are not supported in dynamic
+mode and stay fp32. That covers the transformer-heavy parts: RVC's HuBERT
+feature extractor and the Linear layers of its synthesiser, and XTTS's GPT.
+XTTS's GPT-2 blocks use transformers' Conv1D (a Linear with a transposed
+weight), so those are converted to nn.Linear first.
+
+cached_quantized() pickles each quantised module under data/cache/quantized,
+keyed by the source weights' content hash, the torch version and
+CACHE_VERSION, so later runs load it instead of re-quantising. The content
+hash is remembered per path with the file's size and mtime, so a multi-GB
+checkpoint is only re-read when it has changed.
+
+Switches (values: fp32 | int8, like F0_METHOD):
+  RVC_PRECISION   convert_batch
+  XTTS_PRECISION  run_xtts_batch
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import torch
+from torch import nn
+
+BASE_DIR = Path(__file__).parent.parent.resolve()
+QUANT_CACHE_DIR = BASE_DIR / "data" / "cache" / "quantized"
+HASH_INDEX = "source_hashes.json"
+CACHE_VERSION = 1  # bump when the quantisation recipe below changes
+PRECISIONS = ("fp32", "int8")
+QUANTIZED_TYPES = {nn.Linear, nn.LSTM, nn.GRU}
+
+def check_precision(value: str, env_var: str) -> str:
+    if value not in PRECISIONS:
+        raise ValueError(f"{env_var}={value!r}; choose from {', '.join(PRECISIONS)}")
+    return value
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def source_hash(path: Path, cache_dir: Path = None) -> str:
+    """sha256 of path, recomputed only when its size or mtime differ from the last hashed copy."""
+    path = Path(path).resolve()
+    st = path.stat()
+    cache_dir = cache_dir or QUANT_CACHE_DIR
+    index_path = cache_dir / HASH_INDEX
+    try:
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(str(path))
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha256"]
+    digest = _file_hash(path)
+    index[str(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, indent=2))
+    tmp.replace(index_path)
+    return digest
+
+def quant_key(name: str, source: Path, cache_dir: Path = QUANT_CACHE_DIR) -> str:
+    params = f"v{CACHE_VERSION}\n{name}\n{source_hash(source, cache_dir)}\ntorch={torch.__version__}\nqint8"
+    return hashlib.sha256(params.encode()).hexdigest()
+
+def conv1d_to_linear(module: nn.Module) -> nn.Module:
+    """Replace transformers' Conv1D (x @ W + b, W is [in, out]) with an equivalent nn.Linear, in place."""
+    for name, child in module.named_children():
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            lin = nn.Linear(child.weight.shape[0], child.nf)
+            lin.weight = nn.Parameter(child.weight.detach().t().contiguous())
+            lin.bias = nn.Parameter(child.bias.detach().clone())
+            setattr(module, name, lin)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+def quantize_module(module: nn.Module) -> nn.Module:
+    """Dynamic int8 quantisation of the Linear/LSTM/GRU layers of an eval-mode CPU module, in place."""
+    module = conv1d_to_linear(module.float().cpu().eval())
+    return torch.ao.quantization.quantize_dynamic(module, QUANTIZED_TYPES, dtype=torch.qint8, inplace=True)
+
+def cached_quantized(module: nn.Module, name: str, source: Path, cache_dir: Path = QUANT_CACHE_DIR) -> nn.Module:
+    """Return the int8 version of module (loaded from source), from the disk cache when possible."""
+    out = cache_dir / f"{name}_{quant_key(name, source, cache_dir)[:16]}.pt"
+    if out.exists():
+        try:
+            return torch.load(out, map_location="cpu", weights_only=False).eval()
+        except Exception as e:
+            print(f"⚠️  Quantised cache unreadable, rebuilding {out.name}: {e}")
+    q = quantize_module(module)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.stem + ".tmp.pt")
+    torch.save(q, tmp)
+    tmp.replace(out)
+    print(f"✅ Quantised {name} cached → {out.name}")
+    return q
+
+def size_mb(module: nn.Module) -> float:
+    """Parameter and buffer size, counting packed int8 weights, in MB."""
+    total = sum(t.numel() * t.element_size() for t in module.state_dict().values() if torch.is_tensor(t))
+    for m in module.modules():
+        packed = getattr(m, "_packed_params", None)
+        if packed is not None and hasattr(packed, "_weight_bias"):
+            w, b = packed._weight_bias()
+            total += w.numel() * w.element_size() + (b.numel() * b.element_size() if b is not None else 0)
+    return total / 1e6
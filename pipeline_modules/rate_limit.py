@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Client-side pacing for OpenAI requests, shared by script_generator and the
+idea allocator.
+
+TokenBucket lets `rate` requests per second through on average with bursts
+of up to `capacity`. When the API's x-ratelimit-* headers (observe) or a 429
+(back_off) say the account's window is nearly spent, every waiter is held
+back until it resets.
+"""
+import asyncio
+import re
+import time
+
+def parse_reset(value):
+    """Seconds from an x-ratelimit-reset-* header such as '1s', '6m0s' or '120ms'."""
+    if not value:
+        return None
+    total = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity if capacity is not None else rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def observe(self, headers, in_flight: int = 1) -> None:
+        """Pause everyone until the window resets once remaining requests can't cover what's in flight."""
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+        if remaining is not None and reset and int(remaining) < in_flight:
+            self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+    def back_off(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+CPU-topology-aware thread and affinity planning for pipeline stages.
+
+Left alone, every stage sizes itself to the whole machine: torch uses one
+intra-op thread per core, x264 auto-threads, OpenMP/BLAS do the same. Run
+XTTS, RVC, whisperx and ffmpeg side by side and they oversubscribe the CPU.
+
+plan_resources() splits the CPUs this process may use (sched_getaffinity)
+into disjoint, NUMA-node-contiguous slices weighted per stage, and sizes each
+stage's thread budget to the physical cores in its slice. The parent passes a
+slice to a stage worker through stage_env(); the worker calls
+apply_stage_plan() to pin itself and size torch, and ffmpeg commands pick up
+ffmpeg_thread_args(). Pipelines running side by side each take a slot of the
+machine with slot_topology().
+
+Usage: python -m pipeline_modules.resource_planner [stage ...]
+"""
+import os
+import sys
+from pathlib import Path
+
+from pipeline_modules.logkit import current_run_id, run_logger
+
+SYSFS_NODES = Path("/sys/devices/system/node")
+SYSFS_CPUS = Path("/sys/devices/system/cpu")
+
+# Relative CPU appetite of each stage when they share the machine
+STAGE_WEIGHTS = {"xtts": 3, "rvc": 3, "align": 2, "ffmpeg": 2, "script": 1}
+DEFAULT_WEIGHT = 1
+
+CPUS_ENV = "PIPELINE_CPUS"
+THREADS_ENV = "PIPELINE_THREADS"
+INTEROP_ENV = "PIPELINE_INTEROP_THREADS"
+# Libraries that read their pool size from the environment at import time
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+def parse_cpulist(text: str):
+    """Parse a sysfs cpulist such as "0-3,8-11" into a sorted list of ints."""
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+def format_cpulist(cpus) -> str:
+    cpus = sorted(cpus)
+    runs = []
+    for c in cpus:
+        if runs and c == runs[-1][1] + 1:
+            runs[-1][1] = c
+        else:
+            runs.append([c, c])
+    return ",".join(f"{a}-{b}" if a != b else f"{a}" for a, b in runs)
+
+def allowed_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def cpu_topology():
+    """Return {node: [cpus]} restricted to the CPUs this process may run on."""
+    allowed = set(allowed_cpus())
+    nodes = {}
+    for d in sorted(SYSFS_NODES.glob("node[0-9]*")):
+        try:
+            cpus = [c for c in parse_cpulist((d / "cpulist").read_text()) if c in allowed]
+        except OSError:
+            continue
+        if cpus:
+            nodes[int(d.name[4:])] = cpus
+    return nodes or {0: sorted(allowed)}
+
+def physical_cores(cpus) -> int:
+    """Count distinct physical cores among cpus (SMT siblings count once)."""
+    cores = set()
+    for c in cpus:
+        try:
+            cores.add((SYSFS_CPUS / f"cpu{c}" / "topology" / "thread_siblings_list").read_text().strip())
+        except OSError:
+            cores.add(str(c))
+    return len(cores)
+
+def _shares(weights, total: int):
+    """Largest-remainder split of total CPUs by weight, at least one each."""
+    wsum = sum(weights)
+    raw = [total * w / wsum for w in weights]
+    shares = [max(1, int(r)) for r in raw]
+    by_remainder = sorted(range(len(raw)), key=lambda i: raw[i] - int(raw[i]), reverse=True)
+    i = 0
+    while sum(shares) < total:
+        shares[by_remainder[i % len(raw)]] += 1
+        i += 1
+    while sum(shares) > total and max(shares) > 1:
+        shares[shares.index(max(shares))] -= 1
+    return shares
+
+def plan_resources(stages, topology=None) -> dict:
+    """Assign each concurrently running stage a CPU slice and thread budget.
+
+    Largest stage first, each slice is taken from the NUMA node with the most
+    free CPUs, so a stage stays on one node whenever its share fits there and
+    only spills onto the next-freest node otherwise. With more stages than
+    CPUs, the surplus stages share CPUs round-robin.
+    """
+    topology = topology or cpu_topology()
+    n_cpus = sum(len(cs) for cs in topology.values())
+    node_of = {c: n for n, cs in topology.items() for c in cs}
+    stages = list(stages)
+    if not stages:
+        return {}
+    weights = [STAGE_WEIGHTS.get(s, DEFAULT_WEIGHT) for s in stages]
+    shares = _shares(weights, max(n_cpus, len(stages)))
+
+    free = {n: list(cs) for n, cs in topology.items()}
+    ordered = [c for node in sorted(topology) for c in topology[node]]
+    plan, wrap = {}, 0
+    for i in sorted(range(len(stages)), key=lambda i: -weights[i]):
+        cpus, want = [], shares[i]
+        for node in sorted(free, key=lambda n: (-len(free[n]), n)):
+            if not want or not free[node]:
+                break
+            take, free[node] = free[node][:want], free[node][want:]
+            cpus += take
+            want -= len(take)
+        for _ in range(want):
+            cpus.append(ordered[wrap % len(ordered)])
+            wrap += 1
+        cpus = sorted(set(cpus))
+        threads = max(1, physical_cores(cpus))
+        plan[stages[i]] = {
+            "cpus": cpus,
+            "nodes": sorted({node_of[c] for c in cpus}),
+            "threads": threads,
+            # Inference graphs have little inter-op parallelism; keep that pool small
+            "interop_threads": max(1, min(4, threads // 4)),
+        }
+    return {s: plan[s] for s in stages}
+
+def slot_topology(slot: int, slots: int, topology=None) -> dict:
+    """Restrict topology to pipeline slot `slot` (0-based) of `slots` running side by side."""
+    topology = topology or cpu_topology()
+    names = [f"slot{i}" for i in range(slots)]
+    cpus = set(plan_resources(names, topology)[names[slot]]["cpus"])
+    return {n: [c for c in cs if c in cpus] for n, cs in topology.items() if cpus.intersection(cs)}
+
+def stage_env(entry: dict) -> dict:
+    """Environment for a stage worker process running under a plan entry."""
+    env = {k: str(entry["threads"]) for k in THREAD_ENV_VARS}
+    env.update({
+        CPUS_ENV: format_cpulist(entry["cpus"]),
+        THREADS_ENV: str(entry["threads"]),
+        INTEROP_ENV: str(entry["interop_threads"]),
+    })
+    return env
+
+def planned_threads():
+    """Thread budget of the current stage worker, or None when unplanned."""
+    value = os.environ.get(THREADS_ENV)
+    return int(value) if value else None
+
+def apply_stage_plan() -> dict:
+    """Pin this process to its planned CPUs and size torch's pools; no-op when unplanned.
+
+    Call it once torch is imported (and before the first inference); calling
+    it earlier only pins the affinity, which child processes inherit.
+    """
+    applied = {}
+    cpus = os.environ.get(CPUS_ENV)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, parse_cpulist(cpus))
+        applied["cpus"] = cpus
+    threads = planned_threads()
+    torch = sys.modules.get("torch")
+    if threads and torch is not None:
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(int(os.environ.get(INTEROP_ENV, "1")))
+        except RuntimeError:
+            # Only settable before the first inter-op parallel work in this process
+            pass
+        applied.update(torch_threads=torch.get_num_threads(), torch_interop=torch.get_num_interop_threads())
+    return applied
+
+def ffmpeg_thread_args(threads=None, x264: bool = True):
+    """Output options capping ffmpeg's encoder and filter threads (and x264's own pool)."""
+    threads = threads or planned_threads()
+    if not threads:
+        return []
+    args = ["-threads", str(threads), "-filter_threads", str(threads)]
+    if x264:
+        args += ["-x264-params", f"threads={threads}"]
+    return args
+
+def log_plan(plan: dict, scope: str = "pipeline") -> None:
+    """Record the plan as a resource_plan event in the run log and print it."""
+    run_logger().info("resource_plan", extra={
+        "run_id": current_run_id(), "scope": scope,
+        "plan": {s: {**e, "cpus": format_cpulist(e["cpus"])} for s, e in plan.items()},
+    })
+    for stage, e in plan.items():
+        print(f"🧮 {stage}: cpus {format_cpulist(e['cpus'])} (node {','.join(map(str, e['nodes']))}), "
+              f"{e['threads']} threads, {e['interop_threads']} inter-op")
+
+if __name__ == "__main__":
+    topo = cpu_topology()
+    print("NUMA nodes:", {n: format_cpulist(c) for n, c in topo.items()})
+    log_plan(plan_resources(sys.argv[1:] or list(STAGE_WEIGHTS), topo), scope="cli")
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import json
+import os
 import torch
 from pathlib import Path
 from TTS.api import TTS
@@ -8,6 +8,11 @@ from TTS.tts.models.xtts import Xtts, XttsAudioConfig, XttsArgs
 from TTS.config.shared_configs import BaseDatasetConfig
 import torch.serialization
 
+from pipeline_modules.logkit import span
+from pipeline_modules.quantize import cached_quantized, check_precision
+from pipeline_modules.resource_planner import apply_stage_plan
+from pipeline_modules.script_schema import ScriptValidationError, check_script
+
 import transformers, TTS as coqui_tts, torch
 try:
     print("Transformers", transformers.__version__)
@@ -25,41 +30,106 @@ else:
     # PyTorch versions prior to 2.3 do not provide add_safe_globals
     pass
 
-def run_xtts():
-    """
-    Batch-generate base audio for all scripts using Coqui XTTS
-    with multi-clip speaker samples and per-character style reference.
-    """
-    # Configuration
-    ROOT = Path(__file__).parent.parent.resolve()
-    BASE_DIR = ROOT / "data"
-    SCRIPTS_DIR = BASE_DIR / "scripts"
-    OUTPUT_BASE = BASE_DIR / "audio" / "base"
+def xtts_checkpoint(model_name: str) -> Path:
+    """model.pth of a model downloaded by Coqui's ModelManager."""
+    from TTS.utils.generic_utils import get_user_data_dir
+    return Path(get_user_data_dir("tts")) / model_name.replace("/", "--") / "model.pth"
 
+def quantize_xtts(tts, model_name: str):
+    """Swap the loaded XTTS GPT (and its inference wrapper) for a cached dynamic-int8 version."""
+    xtts = tts.synthesizer.tts_model
+    xtts.gpt = cached_quantized(xtts.gpt, "xtts_gpt", xtts_checkpoint(model_name))
+    print("🧮 Using int8 XTTS GPT weights")
+
+TTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+ROOT = Path(__file__).parent.parent.resolve()
+SAMPLE_ROOT = ROOT / "xtts" / "speaker_samples"
+OUTPUT_BASE = ROOT / "data" / "audio" / "base"
+
+def speaker_references():
+    """Speaker sample clips and style clip per character."""
     # Discover speaker sample clips
-    SAMPLE_ROOT = ROOT / "xtts" / "speaker_samples"
-    SPEAKER_SAMPLES = {
+    speaker_samples = {
         "Peter": sorted((SAMPLE_ROOT / "peter").glob("*.wav")),
         "Stewie": sorted((SAMPLE_ROOT / "stewie").glob("*.wav")),
     }
     # Map each character to a single style clip
-    STYLE_CLIP = {
+    style_clip = {
         "Peter": SAMPLE_ROOT / "style/test", #peter" / "peter_style.wav",
         "Stewie": SAMPLE_ROOT / "style/test", #stewie" / "stewie_style.wav",
     }
+    return speaker_samples, style_clip
+
+def load_xtts():
+    # Stay within the resource planner's CPU slice and thread budget (no-op when unplanned)
+    apply_stage_plan()
 
-    # XTTS model
-    TTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+    # int8 = dynamic int8 GPT (see pipeline_modules/quantize.py)
+    precision = check_precision(os.getenv("XTTS_PRECISION", "fp32"), "XTTS_PRECISION")
 
     # Load model once with desired temperature
     print(f"🔊 Loading XTTS model: {TTS_MODEL}")
-    tts = TTS(model_name=TTS_MODEL, progress_bar=True, gpu=False)
-    # The high level TTS API handles device internally when gpu=False
+    with span("xtts.load_model", model=TTS_MODEL, precision=precision):
+        tts = TTS(model_name=TTS_MODEL, progress_bar=True, gpu=False)
+        # The high level TTS API handles device internally when gpu=False
+        if precision == "int8":
+            quantize_xtts(tts, TTS_MODEL)
+    return tts
+
+def synthesize_line(tts, index, name, line, samples, out_dir=OUTPUT_BASE):
+    filename = f"{index:02d}_{name}.wav"
+    output_path = out_dir / filename
+    print(f"🎧 [{index:02d}] {name}: {line}")
+    try:
+        # Ensure output directory exists
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with span("xtts.synthesize", line=index, character=name, chars=len(line)):
+            tts.tts_to_file(
+                text=line,
+                speaker_wav=[str(p) for p in samples],
+                # style_wav=str(style_clip),
+                language="en",
+                file_path=str(output_path),
+                temperature=0.8
+            )
+    except Exception as e:
+        print(f"❌ Failed to synthesize '{filename}': {e}")
+
+def voice_samples(name, speaker_samples, style_clip):
+    """Existing reference clips for name, or None if it can't be voiced (its lines are skipped, unnumbered)."""
+    samples = [p for p in speaker_samples.get(name, []) if p.exists()]
+    style = style_clip.get(name)
+    if not samples or not style or not style.exists():
+        return None
+    return samples
+
+def run_xtts():
+    """
+    Batch-generate base audio for all scripts using Coqui XTTS
+    with multi-clip speaker samples and per-character style reference.
+    """
+    # Configuration
+    SCRIPTS_DIR = ROOT / "data" / "scripts"
+    SPEAKER_SAMPLES, STYLE_CLIP = speaker_references()
+
+    # Validate every script before the model loads, so a malformed one fails in milliseconds
+    scripts = []
+    with span("xtts.read_scripts") as s:
+        for script_path in sorted(SCRIPTS_DIR.glob("*.json")):
+            try:
+                script, fixes = check_script(script_path.read_text())
+            except ScriptValidationError as e:
+                raise ScriptValidationError([f"{script_path.name}: {err}" for err in e.errors])
+            if fixes:
+                print(f"🔨 {script_path.name}: {'; '.join(fixes)}")
+            scripts.append((script_path, script))
+        s.set(scripts=len(scripts))
+
+    tts = load_xtts()
 
     # Process each generated script
-    for script_path in sorted(SCRIPTS_DIR.glob("*.json")):
+    for script_path, script in scripts:
         print(f"\n📜 Processing script: {script_path.name}")
-        script = json.loads(script_path.read_text())
 
         out_dir = OUTPUT_BASE #/ script_path.stem
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -67,33 +137,42 @@ def run_xtts():
         index = 1
         for character in script.get("characters", []):
             name = character.get("name")
-            samples = SPEAKER_SAMPLES.get(name, [])
-            samples = [p for p in samples if p.exists()]
-            style_clip = STYLE_CLIP.get(name)
-            if not samples or not style_clip or not style_clip.exists():
+            samples = voice_samples(name, SPEAKER_SAMPLES, STYLE_CLIP)
+            if samples is None:
                 print(f"⚠️ Missing samples or style for '{name}', skipping.")
                 continue
 
             for line in character.get("lines", []):
-                filename = f"{index:02d}_{name}.wav"
-                output_path = out_dir / filename
-                print(f"🎧 [{index:02d}] {name}: {line}")
-                try:
-                    # Ensure output directory exists
-                    output_path.parent.mkdir(parents=True, exist_ok=True)
-                    tts.tts_to_file(
-                        text=line,
-                        speaker_wav=[str(p) for p in samples],
-                        # style_wav=str(style_clip),
-                        language="en",
-                        file_path=str(output_path),
-                        temperature=0.8
-                    )
-                except Exception as e:
-                    print(f"❌ Failed to synthesize '{filename}': {e}")
+                synthesize_line(tts, index, name, line, samples, out_dir)
                 index += 1
 
     print("\n✅ XTTS batch conversion complete.")
 
+def run_xtts_streaming(spool_path):
+    """
+    Synthesize lines as script_generator.stream_script spools them, while the
+    rest of the script is still being written. Same file names as run_xtts:
+    lines are numbered here, counting only lines that are voiced, rather than
+    by the parser's document index.
+    """
+    from pipeline_modules.script_stream import follow_spool
+
+    SPEAKER_SAMPLES, STYLE_CLIP = speaker_references()
+    tts = load_xtts()
+    OUTPUT_BASE.mkdir(parents=True, exist_ok=True)
+    print(f"\n📜 Following script stream: {spool_path}")
+    index, skipped = 1, set()
+    for line in follow_spool(spool_path):
+        samples = voice_samples(line.character, SPEAKER_SAMPLES, STYLE_CLIP)
+        if samples is None:
+            if line.character not in skipped:
+                print(f"⚠️ Missing samples or style for '{line.character}', skipping.")
+                skipped.add(line.character)
+            continue
+        synthesize_line(tts, index, line.character, line.text, samples)
+        index += 1
+
+    print("\n✅ XTTS streaming synthesis complete.")
+
 if __name__ == "__main__":
-    run_xtts()
\ No newline at end of file
+    run_xtts()
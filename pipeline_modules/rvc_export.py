@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+TorchScript export of RVC speaker synthesisers.
+
+VC.get_vc rebuilds each speaker's synthesiser in Python, and eager CPU
+inference pays Python dispatch on every layer. export() traces net_g.infer
+with a fixed signature, (phone, phone_lengths, pitch, nsff0, sid) for f0
+models or (phone, phone_lengths, sid) otherwise, freezes the graph and saves
+it as weights/<speaker>/<speaker>.<precision>.ts.pt. The file embeds what
+convert_batch needs to skip get_vc (target rate, f0 flag, model version,
+speaker count) plus the hash of the source .pth, the torch version and
+EXPORT_VERSION; an export whose key no longer matches is ignored. The .pth
+hash comes from quantize.source_hash, so a warm start only re-reads the
+weights when their size or mtime changed.
+
+Before saving, the trace is checked against eager output at lengths other
+than the one traced, so a graph that baked in a sequence length is rejected.
+Both paths draw the same noise when seeded, so they must agree closely.
+
+Usage: python -m pipeline_modules.rvc_export <speaker> [<speaker> ...] [--precision int8] [--verify]
+"""
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import torch
+from torch import nn
+
+from pipeline_modules.quantize import source_hash
+
+EXPORT_VERSION = 1
+TRACE_FRAMES = 400             # 4 s of features (HuBERT frames upsampled to 100/s)
+VERIFY_FRAMES = (137, 900)     # off-trace lengths the graph must also handle
+PARITY_ATOL = 1e-3
+SEED = 1234
+
+def export_path(pth: Path, precision: str) -> Path:
+    return pth.with_name(f"{pth.stem}.{precision}.ts.pt")
+
+class _Infer(nn.Module):
+    """net_g.infer as a forward() with a fixed signature, returning the waveform only."""
+
+    def __init__(self, net_g):
+        super().__init__()
+        self.net_g = net_g
+
+    def forward(self, phone, phone_lengths, *args):
+        return self.net_g.infer(phone, phone_lengths, *args)[0]
+
+class ExportedSynthesizer:
+    """Stands in for VC.net_g: the RVC pipeline only calls infer(...)[0]."""
+
+    def __init__(self, module, meta: dict):
+        self.module, self.meta = module, meta
+
+    def infer(self, phone, phone_lengths, *args, rate=None):
+        return (self.module(phone, phone_lengths, *args),)
+
+def warm_start(vc, exported: ExportedSynthesizer):
+    """Set up vc from an export instead of VC.get_vc, without building the Python model."""
+    from rvc.modules.vc.pipeline import Pipeline
+
+    m = exported.meta
+    vc.tgt_sr, vc.if_f0, vc.version, vc.n_spk = m["tgt_sr"], m["if_f0"], m["version"], m["n_spk"]
+    vc.pipeline = Pipeline(vc.tgt_sr, vc.config)
+    vc.net_g = exported
+
+def example_inputs(version: str, if_f0: bool, frames: int):
+    phone = torch.randn(1, frames, 256 if version == "v1" else 768)
+    lengths = torch.tensor([frames], dtype=torch.long)
+    sid = torch.tensor([0], dtype=torch.long)
+    if not if_f0:
+        return phone, lengths, sid
+    pitch = torch.randint(1, 255, (1, frames), dtype=torch.long)
+    nsff0 = 100 + 200 * torch.rand(1, frames)
+    return phone, lengths, pitch, nsff0, sid
+
+def _run(module, inputs):
+    torch.manual_seed(SEED)
+    with torch.inference_mode():
+        return module(*inputs)
+
+def parity(traced, eager: nn.Module, version: str, if_f0: bool, lengths=VERIFY_FRAMES) -> float:
+    """Max abs difference between the traced graph and eager net_g over several input lengths."""
+    worst = 0.0
+    for frames in lengths:
+        inputs = example_inputs(version, if_f0, frames)
+        a, b = _run(traced, inputs), _run(eager, inputs)
+        if a.shape != b.shape:
+            raise RuntimeError(f"traced graph gives shape {tuple(a.shape)} at {frames} frames, "
+                               f"eager gives {tuple(b.shape)}")
+        worst = max(worst, (a - b).abs().max().item())
+    return worst
+
+def trace_synthesizer(net_g, version: str, if_f0: bool):
+    wrapper = _Infer(net_g.float().cpu().eval()).eval()
+    torch.manual_seed(SEED)
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapper, example_inputs(version, if_f0, TRACE_FRAMES), check_trace=False)
+    return torch.jit.freeze(traced), wrapper
+
+def export(vc, pth: Path, precision: str) -> Path:
+    """Trace the synthesiser already loaded into vc, check it and save it next to pth."""
+    meta = {
+        "export_version": EXPORT_VERSION, "torch": torch.__version__, "source_sha256": source_hash(pth),
+        "precision": precision, "version": vc.version, "if_f0": int(vc.if_f0),
+        "tgt_sr": int(vc.tgt_sr), "n_spk": int(vc.n_spk),
+    }
+    traced, eager = trace_synthesizer(vc.net_g, vc.version, bool(vc.if_f0))
+    diff = parity(traced, eager, vc.version, bool(vc.if_f0))
+    if diff > PARITY_ATOL:
+        raise RuntimeError(f"traced synthesiser differs from eager by {diff:.2e} (> {PARITY_ATOL}); "
+                           "not exported")
+    out = export_path(pth, precision)
+    tmp = out.with_name(out.name + ".tmp")
+    torch.jit.save(traced, str(tmp), _extra_files={"meta.json": json.dumps(meta)})
+    tmp.replace(out)
+    logging.info(f"✅ Exported {out.name} (max |traced - eager| = {diff:.2e})")
+    return out
+
+def load_exported(pth: Path, precision: str):
+    """Return an ExportedSynthesizer for pth, or None if there is no up-to-date export."""
+    path = export_path(pth, precision)
+    if not path.exists():
+        return None
+    extra = {"meta.json": ""}
+    try:
+        module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra)
+        meta = json.loads(extra["meta.json"])
+    except Exception as e:
+        logging.warning(f"⚠️ Unreadable export {path.name}, using eager model: {e}")
+        return None
+    expected = {"export_version": EXPORT_VERSION, "torch": torch.__version__, "source_sha256": source_hash(pth)}
+    stale = [k for k, v in expected.items() if meta.get(k) != v]
+    if stale:
+        logging.warning(f"⚠️ Export {path.name} is stale ({', '.join(stale)} changed); re-run rvc_export")
+        return None
+    return ExportedSynthesizer(module, meta)
+
+def main():
+    from rvc.modules.vc.modules import VC
+
+    from pipeline_modules.convert_batch import quantize_vc, validate_model
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("speakers", nargs="+")
+    ap.add_argument("--precision", choices=("fp32", "int8"), default="fp32")
+    ap.add_argument("--verify", action="store_true", help="only check existing exports against eager output")
+    args = ap.parse_args()
+
+    for speaker in args.speakers:
+        pth, _ = validate_model(speaker)
+        vc = VC()
+        vc.get_vc(str(pth))
+        if args.precision == "int8":
+            quantize_vc(vc, speaker, pth)
+        if not args.verify:
+            export(vc, pth, args.precision)
+        exported = load_exported(pth, args.precision)
+        if exported is None:
+            raise SystemExit(f"❌ No usable {args.precision} export for {speaker}")
+        diff = parity(exported.module, _Infer(vc.net_g).eval(), vc.version, bool(vc.if_f0))
+        status = "✅" if diff <= PARITY_ATOL else "❌"
+        print(f"{status} {speaker} ({args.precision}): max |exported - eager| = {diff:.2e} "
+              f"over {', '.join(map(str, VERIFY_FRAMES))} frames")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
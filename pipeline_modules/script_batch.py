@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Offline batch mode for script generation.
+
+Instead of one interactive completion per topic, queued topics are written
+as one chat-completion request per line to a JSONL file (the OpenAI Batch
+API input format), the file is submitted through a batch client, polled
+until the batch finishes, and the results are ingested into
+data/batches/scripts/ with their cost logged at the batch discount. Good for
+overnight queue fills: no latency-sensitive calls, higher throughput limits,
+lower cost.
+
+Ingested scripts wait in data/batches/scripts/ (kept by clean_workspace)
+until their topic runs: ingest moves each scripted job from its queue to
+<queue>_ready, run_next_job takes jobs from there first, and
+script_generator picks the waiting script up instead of calling the API.
+
+Every batch gets its own directory under data/batches/<name>/:
+  requests.jsonl   the submitted request lines
+  manifest.json    custom_id -> job (topic, tone, account)
+  batch.json       client, batch id, source queue, status and, after ingest, the cost summary
+  output.jsonl     raw result lines; errors.jsonl for failed requests
+  ingested         marker written once the results are ingested; ingest is a no-op after that
+
+Clients (SCRIPT_BATCH_CLIENT or --client):
+  openai   the OpenAI Batch API (files + batches, 24h completion window)
+  local    processes the file itself against any OpenAI-compatible chat
+           endpoint (OPENAI_BASE_URL, e.g. scripts/openai_stub_server.py or
+           a local model server) in a background thread, writing output in
+           the same format; the batch only lives as long as the process
+
+Usage:
+  python -m pipeline_modules.script_batch run --queue queue_tech [--limit 20] [--client local]
+  python -m pipeline_modules.script_batch submit --queue queue_tech
+  python -m pipeline_modules.script_batch poll data/batches/<name>
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from openai import OpenAI
+
+from pipeline_modules import db_logger
+from pipeline_modules.job_queue import READY_QUEUE_SUFFIX, load_queue, save_queue
+from pipeline_modules.script_generator import ScriptGenerator, estimate_cost
+from pipeline_modules.script_schema import ScriptValidationError
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BATCH_DIR = PROJECT_ROOT / "data" / "batches"
+READY_DIR = BATCH_DIR / "scripts"
+SCRIPTS_DIR = PROJECT_ROOT / "data" / "scripts"
+INGESTED_MARKER = "ingested"
+TEMPLATE_PATH = "data/prompts/prompt_template.txt"
+LOG_PATH = "data/logs/content_log.jsonl"
+
+BATCH_DISCOUNT = 0.5             # Batch API price relative to interactive calls
+COMPLETION_WINDOW = "24h"
+POLL_SECONDS = float(os.environ.get("SCRIPT_BATCH_POLL", "30"))
+LOCAL_WORKERS = int(os.environ.get("SCRIPT_BATCH_LOCAL_WORKERS", "4"))
+FINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+def _script_name(topic):
+    # Same naming as ScriptGenerator.save_script
+    return f"{topic.replace(' ', '_').lower()}.json"
+
+def _default_generator():
+    # The local client needs no key, but ScriptGenerator builds a client up front
+    return ScriptGenerator(os.getenv("OPENAI_API_KEY") or "local", TEMPLATE_PATH, LOG_PATH)
+
+def queued_jobs(queue_name, limit=None, skip_existing=True):
+    """Jobs from a queue file, left in place, skipping topics that already have a script."""
+    jobs = load_queue(queue_name)
+    if skip_existing:
+        jobs = [j for j in jobs if not any((d / _script_name(j["topic"])).exists() for d in (READY_DIR, SCRIPTS_DIR))]
+    return jobs[:limit] if limit else jobs
+
+def move_to_ready(queue_name, topics):
+    """Move the jobs for topics from queue_name to its _ready queue; returns how many moved."""
+    topics = set(topics)
+    items = load_queue(queue_name)
+    done = [j for j in items if j["topic"] in topics]
+    if done:
+        save_queue(queue_name + READY_QUEUE_SUFFIX, load_queue(queue_name + READY_QUEUE_SUFFIX) + done)
+        save_queue(queue_name, [j for j in items if j["topic"] not in topics])
+    return len(done)
+
+def take_ready_script(topic, dest_dir=SCRIPTS_DIR):
+    """Move the batch-generated script for topic into dest_dir; returns its new path, or None."""
+    src = READY_DIR / _script_name(topic)
+    if not src.exists():
+        return None
+    Path(dest_dir).mkdir(parents=True, exist_ok=True)
+    return Path(src.replace(Path(dest_dir) / src.name))
+
+def write_batch_file(jobs, generator, batch_dir):
+    """Write requests.jsonl and manifest.json for jobs; returns the requests path."""
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    with open(batch_dir / "requests.jsonl", "w", encoding="utf-8") as f:
+        for i, job in enumerate(jobs):
+            custom_id = f"script-{i:05d}"
+            tone = job.get("tone", "educational")
+            manifest[custom_id] = {"topic": job["topic"], "tone": tone, "account": job.get("account", "default_account")}
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions",
+                                "body": generator.request_body(job["topic"], tone)}, ensure_ascii=False) + "\n")
+    (batch_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return batch_dir / "requests.jsonl"
+
+class OpenAIBatchClient:
+    """The OpenAI Batch API."""
+    name = "openai"
+
+    def __init__(self):
+        self.client = OpenAI()
+
+    def submit(self, path):
+        with open(path, "rb") as f:
+            file_id = self.client.files.create(file=f, purpose="batch").id
+        batch = self.client.batches.create(input_file_id=file_id, endpoint="/v1/chat/completions",
+                                           completion_window=COMPLETION_WINDOW)
+        return batch.id
+
+    def retrieve(self, batch_id):
+        b = self.client.batches.retrieve(batch_id)
+        counts = b.request_counts
+        return {"status": b.status, "output_file_id": b.output_file_id, "error_file_id": b.error_file_id,
+                "completed": counts.completed if counts else 0, "failed": counts.failed if counts else 0,
+                "total": counts.total if counts else 0}
+
+    def content(self, file_id):
+        return self.client.files.content(file_id).text
+
+class LocalBatchClient:
+    """
+    Processes a batch file in-process against an OpenAI-compatible chat endpoint.
+
+    Output lines follow the Batch API format, so ingest does not care which
+    client ran the batch. File ids are paths of the output/error files.
+    """
+    name = "local"
+
+    def __init__(self, base_url=None, workers=LOCAL_WORKERS):
+        self.client = OpenAI(base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+                             api_key=os.getenv("OPENAI_API_KEY") or "local")
+        self.workers = workers
+        self._batches = {}
+
+    def submit(self, path):
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        path = Path(path)
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+        state = {"status": "in_progress", "output_file_id": None, "error_file_id": None,
+                 "completed": 0, "failed": 0, "total": len(lines)}
+        self._batches[batch_id] = state
+        threading.Thread(target=self._process, args=(batch_id, path.parent, lines), daemon=True).start()
+        return batch_id
+
+    def _one(self, batch_id, line):
+        try:
+            resp = self.client.chat.completions.create(**line["body"])
+            return {"id": f"{batch_id}-{line['custom_id']}", "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "request_id": resp.id, "body": resp.model_dump()},
+                    "error": None}
+        except Exception as e:
+            return {"id": f"{batch_id}-{line['custom_id']}", "custom_id": line["custom_id"], "response": None,
+                    "error": {"code": type(e).__name__, "message": str(e)}}
+
+    def _process(self, batch_id, batch_dir, lines):
+        state = self._batches[batch_id]
+        out_path, err_path = batch_dir / "output.jsonl", batch_dir / "errors.jsonl"
+        with ThreadPoolExecutor(self.workers) as pool, \
+                open(out_path, "w", encoding="utf-8") as out, open(err_path, "w", encoding="utf-8") as err:
+            for result in pool.map(lambda line: self._one(batch_id, line), lines):
+                (out if result["error"] is None else err).write(json.dumps(result) + "\n")
+                state["completed" if result["error"] is None else "failed"] += 1
+        state.update(status="completed", output_file_id=str(out_path),
+                     error_file_id=str(err_path) if state["failed"] else None)
+
+    def retrieve(self, batch_id):
+        state = self._batches.get(batch_id)
+        if state is None:
+            # Local batches die with the process that submitted them
+            return {"status": "expired", "output_file_id": None, "error_file_id": None,
+                    "completed": 0, "failed": 0, "total": 0}
+        return dict(state)
+
+    def content(self, file_id):
+        return Path(file_id).read_text(encoding="utf-8")
+
+BATCH_CLIENTS = {"openai": OpenAIBatchClient, "local": LocalBatchClient}
+
+def make_client(name=None):
+    name = name or os.getenv("SCRIPT_BATCH_CLIENT", "openai")
+    if name not in BATCH_CLIENTS:
+        raise ValueError(f"Unknown batch client {name!r}; choose from {', '.join(BATCH_CLIENTS)}")
+    return BATCH_CLIENTS[name]()
+
+def _save_state(batch_dir, state):
+    (batch_dir / "batch.json").write_text(json.dumps(state, indent=2))
+
+def submit(jobs, client, generator, name=None, queue=None):
+    """Write and submit a batch for jobs (taken from queue, if given); returns its directory."""
+    name = name or f"{datetime.now():%Y%m%d-%H%M%S}-scripts"
+    batch_dir = BATCH_DIR / name
+    path = write_batch_file(jobs, generator, batch_dir)
+    batch_id = client.submit(path)
+    _save_state(batch_dir, {"client": client.name, "batch_id": batch_id, "queue": queue, "status": "submitted",
+                            "requests": len(jobs), "submitted_at": datetime.now().isoformat(timespec="seconds")})
+    print(f"✅ Submitted {len(jobs)} script requests as {client.name} batch {batch_id} ({batch_dir})")
+    return batch_dir
+
+def poll(client, batch_dir, interval=POLL_SECONDS, timeout=None):
+    """Wait until the batch reaches a final state; returns the last status."""
+    state = json.loads((batch_dir / "batch.json").read_text())
+    started = time.monotonic()
+    while True:
+        status = client.retrieve(state["batch_id"])
+        state.update(status=status["status"], output_file_id=status["output_file_id"],
+                     error_file_id=status["error_file_id"])
+        _save_state(batch_dir, state)
+        print(f"⏱️ Batch {state['batch_id']}: {status['status']} "
+              f"({status['completed']}/{status['total']} done, {status['failed']} failed)")
+        if status["status"] in FINAL_STATES:
+            return status
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"batch {state['batch_id']} still {status['status']} after {timeout:.0f}s")
+        time.sleep(interval)
+
+def ingest(client, batch_dir, generator):
+    """
+    Save each successful result to READY_DIR and log its discounted cost; returns the cost summary.
+
+    Scripted jobs move from the batch's queue to its _ready queue. A batch is
+    ingested once: later calls find the marker and return the stored summary.
+    """
+    state = json.loads((batch_dir / "batch.json").read_text())
+    if (batch_dir / INGESTED_MARKER).exists():
+        print(f"⏩ Batch {state['batch_id']} was already ingested")
+        return state.get("summary")
+    manifest = json.loads((batch_dir / "manifest.json").read_text())
+    summary = {"scripts": 0, "failed": 0, "input_tokens": 0, "output_tokens": 0,
+               "cost_usd": 0.0, "cost_aud": 0.0, "saved_usd": 0.0}
+    results, scripted = [], []
+    for key, file_name in (("output_file_id", "output.jsonl"), ("error_file_id", "errors.jsonl")):
+        if not state.get(key):
+            continue
+        text = client.content(state[key])
+        if not (batch_dir / file_name).exists():
+            (batch_dir / file_name).write_text(text, encoding="utf-8")
+        results += [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for result in results:
+        job = manifest[result["custom_id"]]
+        response = result.get("response") or {}
+        body = response.get("body") or {}
+        cost = {}
+        if result.get("error") or response.get("status_code") != 200:
+            error = result.get("error") or body.get("error")
+        else:
+            usage = SimpleNamespace(**{k: body["usage"][k]
+                                       for k in ("prompt_tokens", "completion_tokens", "total_tokens")})
+            cost = estimate_cost(usage, price_factor=1 - BATCH_DISCOUNT)
+            summary["input_tokens"] += cost["input_tokens"]
+            summary["output_tokens"] += cost["output_tokens"]
+            summary["cost_usd"] += cost["estimated_cost_usd"]
+            summary["cost_aud"] += cost["estimated_cost_aud"]
+            summary["saved_usd"] += cost["estimated_cost_usd"] * BATCH_DISCOUNT / (1 - BATCH_DISCOUNT)
+            try:
+                script_json = generator.finalize(body["choices"][0]["message"]["content"], job["topic"], job["tone"])
+                error = None
+            except ScriptValidationError as e:
+                # Billed all the same, so the cost above still counts
+                error = str(e)
+        generator.content_log = db_logger.log_event(
+            generator.content_log,
+            account=job["account"],
+            topic=job["topic"],
+            status="Script Failed" if error else "Script Generated",
+            notes=f"batch {state['batch_id']}" + (f": {error}" if error else ""),
+            input_tokens=cost.get("input_tokens"),
+            output_tokens=cost.get("output_tokens"),
+            total_tokens=cost.get("total_tokens"),
+            estimated_cost_usd=cost.get("estimated_cost_usd"),
+            estimated_cost_aud=cost.get("estimated_cost_aud")
+        )
+        if error:
+            summary["failed"] += 1
+            print(f"❌ {job['topic']}: {error}")
+            continue
+        generator.save_script(script_json, job["topic"], READY_DIR)
+        scripted.append(job["topic"])
+        summary["scripts"] += 1
+    generator.save_log()
+    if state.get("queue"):
+        summary["dequeued"] = move_to_ready(state["queue"], scripted)
+
+    summary = {k: round(v, 6) if isinstance(v, float) else v for k, v in summary.items()}
+    state.update(status="ingested", ingested_at=datetime.now().isoformat(timespec="seconds"), summary=summary)
+    _save_state(batch_dir, state)
+    (batch_dir / INGESTED_MARKER).write_text(state["ingested_at"])
+    print(f"✅ Ingested {summary['scripts']} scripts ({summary['failed']} failed): "
+          f"${summary['cost_usd']:.4f} USD / ${summary['cost_aud']:.4f} AUD, "
+          f"${summary['saved_usd']:.4f} USD saved by batching")
+    return summary
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=("run", "submit", "poll"))
+    ap.add_argument("batch_dir", nargs="?", type=Path, help="batch directory (poll)")
+    ap.add_argument("--queue", help="queue to take topics from (run, submit)")
+    ap.add_argument("--limit", type=int, help="at most this many topics")
+    ap.add_argument("--client", choices=sorted(BATCH_CLIENTS), default=None)
+    ap.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between status checks")
+    args = ap.parse_args()
+
+    generator = _default_generator()
+    if args.command == "poll":
+        if args.batch_dir is None:
+            ap.error("poll needs a batch directory")
+        state = json.loads((args.batch_dir / "batch.json").read_text())
+        client = make_client(args.client or state["client"])
+        batch_dir = args.batch_dir
+    else:
+        if not args.queue:
+            ap.error(f"{args.command} needs --queue")
+        jobs = queued_jobs(args.queue, args.limit)
+        if not jobs:
+            print(f"⏩ No topics without scripts in {args.queue}")
+            return
+        client = make_client(args.client)
+        batch_dir = submit(jobs, client, generator, name=f"{datetime.now():%Y%m%d-%H%M%S}-{args.queue}",
+                           queue=args.queue)
+        if args.command == "submit":
+            return
+    status = poll(client, batch_dir, args.interval)
+    if not status["output_file_id"]:
+        raise SystemExit(f"❌ Batch ended as {status['status']} with no output")
+    if status["status"] != "completed":
+        # Expired or cancelled batches still return the requests that finished
+        print(f"⚠️ Batch ended as {status['status']}; ingesting the {status['completed']} finished requests")
+    ingest(client, batch_dir, generator)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,124 @@
 import os
+import asyncio
+import functools
 import json
 import sys
 import re
+import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-from forex_python.converter import CurrencyRates
+from openai import AsyncOpenAI, OpenAI, RateLimitError
 from pipeline_modules import db_logger
+from pipeline_modules.logkit import span
+from pipeline_modules.rate_limit import TokenBucket, parse_reset
+from pipeline_modules.script_schema import RESPONSE_FORMAT, check_script
+from pipeline_modules.script_stream import LineSpool, ScriptLineParser
+
+MODEL = "gpt-4o"
+INPUT_USD_PER_1K = 0.005
+OUTPUT_USD_PER_1K = 0.015
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FX_CACHE_PATH = PROJECT_ROOT / "data" / "cache" / "fx_usd_aud.json"
+FX_TTL_SECONDS = float(os.environ.get("SCRIPT_FX_TTL", 24 * 3600))
+FX_FALLBACK_RATE = 1.5
+FX_TIMEOUT_SECONDS = float(os.environ.get("SCRIPT_FX_TIMEOUT", "5"))
+
+BATCH_CONCURRENCY = int(os.environ.get("SCRIPT_CONCURRENCY", "4"))
+OPENAI_RPM = float(os.environ.get("OPENAI_RPM", "60"))
+MAX_RETRIES = int(os.environ.get("SCRIPT_MAX_RETRIES", "5"))
+RATE_LIMIT_ROUNDS = 3  # further attempts once the SDK's own retries hit 429s
+# Ask for the script JSON schema as the response format (see script_schema.py)
+STRUCTURED_OUTPUT = os.environ.get("SCRIPT_STRUCTURED_OUTPUT", "1") != "0"
+
+_fx_memo = {}
+
+def _fetch_usd_aud(timeout=None):
+    # Imported lazily: without forex-python (or a network) the cached/fallback rate is used
+    from forex_python.converter import CurrencyRates
+    timeout = FX_TIMEOUT_SECONDS if timeout is None else timeout
+    result = {}
+
+    def fetch():
+        try:
+            result["rate"] = float(CurrencyRates().get_rate('USD', 'AUD'))
+        except Exception as e:
+            result["error"] = e
+
+    # forex-python sets no timeout on its request, so wait on it from a daemon thread
+    worker = threading.Thread(target=fetch, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if "error" in result:
+        raise result["error"]
+    if "rate" not in result:
+        raise TimeoutError(f"no reply within {timeout:g}s")
+    return result["rate"]
+
+def usd_to_aud_rate(ttl=None, cache_path=None):
+    """
+    USD->AUD rate, fetched at most once per ttl seconds.
+
+    The rate is memoised in-process and cached on disk. When the live fetch
+    fails, a stale cached rate is preferred over FX_FALLBACK_RATE.
+    Returns (rate, source) with source one of memo/cache/live/stale/fallback.
+    """
+    ttl = FX_TTL_SECONDS if ttl is None else ttl
+    cache_path = cache_path or FX_CACHE_PATH
+    now = time.time()
+    if _fx_memo and now - _fx_memo["fetched_at"] < ttl:
+        return _fx_memo["rate"], "memo"
+    cached = None
+    try:
+        cached = json.loads(Path(cache_path).read_text())
+    except Exception:
+        pass
+    if cached and now - cached["fetched_at"] < ttl:
+        _fx_memo.update(cached)
+        return cached["rate"], "cache"
+    try:
+        rate = _fetch_usd_aud()
+    except Exception as e:
+        print(f"Could not fetch live exchange rate ({e}).")
+        if cached:
+            # Don't retry the fetch on every script until the next ttl window
+            _fx_memo.update(rate=cached["rate"], fetched_at=now)
+            return cached["rate"], "stale"
+        _fx_memo.update(rate=FX_FALLBACK_RATE, fetched_at=now)
+        return FX_FALLBACK_RATE, "fallback"
+    entry = {"rate": rate, "fetched_at": now}
+    _fx_memo.update(entry)
+    try:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(cache_path).write_text(json.dumps(entry))
+    except OSError:
+        pass
+    return rate, "live"
+
+def estimate_cost(usage, price_factor=1.0):
+    """Token counts and estimated cost of one completion, in USD and AUD (price_factor < 1 for discounts)."""
+    total_cost_usd = (usage.prompt_tokens * INPUT_USD_PER_1K
+                      + usage.completion_tokens * OUTPUT_USD_PER_1K) / 1000 * price_factor
+    rate, source = usd_to_aud_rate()
+    return {
+        "input_tokens": usage.prompt_tokens,
+        "output_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "estimated_cost_usd": total_cost_usd,
+        "estimated_cost_aud": total_cost_usd * rate,
+        "rate": rate,
+        "rate_source": source,
+    }
+
+@functools.lru_cache(maxsize=None)
+def _read_template(path, mtime):
+    with open(path, "r") as file:
+        return file.read()
 
 def clean_json_output(raw_response):
     # Remove triple backtick blocks and language tags
-    cleaned = re.sub(r"```json\\n|```|```json", "", raw_response, flags=re.IGNORECASE)
+    cleaned = re.sub(r"```(?:json)?", "", raw_response, flags=re.IGNORECASE)
     return cleaned.strip()
 
 class ScriptGenerator:
@@ -26,6 +134,7 @@ class ScriptGenerator:
         """
         self.api_key = api_key
         self.client = OpenAI(api_key=self.api_key)
+        self._async_client = None
 
         # dynamic resolve file paths relative to proj root
         self.project_root = Path(__file__).resolve().parent.parent
@@ -33,16 +142,70 @@ class ScriptGenerator:
         self.log_path = self.project_root / log_path
         
         self.prompt_template = self.load_prompt_template(self.prompt_template_path)
-        self.df_log = db_logger.init_log(self.log_path)
+        self.content_log = db_logger.init_log(self.log_path)
 
     
     
     def load_prompt_template(self, path):
         """
-        Loads prompt template from files
+        Loads prompt template from files (cached until the file changes)
+        """
+        return _read_template(str(path), Path(path).stat().st_mtime)
+
+    def build_prompt(self, topic, tone):
+        prompt = self.prompt_template.replace("[INSERT TOPIC HERE]", topic)
+        return prompt.replace("[INSERT TONE HERE, e.g., 'humorous']", tone)
+
+    def request_body(self, topic, tone, **extra):
+        """
+        Chat completion arguments for one script, with the script schema as response format
+        """
+        body = {
+            "model": MODEL,
+            "messages": [{"role": "user", "content": self.build_prompt(topic, tone)}],
+            "temperature": 0.7,  # balanced creativity
+            **extra,
+        }
+        if STRUCTURED_OUTPUT:
+            body["response_format"] = RESPONSE_FORMAT
+        return body
+
+    def finalize(self, content, topic, tone):
+        """
+        Validates (repairing what it can) a raw completion; returns the script as JSON text.
+        Raises script_schema.ScriptValidationError before any audio work starts.
+        """
+        script, fixes = check_script(clean_json_output(content), topic=topic, tone=tone)
+        if fixes:
+            print(f"🔨 Repaired script for '{topic}': {'; '.join(fixes)}")
+        return json.dumps(script, indent=2, ensure_ascii=False)
+
+    def record_usage(self, usage, topic, account, save=True):
+        """
+        Prints the estimated cost of a completion and logs it
         """
-        with open(path, "r") as file:
-            return file.read()
+        cost = estimate_cost(usage)
+        print(f"Script generated successfully.\nInput Tokens: {cost['input_tokens']}, "
+              f"Output Tokens: {cost['output_tokens']},\nEstimated Cost: ${cost['estimated_cost_aud']:.4f} AUD "
+              f"({cost['rate']:.2f} rate, {cost['rate_source']})")
+        self.content_log = db_logger.log_event(
+            self.content_log,
+            account=account,
+            topic=topic,
+            status="Script Generated",
+            notes="Success",
+            input_tokens=cost["input_tokens"],
+            output_tokens=cost["output_tokens"],
+            total_tokens=cost["total_tokens"],
+            estimated_cost_usd=cost["estimated_cost_usd"],
+            estimated_cost_aud=cost["estimated_cost_aud"]
+        )
+        if save:
+            self.save_log()
+
+    def save_log(self):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        db_logger.save_log(self.content_log, self.log_path)
     
     def generate_script(self, topic, tone="educational", account="default_account"):
         """
@@ -50,70 +213,133 @@ class ScriptGenerator:
         
         Steps:
         - Insert topic + tone into the template
-        - Sends it to GPT with JSON output mode
+        - Sends it to GPT with the script JSON schema as response format
+        - Validates (and if needed repairs) the script
         Returns the result as JSON
         """
-        prompt = self.prompt_template.replace("[INSERT TOPIC HERE]", topic)
-        prompt = prompt.replace("[INSERT TONE HERE, e.g., 'humorous']", tone)
-
         try:
             # Call GPT
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role":"user",
-                    "content": prompt
-                    }],
-                temperature=0.7 # balanced creativity
-            )
-
-            # save cost details 
-            usage = response.usage
-            input_tokens = usage.prompt_tokens
-            output_tokens = usage.completion_tokens
-            total_tokens = usage.total_tokens
-
-            # Print estimated cost
-            input_cost_usd = input_tokens * 0.005 / 1000
-            output_cost_usd = output_tokens * 0.015 / 1000
-            total_cost_usd = input_cost_usd + output_cost_usd
-
-            # Convert to AUD using forex-python
-            try:
-                c = CurrencyRates()
-                rate = c.get_rate('USD', 'AUD')
-                total_cost_aud = total_cost_usd * rate
-            except Exception:
-                rate = 1.5
-                total_cost_aud = total_cost_usd * rate
-                print("Could not fetch live exchange rate. AUD conversion skipped.")
-
-            print(f"Script generated successfully.\nInput Tokens: {input_tokens}, Output Tokens: {output_tokens},\nEstimated Cost: ${total_cost_aud:.4f} AUD ({rate:.2f} rate if available)")
-            
-            # Log the event
-            self.df_log = db_logger.log_event(
-                self.df_log,
-                account=account,
-                topic=topic,
-                status="Script Generated",
-                notes="Success",
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                total_tokens=total_tokens,
-                estimated_cost_usd=total_cost_usd,
-                estimated_cost_aud=total_cost_aud
-            )
-            self.log_path.parent.mkdir(parents=True, exist_ok=True)
-            db_logger.save_log(self.df_log, self.log_path)
-
-            # Extract and return the responsw content
+            with span("script.request", topic=topic, model=MODEL):
+                response = self.client.chat.completions.create(**self.request_body(topic, tone))
+
+            # Print estimated cost and log the event
+            self.record_usage(response.usage, topic, account)
+
+            # Extract the response content
             script_json_raw = response.choices[0].message.content
-            script_json = clean_json_output(script_json_raw)
-            return script_json
 
         except Exception as e:
             raise RuntimeError(f"OpenAI API call failed: {e}")
+        return self.finalize(script_json_raw, topic, tone)
 
+    def stream_script(self, topic, tone="educational", account="default_account", on_line=None):
+        """
+        generate_script, but streamed: on_line(ScriptLine) is called for each
+        characters[].lines[] entry as soon as it is complete, so TTS can start
+        while the rest is still being written. Returns the full cleaned JSON.
+        on_line can be any callable, e.g. queue.Queue().put or a LineSpool.
+        """
+        parser = ScriptLineParser(on_line or (lambda line: None))
+        parts, usage = [], None
+        try:
+            with span("script.stream", topic=topic, model=MODEL) as s:
+                stream = self.client.chat.completions.create(
+                    **self.request_body(topic, tone, stream=True, stream_options={"include_usage": True}))
+                for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    for choice in chunk.choices:
+                        if choice.delta.content:
+                            parts.append(choice.delta.content)
+                            parser.feed(choice.delta.content)
+                s.set(lines=parser.count)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API call failed: {e}")
+        if usage is not None:
+            self.record_usage(usage, topic, account)
+        return self.finalize("".join(parts), topic, tone)
+
+    @property
+    def async_client(self):
+        """
+        One pooled async client per generator; the SDK retries 429/5xx with backoff
+        """
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, max_retries=MAX_RETRIES)
+        return self._async_client
+
+    async def generate_script_async(self, topic, tone, account, limiter, in_flight):
+        """
+        Async generate_script: paced by limiter, returns the validated JSON string
+        """
+        body = self.request_body(topic, tone)
+        for attempt in range(RATE_LIMIT_ROUNDS + 1):
+            await limiter.acquire()
+            in_flight[0] += 1
+            try:
+                raw = await self.async_client.chat.completions.with_raw_response.create(**body)
+            except RateLimitError as e:
+                # The SDK already retried; hold every worker back before trying again
+                if attempt == RATE_LIMIT_ROUNDS:
+                    raise RuntimeError(f"OpenAI API call failed: {e}")
+                wait = parse_reset(e.response.headers.get("x-ratelimit-reset-requests")) or 2 ** attempt
+                limiter.back_off(wait)
+                continue
+            finally:
+                in_flight[0] -= 1
+            limiter.observe(raw.headers, in_flight[0] + 1)
+            response = raw.parse()
+            # Logged in memory; generate_scripts_async saves once per batch
+            self.record_usage(response.usage, topic, account, save=False)
+            return self.finalize(response.choices[0].message.content, topic, tone)
+
+    async def generate_scripts_async(self, jobs, output_dir="data/scripts/", concurrency=BATCH_CONCURRENCY,
+                                     rpm=OPENAI_RPM):
+        """
+        Generates and saves scripts for many queued jobs concurrently
+
+        jobs are queue items ({"topic", "tone", "account", ...}). Returns one
+        {"topic", "path"} or {"topic", "error"} dict per job, in order; a
+        failed topic does not stop the others.
+        """
+        limiter = TokenBucket(rpm / 60.0, capacity=concurrency)
+        # Resolve the exchange rate once, off the event loop: record_usage then reads the memo
+        await asyncio.to_thread(usd_to_aud_rate)
+        sem = asyncio.Semaphore(max(1, concurrency))
+        in_flight = [0]
+
+        async def one(job):
+            topic = job["topic"]
+            async with sem:
+                try:
+                    script_json = await self.generate_script_async(
+                        topic, job.get("tone", "educational"), job.get("account", "default_account"),
+                        limiter, in_flight)
+                except Exception as e:
+                    print(f"Script generation failed for '{topic}': {e}")
+                    self.content_log = db_logger.log_event(self.content_log, account=job.get("account", "default_account"),
+                                                      topic=topic, status="Script Failed", notes=str(e))
+                    return {"topic": topic, "error": str(e)}
+            return {"topic": topic, "path": self.save_script(script_json, topic, output_dir)}
+
+        try:
+            return await asyncio.gather(*(one(job) for job in jobs))
+        finally:
+            self.save_log()
+
+    def generate_scripts(self, jobs, output_dir="data/scripts/", concurrency=BATCH_CONCURRENCY, rpm=OPENAI_RPM):
+        """
+        Sync wrapper around generate_scripts_async
+        """
+        async def run():
+            try:
+                return await self.generate_scripts_async(jobs, output_dir, concurrency, rpm)
+            finally:
+                # The pooled client is bound to this event loop
+                if self._async_client is not None:
+                    await self._async_client.close()
+                    self._async_client = None
+        return asyncio.run(run())
     
     def save_script(self, script_json, topic, output_dir):
         """
@@ -129,24 +355,64 @@ class ScriptGenerator:
 
         return file_path
 
+@functools.lru_cache(maxsize=None)
+def _default_generator():
+    load_dotenv(dotenv_path=PROJECT_ROOT / ".env")
+    return ScriptGenerator(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        prompt_template_path="data/prompts/prompt_template.txt",
+        log_path="data/logs/content_log.jsonl"
+    )
+
+def _batch_script(topic):
+    # Imported here: script_batch builds on this module
+    from pipeline_modules.script_batch import take_ready_script
+    return take_ready_script(topic, PROJECT_ROOT / "data" / "scripts")
+
 #if __name__ == "__main__":
 def script_generator(topic, tone, account="default_account"):
-    from pathlib import Path
-    load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
-    api_key = os.getenv("OPENAI_API_KEY")
+    # A script the offline batch already paid for comes first
+    path = _batch_script(topic)
+    if path is not None:
+        print(f"Using batch-generated script {path}")
+        return path
 
-    # Initialise the generator
-    generator = ScriptGenerator(
-        api_key=api_key,
-        prompt_template_path="data/prompts/prompt_template.txt",
-        log_path="data/logs/content_log.csv"
-    )
+    # One generator per process: client, template and CSV log are reused across topics
+    generator = _default_generator()
 
     # Example script generation
     # topic = "Quantum Entanglement"
     # tone = "Humorous"
 
     # generate and save script
-    script_json = generator.generate_script(topic=topic, tone=tone, account="my_test_account")
+    script_json = generator.generate_script(topic=topic, tone=tone, account=account)
     file_path = generator.save_script(script_json, topic, output_dir="data/scripts/")
-    return file_path
\ No newline at end of file
+    return file_path
+
+def script_generator_stream(topic, tone, account="default_account", spool_path=None):
+    """
+    Streams the script, spooling each finished line to spool_path for
+    run_xtts_streaming in the XTTS venv, then saves the script as usual
+    """
+    spool = LineSpool(spool_path or PROJECT_ROOT / "data" / "scripts" / ".stream" / "lines.jsonl")
+    path = _batch_script(topic)
+    if path is not None:
+        # Spool the finished script's lines in one go, numbered as if streamed
+        ScriptLineParser(spool).feed(path.read_text(encoding="utf-8"))
+        spool.close()
+        print(f"Using batch-generated script {path}")
+        return path
+    try:
+        script_json = _default_generator().stream_script(topic=topic, tone=tone, account=account, on_line=spool)
+    except Exception as e:
+        spool.close(error=str(e))
+        raise
+    spool.close()
+    return _default_generator().save_script(script_json, topic, output_dir="data/scripts/")
+
+def script_generator_batch(jobs, concurrency=BATCH_CONCURRENCY):
+    """
+    Generates scripts for a list of queued jobs concurrently; returns their paths (None where it failed)
+    """
+    results = _default_generator().generate_scripts(jobs, output_dir="data/scripts/", concurrency=concurrency)
+    return [r.get("path") for r in results]
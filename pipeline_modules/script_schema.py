@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Schema, validation and repair for generated dialogue scripts.
+
+RESPONSE_SCHEMA is sent as the OpenAI json_schema response format (strict
+mode accepts only a subset of JSON Schema, so no length limits there).
+SCRIPT_SCHEMA adds what the pipeline relies on: known speakers, at least
+one non-empty line per character, and lines no longer than MAX_LINE_CHARS,
+beyond which XTTS tends to rush, drift or truncate.
+
+validate() uses a compiled fastjsonschema validator when the package is
+installed and an equivalent hand-written check otherwise. check_script()
+parses, repairs what can be repaired (fences, stray whitespace, speaker name
+casing, empty or unknown-speaker entries, back-to-back entries of the same
+speaker, over-long lines split at sentence or clause boundaries) and raises
+ScriptValidationError for the rest, so a bad script fails in milliseconds
+instead of after minutes of synthesis. Entries stay in document order: a
+speaker appearing in several entries is the turn-taking of the dialogue.
+
+Usage: python -m pipeline_modules.script_schema data/scripts/*.json [--fix]
+"""
+import argparse
+import copy
+import json
+import re
+import sys
+from pathlib import Path
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+SPEAKERS = ("Peter", "Stewie")
+MAX_LINE_CHARS = 250
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topic": {"type": "string"},
+        "tone": {"type": "string"},
+        "characters": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "enum": list(SPEAKERS)},
+                    "lines": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["name", "lines"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["topic", "tone", "characters"],
+    "additionalProperties": False,
+}
+
+SCRIPT_SCHEMA = copy.deepcopy(RESPONSE_SCHEMA)
+SCRIPT_SCHEMA["properties"]["characters"]["minItems"] = 1
+_lines = SCRIPT_SCHEMA["properties"]["characters"]["items"]["properties"]["lines"]
+_lines["minItems"] = 1
+_lines["items"].update(minLength=1, maxLength=MAX_LINE_CHARS)
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "dialogue_script", "strict": True, "schema": RESPONSE_SCHEMA},
+}
+
+class ScriptValidationError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("invalid script: " + "; ".join(errors))
+
+def _fallback_errors(script):
+    """The checks SCRIPT_SCHEMA encodes, for when fastjsonschema is not installed."""
+    if not isinstance(script, dict):
+        return ["script must be an object"]
+    errors = [f"missing {k}" for k in ("topic", "tone", "characters") if k not in script]
+    errors += [f"unexpected key {k!r}" for k in script if k not in ("topic", "tone", "characters")]
+    errors += [f"{k} must be a string" for k in ("topic", "tone") if k in script and not isinstance(script[k], str)]
+    characters = script.get("characters", [])
+    if not isinstance(characters, list) or not characters:
+        return errors + ["characters must be a non-empty array"]
+    for i, c in enumerate(characters):
+        if not isinstance(c, dict) or set(c) != {"name", "lines"}:
+            errors.append(f"characters[{i}] must have exactly name and lines")
+            continue
+        if c["name"] not in SPEAKERS:
+            errors.append(f"characters[{i}].name {c['name']!r} is not one of {', '.join(SPEAKERS)}")
+        if not isinstance(c["lines"], list) or not c["lines"]:
+            errors.append(f"characters[{i}].lines must be a non-empty array")
+            continue
+        for j, line in enumerate(c["lines"]):
+            if not isinstance(line, str) or not line:
+                errors.append(f"characters[{i}].lines[{j}] must be a non-empty string")
+            elif len(line) > MAX_LINE_CHARS:
+                errors.append(f"characters[{i}].lines[{j}] is {len(line)} chars (max {MAX_LINE_CHARS})")
+    return errors
+
+if fastjsonschema is not None:
+    _compiled = fastjsonschema.compile(SCRIPT_SCHEMA)
+
+    def validate(script):
+        """List of validation errors (empty when valid); the compiled validator stops at the first."""
+        try:
+            _compiled(script)
+            return []
+        except fastjsonschema.JsonSchemaException as e:
+            return [e.message]
+else:
+    def validate(script):
+        """List of validation errors (empty when valid)."""
+        return _fallback_errors(script)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:—–])\s+")
+
+def split_line(line, limit=MAX_LINE_CHARS):
+    """Split an over-long line into pieces of at most limit chars, preferring sentence, then clause, then word breaks."""
+    if len(line) <= limit:
+        return [line]
+    for pattern in (_SENTENCE_END, _CLAUSE_END, re.compile(r"\s+")):
+        parts = [p for p in pattern.split(line) if p]
+        if len(parts) > 1:
+            break
+    else:
+        # One unbroken run of text: hard split
+        return [line[i:i + limit] for i in range(0, len(line), limit)]
+    pieces, current = [], ""
+    for part in parts:
+        joined = f"{current} {part}" if current else part
+        if len(joined) <= limit:
+            current = joined
+        else:
+            if current:
+                pieces.append(current)
+            current = part
+    if current:
+        pieces.append(current)
+    return [p for piece in pieces for p in split_line(piece, limit)]
+
+_SPEAKER_NAMES = {s.lower(): s for s in SPEAKERS}
+
+def speaker_name(name):
+    """The SPEAKERS spelling of a character name (any casing, stray whitespace), or None for unknown speakers."""
+    return _SPEAKER_NAMES.get(str(name).strip().lower())
+
+def clean_line(line):
+    """A line with its whitespace collapsed, split to MAX_LINE_CHARS pieces; [] for a blank line."""
+    text = " ".join(str(line).split())
+    return split_line(text) if text else []
+
+def repair(script, topic=None, tone=None):
+    """Best-effort fix of common defects; returns (script, list of fixes applied)."""
+    fixes = []
+    if not isinstance(script, dict):
+        return script, fixes
+    script = dict(script)
+    for key, fallback in (("topic", topic), ("tone", tone)):
+        if not isinstance(script.get(key), str) and fallback is not None:
+            script[key] = fallback
+            fixes.append(f"set missing {key}")
+    for key in [k for k in script if k not in ("topic", "tone", "characters")]:
+        del script[key]
+        fixes.append(f"dropped key {key!r}")
+    entries = []
+    for c in script.get("characters") or []:
+        if not isinstance(c, dict):
+            fixes.append("dropped a non-object character")
+            continue
+        name = speaker_name(c.get("name", ""))
+        if name is None:
+            fixes.append(f"dropped an entry for unknown speaker {c.get('name')!r}")
+            continue
+        if name != c.get("name"):
+            fixes.append(f"renamed {c.get('name')!r} to {name!r}")
+        lines = c.get("lines") if isinstance(c.get("lines"), list) else []
+        cleaned = []
+        for line in lines:
+            text = " ".join(str(line).split())
+            pieces = clean_line(text)
+            if not pieces:
+                fixes.append(f"dropped an empty {name} line")
+            elif len(pieces) > 1:
+                fixes.append(f"split a {len(text)}-char {name} line into {len(pieces)}")
+            cleaned += pieces
+        if not cleaned:
+            fixes.append(f"dropped an empty {name} entry")
+        elif entries and entries[-1]["name"] == name:
+            # Only back-to-back entries: merging across turns would reorder the dialogue
+            fixes.append(f"merged consecutive {name} entries")
+            entries[-1]["lines"] += cleaned
+        else:
+            entries.append({"name": name, "lines": cleaned})
+    if "characters" in script:
+        script["characters"] = entries
+    return script, fixes
+
+def check_script(script, topic=None, tone=None, fix=True):
+    """
+    Parse (if given text), optionally repair and validate a script.
+
+    Returns (script, fixes); raises ScriptValidationError if it is still
+    invalid. topic/tone fill those fields when the model left them out.
+    """
+    if isinstance(script, (str, bytes)):
+        text = re.sub(r"```(?:json)?", "", script if isinstance(script, str) else script.decode(), flags=re.I)
+        try:
+            script = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ScriptValidationError([f"not valid JSON: {e}"])
+    fixes = []
+    if fix:
+        script, fixes = repair(script, topic, tone)
+    errors = validate(script)
+    if errors:
+        raise ScriptValidationError(errors)
+    return script, fixes
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("scripts", nargs="+", type=Path)
+    ap.add_argument("--fix", action="store_true", help="write repaired scripts back in place")
+    args = ap.parse_args()
+    failed = 0
+    for path in args.scripts:
+        try:
+            script, fixes = check_script(path.read_text(encoding="utf-8"))
+        except ScriptValidationError as e:
+            failed += 1
+            print(f"❌ {path.name}: {e}")
+            continue
+        if fixes and args.fix:
+            path.write_text(json.dumps(script, indent=2, ensure_ascii=False), encoding="utf-8")
+        status = "✅" if not fixes else ("🔨" if args.fix else "⚠️")
+        print(f"{status} {path.name}" + (f": {'; '.join(fixes)}" if fixes else ""))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
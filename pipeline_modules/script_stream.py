@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Incremental parsing of a streamed dialogue script.
+
+ScriptLineParser is fed the completion text as it streams in and calls
+on_line(ScriptLine) as soon as each characters[].lines[] string is closed,
+long before the JSON document is complete. Lines are numbered in document
+order, the order run_xtts synthesises a finished script in
+(run_xtts_streaming numbers the lines it voices itself, as run_xtts does). A line that arrives before its
+character's "name" is held until the name turns up. Lines get the same
+clean-up as script_schema.repair (speaker_name, clean_line): names take the
+SPEAKERS casing, unknown or missing speakers and blank lines are dropped and
+long lines are split, so the numbering still matches the validated script
+that gets saved.
+
+LLM and XTTS run in different venvs, so lines cross the process boundary
+through a spool file: LineSpool appends one JSON object per line and a
+final {"done": true}; follow_spool tails it from the XTTS side.
+"""
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from pipeline_modules.script_schema import clean_line, speaker_name
+
+SPOOL_POLL_SECONDS = 0.1
+SPOOL_TIMEOUT = 180.0    # give up when the spool stops growing for this long
+
+@dataclass
+class ScriptLine:
+    index: int        # 1-based, in document order
+    character: str
+    text: str
+
+class ScriptLineParser:
+    """
+    Streaming JSON scanner that only tracks where it is in the document.
+
+    Keys, strings and container nesting are followed character by character;
+    every other value is skipped. Text before the first '{' (e.g. a ```json
+    fence) and after the root object closes is ignored.
+    """
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self.stack = []          # [kind, key or index] per open container
+        self.expect_key = False
+        self.in_string = False
+        self.escape = False
+        self.raw = []
+        self.started = self.finished = False
+        self.named = False       # this character's "name" has been seen
+        self.name = None         # its SPEAKERS spelling; None for an unknown speaker
+        self.pending = []        # lines seen before their character's name
+        self.count = 0
+
+    def feed(self, text):
+        for ch in text:
+            if self.finished:
+                return
+            if self.in_string:
+                self._string_char(ch)
+            elif not self.started:
+                if ch == "{":
+                    self.started = True
+                    self._open("obj")
+            else:
+                self._structural(ch)
+
+    def _string_char(self, ch):
+        if self.escape:
+            self.escape = False
+        elif ch == "\\":
+            self.escape = True
+        elif ch == '"':
+            self.in_string = False
+            self._on_string(json.loads('"' + "".join(self.raw) + '"'))
+            return
+        self.raw.append(ch)
+
+    def _structural(self, ch):
+        if ch == '"':
+            self.in_string, self.raw = True, []
+        elif ch == "{":
+            self._open("obj")
+        elif ch == "[":
+            self._open("arr")
+        elif ch in "}]":
+            self._close()
+        elif ch == ",":
+            top = self.stack[-1]
+            if top[0] == "arr":
+                top[1] += 1
+            else:
+                self.expect_key = True
+        elif ch == ":":
+            self.expect_key = False
+
+    def _open(self, kind):
+        self.stack.append([kind, None if kind == "obj" else 0])
+        self.expect_key = kind == "obj"
+
+    def _close(self):
+        if self._in_character():
+            # End of one character object; lines still held never got a name, and repair drops those
+            self.named, self.name, self.pending = False, None, []
+        self.stack.pop()
+        self.expect_key = False
+        if not self.stack:
+            self.finished = True
+
+    def _in_character(self):
+        s = self.stack
+        return len(s) == 3 and s[0][1] == "characters" and s[1][0] == "arr" and s[2][0] == "obj"
+
+    def _on_string(self, value):
+        top = self.stack[-1]
+        if top[0] == "obj" and self.expect_key:
+            top[1] = value
+            return
+        if self._in_character() and top[1] == "name":
+            self.named, self.name = True, speaker_name(value)
+            if self.name is not None:
+                for text in self.pending:
+                    self._emit(self.name, text)
+            self.pending = []
+        elif len(self.stack) == 4 and top[0] == "arr" and self.stack[2][1] == "lines" and self._char_path():
+            if not self.named:
+                self.pending.append(value)
+            elif self.name is not None:
+                self._emit(self.name, value)
+
+    def _char_path(self):
+        s = self.stack
+        return s[0][1] == "characters" and s[1][0] == "arr" and s[2][0] == "obj"
+
+    def _emit(self, character, text):
+        for piece in clean_line(text):
+            self.count += 1
+            self.on_line(ScriptLine(self.count, character, piece))
+
+class LineSpool:
+    """on_line callback that appends each line to a JSONL spool for another process."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("")
+
+    def __call__(self, line):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(line), ensure_ascii=False) + "\n")
+
+    def close(self, error=None):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"done": True, "error": error}) + "\n")
+
+def follow_spool(path, timeout=SPOOL_TIMEOUT, poll=SPOOL_POLL_SECONDS):
+    """Yield ScriptLines from a spool as they are written, until its done marker."""
+    path = Path(path)
+    offset, last_progress, partial = 0, time.monotonic(), ""
+    while True:
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                f.seek(offset)
+                chunk = f.read()
+                offset = f.tell()
+            if chunk:
+                last_progress = time.monotonic()
+                *complete, partial = (partial + chunk).split("\n")
+                for raw in complete:
+                    if not raw.strip():
+                        continue
+                    record = json.loads(raw)
+                    if record.get("done"):
+                        if record.get("error"):
+                            raise RuntimeError(f"script stream failed: {record['error']}")
+                        return
+                    yield ScriptLine(**record)
+                continue
+        if time.monotonic() - last_progress > timeout:
+            raise TimeoutError(f"no new script lines in {path} for {timeout:.0f}s")
+        time.sleep(poll)
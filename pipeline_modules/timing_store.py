@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Columnar binary timing artefacts written next to (or instead of) the JSON maps.
+
+Layout of a timing directory:
+  words.npy      one row per word, phonemes referenced by (ph_off, ph_len)
+  phonemes.npy   one row per phoneme
+  sentences.npy  one row per sentence
+  strings.npy    UTF-8 blob that every *_off/*_len pair points into
+  meta.json      format version and row counts
+
+Every .npy file is a plain fixed-schema array, so readers can memory-map them
+and only touch the pages they use.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+TIMING_DIRNAME = "timing"
+
+WORD_DTYPE = np.dtype([
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("sentence_index", "<i4"),
+    ("punct", "<U1"),
+    ("text_off", "<u4"),
+    ("text_len", "<u2"),
+    ("ph_off", "<u4"),
+    ("ph_len", "<u2"),
+])
+
+PHONEME_DTYPE = np.dtype([
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("word", "<u4"),
+    ("sym_off", "<u4"),
+    ("sym_len", "<u2"),
+])
+
+SENTENCE_DTYPE = np.dtype([
+    ("index", "<i4"),
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("speaker_off", "<u4"),
+    ("speaker_len", "<u2"),
+    ("text_off", "<u4"),
+    ("text_len", "<u4"),
+])
+
+
+class _StringPool:
+    def __init__(self):
+        self.buf = bytearray()
+        self.seen = {}
+
+    def add(self, s: str):
+        """Return (offset, length) of s in the pool, sharing repeated strings."""
+        hit = self.seen.get(s)
+        if hit is not None:
+            return hit
+        raw = s.encode("utf-8")
+        ref = (len(self.buf), len(raw))
+        self.buf += raw
+        self.seen[s] = ref
+        return ref
+
+
+class TimingArtifacts:
+    """Read-only view over a timing directory; arrays are memory-mapped by default."""
+
+    def __init__(self, words, phonemes, sentences, strings):
+        self.words = words
+        self.phonemes = phonemes
+        self.sentences = sentences
+        self.strings = strings
+
+    def string(self, off, length) -> str:
+        off = int(off)
+        return bytes(self.strings[off:off + int(length)]).decode("utf-8")
+
+    def strings_at(self, offs, lens):
+        """Decode many (offset, length) pairs with a single read of the covering byte range."""
+        offs = np.asarray(offs, dtype=np.int64)
+        lens = np.asarray(lens, dtype=np.int64)
+        if len(offs) == 0:
+            return []
+        lo = int(offs.min())
+        blob = bytes(self.strings[lo:int((offs + lens).max())])
+        return [blob[o:o + n].decode("utf-8") for o, n in zip((offs - lo).tolist(), lens.tolist())]
+
+    def word_texts(self, start: int = 0, stop=None):
+        rows = self.words[start:stop]
+        return self.strings_at(rows["text_off"], rows["text_len"])
+
+    def word_phonemes(self, i: int):
+        w = self.words[i]
+        ph = self.phonemes[int(w["ph_off"]):int(w["ph_off"]) + int(w["ph_len"])]
+        return [{"symbol": self.string(p["sym_off"], p["sym_len"]),
+                 "start": float(p["start"]), "end": float(p["end"])} for p in ph]
+
+    def sentence_texts(self):
+        return self.strings_at(self.sentences["text_off"], self.sentences["text_len"])
+
+    def sentence_speakers(self):
+        return self.strings_at(self.sentences["speaker_off"], self.sentences["speaker_len"])
+
+
+def write_timing_artifacts(out_dir: Path, word_entries, sentence_map) -> Path:
+    """Write words/phonemes/sentences (as produced by generate_timing_maps) to out_dir."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pool = _StringPool()
+
+    n_ph = sum(len(w.get("phonemes") or []) for w in word_entries)
+    words = np.zeros(len(word_entries), dtype=WORD_DTYPE)
+    phonemes = np.zeros(n_ph, dtype=PHONEME_DTYPE)
+    sentences = np.zeros(len(sentence_map), dtype=SENTENCE_DTYPE)
+
+    p = 0
+    for i, w in enumerate(word_entries):
+        off, ln = pool.add(w["word"])
+        phs = w.get("phonemes") or []
+        words[i] = (w["start"], w["end"], w.get("sentence_index", 0), w.get("punct", "")[:1], off, ln, p, len(phs))
+        for ph in phs:
+            s_off, s_ln = pool.add(str(ph["symbol"]))
+            phonemes[p] = (ph["start"], ph["end"], i, s_off, s_ln)
+            p += 1
+
+    for i, e in enumerate(sentence_map):
+        sp_off, sp_ln = pool.add(e["speaker"])
+        t_off, t_ln = pool.add(e["text"])
+        sentences[i] = (e["index"], e["start"], e["end"], sp_off, sp_ln, t_off, t_ln)
+
+    np.save(out_dir / "words.npy", words)
+    np.save(out_dir / "phonemes.npy", phonemes)
+    np.save(out_dir / "sentences.npy", sentences)
+    np.save(out_dir / "strings.npy", np.frombuffer(bytes(pool.buf), dtype=np.uint8))
+    (out_dir / "meta.json").write_text(json.dumps({
+        "version": FORMAT_VERSION,
+        "words": len(words),
+        "phonemes": len(phonemes),
+        "sentences": len(sentences),
+    }))
+    return out_dir
+
+
+def is_timing_dir(path: Path) -> bool:
+    return path.is_dir() and (path / "meta.json").exists() and (path / "words.npy").exists()
+
+
+def load_timing_artifacts(timing_dir: Path, mmap: bool = True) -> TimingArtifacts:
+    meta = json.loads((timing_dir / "meta.json").read_text())
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported timing format version {meta.get('version')} in {timing_dir}")
+    mode = "r" if mmap else None
+    return TimingArtifacts(
+        words=np.load(timing_dir / "words.npy", mmap_mode=mode),
+        phonemes=np.load(timing_dir / "phonemes.npy", mmap_mode=mode),
+        sentences=np.load(timing_dir / "sentences.npy", mmap_mode=mode),
+        strings=np.load(timing_dir / "strings.npy", mmap_mode=mode),
+    )
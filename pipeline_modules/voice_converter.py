@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 import subprocess
-from utils.db_logger import log_event, save_log, init_log
+from pipeline_modules.db_logger import log_event, save_log, init_log
 
 # --- Robust weight_root resolution ---
 script_dir = Path(__file__).resolve().parent
@@ -39,6 +39,10 @@ def convert_with_rvc(account, character="stewie", f0method="rmvpe"):
     if not index_file:
         raise FileNotFoundError(f"No index file found in {real_model_dir}. Please check your model directory.")
     
+    log = init_log(project_root / "data/logs/content_log.jsonl")
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str((project_root / "rvc").resolve())
+
     for wav_file in wav_files:
         output_file = output_dir / wav_file.name
         command = [
@@ -50,18 +54,14 @@ def convert_with_rvc(account, character="stewie", f0method="rmvpe"):
             "--f0method", f0method
         ]
 
-        log_df = init_log(project_root / "data/logs/content_log.csv")
-        env = os.environ.copy()
-        env["PYTHONPATH"] = str((project_root / "rvc").resolve())
-
         try:
             subprocess.run(command, check=True, env=env, cwd=str((project_root / "rvc").resolve()))
             print(f"✅ RVC Converted: {wav_file.name}")
-            log_df = log_event(log_df, account, "rvc", "converted", wav_file.name)
+            log_event(log, account, "rvc", "converted", wav_file.name)
         except subprocess.CalledProcessError as e:
             print(f"❌ RVC conversion failed for {wav_file.name}: {e}")
-            log_df = log_event(log_df, account, "rvc", "failed", wav_file.name)
-        save_log(log_df, project_root / "data/logs/content_log.csv")
+            log_event(log, account, "rvc", "failed", wav_file.name)
+    save_log(log)
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Watermark-driven refill daemon for the account topic queues.
+
+Every --interval seconds it reads each queue's depth and updates an
+exponentially weighted consumption rate (items/hour) from how far the depth
+fell since the previous poll. An account is refilled once its depth, projected
+--lead seconds ahead at that rate, is at or below its low watermark. It is
+then topped up to the high watermark (plus the projected consumption), at
+most --max-refill items at a time. All accounts due in a cycle are refilled
+together: by default one structured-output call covers all of them
+(idea_allocator --single-call), or --per-account-requests sends concurrent
+per-account calls.
+
+Watermarks default to --low/--high; data/allocator_watermarks.json can
+override them per account, e.g. {"Tech": {"low": 5, "high": 40}}.
+
+Metrics go to data/metrics/ after every cycle:
+  queue_depth.json       latest snapshot: depth, watermarks, rate, hours to empty
+  queue_depth.jsonl      the same snapshot appended per cycle
+  queue_depth.prom       Prometheus text format, for node_exporter's textfile collector
+
+Usage:
+  python scripts/allocator_daemon.py [--interval 300] [--low 10] [--high 30] [--once] [--dry-run]
+  python scripts/idea_allocator.py --daemon [same options]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import idea_allocator  # noqa: E402
+from pipeline_modules.job_queue import queue_depth  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+WATERMARKS_PATH = REPO_ROOT / "data" / "allocator_watermarks.json"
+METRICS_DIR = REPO_ROOT / "data" / "metrics"
+
+LOW_WATERMARK = int(os.environ.get("ALLOCATOR_LOW_WATERMARK", "10"))
+HIGH_WATERMARK = int(os.environ.get("ALLOCATOR_HIGH_WATERMARK", "30"))
+POLL_SECONDS = float(os.environ.get("ALLOCATOR_POLL_SECONDS", "300"))
+LEAD_SECONDS = 600.0    # how far ahead consumption is projected when deciding to refill
+MAX_REFILL = 50         # topics per account per cycle
+RATE_ALPHA = 0.3        # EWMA weight of the newest consumption sample
+
+
+def load_watermarks(accounts: Dict[str, str], low: int, high: int,
+                    path: Path = WATERMARKS_PATH) -> Dict[str, Tuple[int, int]]:
+    overrides = {}
+    if path.exists():
+        overrides = json.loads(path.read_text(encoding="utf-8"))
+    marks = {}
+    for account in accounts:
+        o = overrides.get(account, {})
+        lo, hi = int(o.get("low", low)), int(o.get("high", high))
+        if hi <= lo:
+            raise ValueError(f"high watermark must exceed low for {account}: low={lo} high={hi}")
+        marks[account] = (lo, hi)
+    return marks
+
+
+class QueueMonitor:
+    """Queue depths and per-account consumption rates across polls."""
+
+    def __init__(self, accounts: Dict[str, str], alpha: float = RATE_ALPHA):
+        self.accounts = accounts
+        self.alpha = alpha
+        self.rates: Dict[str, float] = {a: 0.0 for a in accounts}
+        self._baseline: Dict[str, Tuple[float, int]] = {}
+
+    def depths(self) -> Dict[str, int]:
+        # Jobs script_batch moved to <queue>_ready are still waiting, not consumed
+        return {a: queue_depth(q) for a, q in self.accounts.items()}
+
+    def observe(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Read depths and fold the drop since the last baseline into each rate."""
+        now = time.time() if now is None else now
+        depths = self.depths()
+        for account, depth in depths.items():
+            if account in self._baseline:
+                t0, d0 = self._baseline[account]
+                if now > t0:
+                    # Growth comes from someone else enqueueing; only drops count as consumption
+                    sample = max(0, d0 - depth) * 3600.0 / (now - t0)
+                    self.rates[account] = self.alpha * sample + (1 - self.alpha) * self.rates[account]
+        self.set_baseline(depths, now)
+        return depths
+
+    def set_baseline(self, depths: Dict[str, int], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._baseline = {a: (now, d) for a, d in depths.items()}
+
+
+def plan_refills(depths: Dict[str, int], rates: Dict[str, float], watermarks: Dict[str, Tuple[int, int]],
+                 lead_seconds: float = LEAD_SECONDS, max_refill: int = MAX_REFILL) -> Dict[str, int]:
+    """{account: topics to request} for every account projected to reach its low watermark."""
+    plan = {}
+    for account, depth in depths.items():
+        low, high = watermarks[account]
+        projected = depth - rates.get(account, 0.0) * lead_seconds / 3600.0
+        if projected <= low:
+            need = min(max_refill, math.ceil(high - projected))
+            if need > 0:
+                plan[account] = need
+    return plan
+
+
+def snapshot(monitor: QueueMonitor, depths: Dict[str, int], watermarks, plan: Dict[str, int],
+             queued: Dict[str, int], stats: dict) -> dict:
+    accounts = {}
+    for account, depth in depths.items():
+        rate = monitor.rates[account]
+        low, high = watermarks[account]
+        accounts[account] = {
+            "queue": monitor.accounts[account],
+            "depth": depth,
+            "low": low,
+            "high": high,
+            "consumption_per_hour": round(rate, 3),
+            "hours_to_empty": round(depth / rate, 2) if rate > 0 else None,
+            "requested": plan.get(account, 0),
+            "queued": queued.get(account, 0),
+        }
+    return {"ts": datetime.utcnow().isoformat(timespec="seconds"), **stats, "accounts": accounts}
+
+
+def write_metrics(snap: dict, metrics_dir: Path = METRICS_DIR) -> None:
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    tmp = metrics_dir / "queue_depth.json.tmp"
+    tmp.write_text(json.dumps(snap, indent=2))
+    tmp.replace(metrics_dir / "queue_depth.json")
+    with open(metrics_dir / "queue_depth.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(snap) + "\n")
+
+    gauges = [("allocator_queue_depth", "depth", "Items waiting in the queue"),
+              ("allocator_queue_low_watermark", "low", "Depth at or below which the queue is refilled"),
+              ("allocator_queue_high_watermark", "high", "Depth a refill tops the queue up to"),
+              ("allocator_queue_consumption_per_hour", "consumption_per_hour", "EWMA of items dequeued per hour"),
+              ("allocator_topics_queued", "queued", "Topics queued in the last cycle")]
+    lines = []
+    for name, key, help_text in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for account, m in snap["accounts"].items():
+            lines.append(f'{name}{{account="{account}",queue="{m["queue"]}"}} {m[key]}')
+    for key in ("cycles", "llm_requests", "topics_queued"):
+        lines += [f"# TYPE allocator_{key}_total counter", f"allocator_{key}_total {snap[key]}"]
+    tmp = metrics_dir / "queue_depth.prom.tmp"
+    tmp.write_text("\n".join(lines) + "\n")
+    tmp.replace(metrics_dir / "queue_depth.prom")
+
+
+def run_cycle(monitor: QueueMonitor, watermarks, stats: dict, single_call: bool = True,
+              concurrency: int = idea_allocator.DEFAULT_CONCURRENCY, lead_seconds: float = LEAD_SECONDS,
+              max_refill: int = MAX_REFILL, dry_run: bool = False) -> dict:
+    depths = monitor.observe()
+    plan = plan_refills(depths, monitor.rates, watermarks, lead_seconds, max_refill)
+    queued = {}
+    if plan:
+        summary = ", ".join(f"{a} {depths[a]}->+{n}" for a, n in plan.items())
+        print(f"[allocator_daemon] Refilling {summary}", flush=True)
+        if not dry_run:
+            due = {a: monitor.accounts[a] for a in plan}
+            batched = single_call and len(due) > 1
+            ideas, requests = asyncio.run(idea_allocator.allocate_async(due, plan, concurrency, batched))
+            queued = idea_allocator.store_ideas(due, ideas)
+            stats["llm_requests"] += requests
+            stats["topics_queued"] += sum(queued.values())
+            # Our own refill is not negative consumption: re-read depths as the new baseline
+            depths = monitor.depths()
+            monitor.set_baseline(depths)
+    stats["cycles"] += 1
+    snap = snapshot(monitor, depths, watermarks, plan, queued, stats)
+    write_metrics(snap, METRICS_DIR)
+    return snap
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between polls")
+    ap.add_argument("--low", type=int, default=LOW_WATERMARK, help="default low watermark")
+    ap.add_argument("--high", type=int, default=HIGH_WATERMARK, help="default high watermark")
+    ap.add_argument("--lead", type=float, default=LEAD_SECONDS,
+                    help="seconds of consumption to anticipate when deciding to refill")
+    ap.add_argument("--max-refill", type=int, default=MAX_REFILL, help="topics per account per cycle")
+    ap.add_argument("--concurrency", type=int, default=idea_allocator.DEFAULT_CONCURRENCY)
+    ap.add_argument("--single-call", dest="single_call", action="store_true", default=True,
+                    help="refill all due accounts in one structured-output call (default)")
+    ap.add_argument("--per-account-requests", dest="single_call", action="store_false",
+                    help="one concurrent request per due account instead")
+    ap.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    ap.add_argument("--dry-run", action="store_true", help="report planned refills without calling the LLM")
+    args = ap.parse_args(argv)
+
+    accounts = idea_allocator.ACCOUNTS
+    watermarks = load_watermarks(accounts, args.low, args.high)
+    monitor = QueueMonitor(accounts)
+    stats = {"cycles": 0, "llm_requests": 0, "topics_queued": 0}
+    print(f"[allocator_daemon] Watching {len(accounts)} queues every {args.interval:g}s "
+          f"(watermarks {', '.join(f'{a} {lo}/{hi}' for a, (lo, hi) in watermarks.items())})", flush=True)
+    while True:
+        started = time.monotonic()
+        try:
+            snap = run_cycle(monitor, watermarks, stats, args.single_call, args.concurrency, args.lead,
+                             args.max_refill, args.dry_run)
+            depths = ", ".join(f"{a}={m['depth']}" for a, m in snap["accounts"].items())
+            print(f"[allocator_daemon] Depths: {depths}", flush=True)
+        except Exception as e:
+            # Keep polling: a failed refill is retried next cycle
+            print(f"[allocator_daemon] Cycle failed: {e}", flush=True)
+            if args.once:
+                raise
+        if args.once:
+            return
+        try:
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
+import argparse
+import asyncio
+import functools
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
 import os
+import sys
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 except Exception:
-    OpenAI = None  # Fallback if package not available
+    AsyncOpenAI = OpenAI = None  # Fallback if package not available
 
 
 def _load_env_file(path: Path) -> None:
@@ -32,8 +36,6 @@ def _load_env_file(path: Path) -> None:
         pass
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
-QUEUE_DIR = REPO_ROOT / "data" / "queues"
-QUEUE_DIR.mkdir(parents=True, exist_ok=True)
 
 PROMPTS_DIR = REPO_ROOT / "data" / "prompts"
 SYSTEM_PROMPT_PATH = PROMPTS_DIR / "idea_allocator_system.txt"
@@ -41,6 +43,13 @@ USER_PROMPT_PATH = PROMPTS_DIR / "idea_allocator_user.txt"
 
 PROMPT_JSON_PATH = PROMPTS_DIR / "idea_generation_prompt.json"
 
+TOPIC_INDEX_DIR = REPO_ROOT / "data" / "topic_index"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(REPO_ROOT))
+from topic_index import TopicIndex  # noqa: E402
+from pipeline_modules.job_queue import dequeue, load_queue, save_queue  # noqa: E402,F401
+from pipeline_modules.rate_limit import TokenBucket  # noqa: E402
+
 # Load environment variables from common locations if not already set
 # Priority: .env.local then .env at repo root
 _load_env_file(REPO_ROOT / ".env.local")
@@ -112,32 +121,24 @@ def _stub_topics(account: str, seed: str, tone: str, style: str, n: int) -> list
     return out
 
 
-def load_queue(name: str) -> List[dict]:
-    f = QUEUE_DIR / f"{name}.json"
-    if not f.exists():
-        return []
-    return json.loads(f.read_text())
-
-
-def save_queue(name: str, items: List[dict]) -> None:
-    f = QUEUE_DIR / f"{name}.json"
-    f.write_text(json.dumps(items, indent=2))
+@functools.lru_cache(maxsize=None)
+def _topic_index(index_dir: Path) -> TopicIndex:
+    return TopicIndex(index_dir)
 
 
-def enqueue(name: str, items: List[dict]) -> None:
+def enqueue(name: str, items: List[dict], dedupe: bool = True) -> int:
+    """Append items to a queue; returns how many were queued after near-duplicate filtering."""
+    if dedupe and items:
+        # Skip topics that near-duplicate anything queued or produced before
+        items, rejected = _topic_index(TOPIC_INDEX_DIR).filter_new(items, source=f"queue:{name}")
+        if rejected:
+            print(f"[idea_allocator] Rejected {len(rejected)} near-duplicate topics for {name}", flush=True)
+            for r in rejected[:3]:
+                print(f"[idea_allocator]   '{r['topic']}' ~ '{r['matched']}' ({r['similarity']:.2f})", flush=True)
     q = load_queue(name)
     q.extend(items)
     save_queue(name, q)
-
-
-def dequeue(name: str) -> dict | None:
-    q = load_queue(name)
-    if not q:
-        return None
-    item = q.pop(0)
-    save_queue(name, q)
-    return item
-
+    return len(items)
 
 
 def _account_preset(account: str) -> dict:
@@ -152,98 +153,116 @@ def _account_preset(account: str) -> dict:
 
 
 
-def generate_ideas_llm(account: str, n: int) -> List[dict]:
+DEFAULT_SYSTEM_PROMPT = (
+    "You generate short, specific, YouTube Shorts or Instagram Reel topics in Australian English. "
+    "Both tone and style are provided and must be reflected in the topics. "
+    "Keep each topic 6 to 12 words. No emojis. No lists with numbering. Use concise phrasing."
+)
+DEFAULT_USER_TEMPLATE = (
+    "Create {n} distinct content topics for the account category '{account}'. "
+    "Audience is general interest. Tone should be '{tone}'. Style should be '{style}'. Seed direction: {seed}. "
+    "Return only diverse, self-contained topics suitable for 60–90 second reels."
+)
+
+DEFAULT_CONCURRENCY = int(os.environ.get("IDEA_ALLOCATOR_CONCURRENCY", "5"))
+# Client-side request budget, below the account's OpenAI requests-per-minute limit
+OPENAI_RPM = float(os.environ.get("OPENAI_RPM", "60"))
+
+
+@functools.lru_cache(maxsize=None)
+def load_prompts() -> tuple[str, str]:
+    """(system prompt, user template), read from data/prompts once per process."""
+    # Prefer consolidated JSON prompt if present
+    prompt_json = _read_prompt_json(PROMPT_JSON_PATH) or {}
+    system_msg = prompt_json.get("system_prompt") or _read_prompt(SYSTEM_PROMPT_PATH) or DEFAULT_SYSTEM_PROMPT
+    user_template = (prompt_json.get("user_prompt_template") or _read_prompt(USER_PROMPT_PATH)
+                     or DEFAULT_USER_TEMPLATE)
+    return system_msg, user_template
+
+
+def _user_message(account: str, n: int) -> str:
     preset = _account_preset(account)
-    tone = preset["tone"]
-    seed = preset["seed"]
-    style = preset["style"]
+    user_template = load_prompts()[1]
+    try:
+        return user_template.format(n=n, account=account, tone=preset["tone"], style=preset["style"],
+                                    seed=preset["seed"])
+    except Exception:
+        # Fallback to raw template if formatting placeholders are missing
+        return user_template
 
-    # If OpenAI client is unavailable or no key, fall back to a richer stub
-    if OpenAI is None or not os.environ.get("OPENAI_API_KEY"):
-        reason = _why_stub()
-        print(f"[idea_allocator] Using stub topics because {reason}.", flush=True)
-        return _stub_topics(account, seed, tone, style, n)
 
-    client = OpenAI()
-    # Allow overriding model via env
-    model = os.environ.get("OPENAI_MODEL_ID", "gpt-4o-mini")
+def _topics_array(n: int) -> dict:
+    return {
+        "type": "array",
+        "minItems": n,
+        "maxItems": n,
+        "items": {
+            "type": "object",
+            "properties": {
+                "topic": {"type": "string"},
+                "tone": {"type": "string"},
+                "style": {"type": "string"}
+            },
+            "required": ["topic", "tone"],
+            "additionalProperties": False
+        }
+    }
+
 
-    # Ask for compact JSON to minimise tokens
-    schema = {
+def _topics_schema(n: int) -> dict:
+    return {
         "name": "topics_schema",
+        "schema": {
+            "type": "object",
+            "properties": {"topics": _topics_array(n)},
+            "required": ["topics"],
+            "additionalProperties": False
+        }
+    }
+
+
+def _accounts_schema(accounts: List[str], n: int) -> dict:
+    """One object per account, so a single call can fill every queue."""
+    return {
+        "name": "accounts_topics_schema",
         "schema": {
             "type": "object",
             "properties": {
-                "topics": {
+                "accounts": {
                     "type": "array",
+                    "minItems": len(accounts),
+                    "maxItems": len(accounts),
                     "items": {
                         "type": "object",
                         "properties": {
-                            "topic": {"type": "string"},
-                            "tone": {"type": "string"},
-                            "style": {"type": "string"}
+                            "account": {"type": "string", "enum": list(accounts)},
+                            "topics": _topics_array(n)
                         },
-                        "required": ["topic", "tone"],
+                        "required": ["account", "topics"],
                         "additionalProperties": False
                     }
                 }
             },
-            "required": ["topics"],
+            "required": ["accounts"],
             "additionalProperties": False
         }
     }
 
-    # Prefer consolidated JSON prompt if present
-    prompt_json = _read_prompt_json(PROMPT_JSON_PATH)
-    if prompt_json:
-        system_msg = prompt_json.get("system_prompt") or _read_prompt(SYSTEM_PROMPT_PATH) or (
-            "You generate short, specific, YouTube Shorts or Instagram Reel topics in Australian English. "
-            "Both tone and style are provided and must be reflected in the topics. "
-            "Keep each topic 6 to 12 words. No emojis. No lists with numbering. Use concise phrasing."
-        )
-        user_template = prompt_json.get("user_prompt_template") or _read_prompt(USER_PROMPT_PATH) or (
-            "Create {n} distinct content topics for the account category '{account}'. "
-            "Audience is general interest. Tone should be '{tone}'. Style should be '{style}'. Seed direction: {seed}. "
-            "Return only diverse, self-contained topics suitable for 60–90 second reels."
-        )
-    else:
-        system_msg = _read_prompt(SYSTEM_PROMPT_PATH) or (
-            "You generate short, specific, YouTube Shorts or Instagram Reel topics in Australian English. "
-            "Both tone and style are provided and must be reflected in the topics. "
-            "Keep each topic 6 to 12 words. No emojis. No lists with numbering. Use concise phrasing."
-        )
-        user_template = _read_prompt(USER_PROMPT_PATH) or (
-            "Create {n} distinct content topics for the account category '{account}'. "
-            "Audience is general interest. Tone should be '{tone}'. Style should be '{style}'. Seed direction: {seed}. "
-            "Return only diverse, self-contained topics suitable for 60–90 second reels."
-        )
-
-    try:
-        user_msg = user_template.format(n=n, account=account, tone=tone, style=style, seed=seed)
-    except Exception:
-        # Fallback to raw template if formatting placeholders are missing
-        user_msg = user_template
-
-    resp = client.chat.completions.create(
-        model=model,
-        response_format={"type": "json_schema", "json_schema": schema},
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-        temperature=0.7,
-        max_tokens=800,
-    )
 
+def _response_json(resp) -> dict:
     try:
         data = resp.choices[0].message.parsed  # available with response_format json_schema
-        topics = data.get("topics", [])
+        if data is not None:
+            return data
     except Exception:
-        # Fallback to JSON parsing if parsed not present
-        import json as _json
-        content = resp.choices[0].message.content
-        topics = _json.loads(content).get("topics", [])
+        pass
+    # Fallback to JSON parsing if parsed not present
+    return json.loads(resp.choices[0].message.content)
 
+
+def _to_items(account: str, topics: List[dict], n: int) -> List[dict]:
+    preset = _account_preset(account)
+    tone, style, seed = preset["tone"], preset["style"], preset["seed"]
     now = datetime.utcnow().isoformat()
     out: List[dict] = []
     for t in topics[:n]:
@@ -260,28 +279,174 @@ def generate_ideas_llm(account: str, n: int) -> List[dict]:
     return out
 
 
+def _use_stub() -> bool:
+    return OpenAI is None or not os.environ.get("OPENAI_API_KEY")
 
-def allocate(accounts: Dict[str, str], per_account: int, topic_seed: str) -> None:
-    # Ignore topic_seed for LLM path; keep arg for backward compatibility
-    for account, queue_name in accounts.items():
-        print(f"[idea_allocator] Generating {per_account} topics for account='{account}' -> queue='{queue_name}'", flush=True)
-        ideas = generate_ideas_llm(account, per_account)
+
+def _stub_ideas(account: str, n: int) -> List[dict]:
+    preset = _account_preset(account)
+    return _stub_topics(account, preset["seed"], preset["tone"], preset["style"], n)
+
+
+def _request(account_or_accounts, n: int) -> dict:
+    """chat.completions.create keyword arguments for one account, or for a list of accounts in one call."""
+    system_msg = load_prompts()[0]
+    if isinstance(account_or_accounts, str):
+        user_msg = _user_message(account_or_accounts, n)
+        schema = _topics_schema(n)
+    else:
+        user_msg = ("Fill every account below in a single response, one entry per account, "
+                    f"each with exactly {n} topics.\n\n"
+                    + "\n\n".join(f"Account '{a}': {_user_message(a, n)}" for a in account_or_accounts))
+        schema = _accounts_schema(account_or_accounts, n)
+    return {
+        # Allow overriding model via env
+        "model": os.environ.get("OPENAI_MODEL_ID", "gpt-4o-mini"),
+        # Ask for compact JSON to minimise tokens
+        "response_format": {"type": "json_schema", "json_schema": schema},
+        "messages": [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg},
+        ],
+        "temperature": 0.7,
+        "max_tokens": 800 if isinstance(account_or_accounts, str) else 800 * len(account_or_accounts),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _client():
+    return OpenAI()
+
+
+def generate_ideas_llm(account: str, n: int) -> List[dict]:
+    # If OpenAI client is unavailable or no key, fall back to a richer stub
+    if _use_stub():
+        print(f"[idea_allocator] Using stub topics because {_why_stub()}.", flush=True)
+        return _stub_ideas(account, n)
+    resp = _client().chat.completions.create(**_request(account, n))
+    return _to_items(account, _response_json(resp).get("topics", []), n)
+
+
+async def generate_ideas_async(client, account: str, n: int, limiter: TokenBucket) -> List[dict]:
+    await limiter.acquire()
+    resp = await client.chat.completions.create(**_request(account, n))
+    return _to_items(account, _response_json(resp).get("topics", []), n)
+
+
+async def generate_all_ideas_async(client, accounts: List[str], n: int,
+                                   limiter: TokenBucket) -> Dict[str, List[dict]]:
+    """Topics for every account from one structured-output call; accounts the reply left empty are omitted."""
+    await limiter.acquire()
+    resp = await client.chat.completions.create(**_request(accounts, n))
+    by_account = {e.get("account"): e.get("topics", []) for e in _response_json(resp).get("accounts", [])}
+    return {a: _to_items(a, by_account[a], n) for a in accounts if by_account.get(a)}
+
+
+async def allocate_async(accounts: Dict[str, str], per_account: int | Dict[str, int],
+                         concurrency: int = DEFAULT_CONCURRENCY, single_call: bool = False,
+                         rpm: float = OPENAI_RPM) -> tuple[Dict[str, List[dict]], int]:
+    """Generate topics for all accounts over one pooled client; returns ({account: ideas}, requests).
+
+    per_account is one count for every account or a {account: count} dict.
+    Per-account requests run at most `concurrency` at a time and within the
+    `rpm` token bucket; single_call asks for every account in one request and
+    falls back to per-account requests for any account that call did not
+    deliver (or for all of them if it fails). An account whose own request
+    fails is reported and left out. `requests` counts the OpenAI calls that
+    succeeded (0 with stub topics).
+    """
+    names = list(accounts)
+    counts = per_account if isinstance(per_account, dict) else {a: per_account for a in names}
+    if _use_stub():
+        print(f"[idea_allocator] Using stub topics because {_why_stub()}.", flush=True)
+        return {a: _stub_ideas(a, counts[a]) for a in names}, 0
+
+    limiter = TokenBucket(rpm / 60.0, capacity=max(1, concurrency))
+    out = {}
+    requests = 0
+    async with AsyncOpenAI(max_retries=3) as client:
+        if single_call:
+            try:
+                # One schema for all accounts: ask for the largest count, trim the rest
+                ideas = await generate_all_ideas_async(client, names, max(counts.values()), limiter)
+                out = {a: items[:counts[a]] for a, items in ideas.items()}
+                requests += 1
+            except Exception as e:
+                print(f"[idea_allocator] Single call failed: {e}", flush=True)
+            missing = [a for a in names if a not in out]
+            if missing:
+                print(f"[idea_allocator] Requesting {', '.join(missing)} one by one", flush=True)
+        else:
+            missing = names
+
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(account):
+            async with sem:
+                print(f"[idea_allocator] Generating {counts[account]} topics for account='{account}' "
+                      f"-> queue='{accounts[account]}'", flush=True)
+                return await generate_ideas_async(client, account, counts[account], limiter)
+
+        results = await asyncio.gather(*(one(a) for a in missing), return_exceptions=True)
+    for account, res in zip(missing, results):
+        if isinstance(res, Exception):
+            print(f"[idea_allocator] Failed for '{account}': {res}", flush=True)
+        else:
+            out[account] = res
+            requests += 1
+    return {a: out[a] for a in names if a in out}, requests
+
+
+def store_ideas(accounts: Dict[str, str], ideas_by_account: Dict[str, List[dict]]) -> Dict[str, int]:
+    """Enqueue generated ideas on each account's queue; returns {account: items queued}."""
+    queued_by_account = {}
+    for account, ideas in ideas_by_account.items():
+        queue_name = accounts[account]
         if ideas:
             sample = ", ".join([i["topic"] for i in ideas[:3]])
             print(f"[idea_allocator] Preview for '{account}': {sample}", flush=True)
         # attach account
         for b in ideas:
             b["account"] = account
-        enqueue(queue_name, ideas)
-        print(f"Allocated {len(ideas)} items to {queue_name}")
+        queued = enqueue(queue_name, ideas)
+        print(f"Allocated {queued} items to {queue_name}")
+        queued_by_account[account] = queued
+    return queued_by_account
+
+
+def allocate(accounts: Dict[str, str], per_account: int | Dict[str, int], topic_seed: str,
+             concurrency: int = DEFAULT_CONCURRENCY, single_call: bool = False) -> Dict[str, int]:
+    # Ignore topic_seed for LLM path; keep arg for backward compatibility
+    ideas_by_account, _ = asyncio.run(allocate_async(accounts, per_account, concurrency, single_call))
+    return store_ideas(accounts, ideas_by_account)
+
+
+ACCOUNTS = {
+    "Tech": "queue_tech",
+    "History": "queue_history",
+    "Finance/Business": "queue_finbiz",
+    "Physics": "queue_physics",
+    "Philosophy": "queue_philosophy",
+}
 
 
 if __name__ == "__main__":
-    accounts = {
-        "Tech": "queue_tech",
-        "History": "queue_history",
-        "Finance/Business": "queue_finbiz",
-        "Physics": "queue_physics",
-        "Philosophy": "queue_philosophy",
-    }
-    allocate(accounts, per_account=20, topic_seed="seed")
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-account", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="maximum in-flight OpenAI requests")
+    parser.add_argument("--single-call", action="store_true",
+                        help="request every account's topics in one structured-output call")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep queues between watermarks instead of a one-off refill "
+                             "(see scripts/allocator_daemon.py for its options)")
+    args, rest = parser.parse_known_args()
+    if args.daemon:
+        from allocator_daemon import main as daemon_main
+        daemon_main(rest + (["--single-call"] if args.single_call else [])
+                    + ["--concurrency", str(args.concurrency)])
+        sys.exit(0)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    allocate(ACCOUNTS, per_account=args.per_account, topic_seed="seed", concurrency=args.concurrency,
+             single_call=args.single_call)
\ No newline at end of file
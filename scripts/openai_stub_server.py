@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+
+Answers POST /v1/chat/completions after a fixed delay with content that
+satisfies the request's json_schema response format: arrays are filled to
+their minItems (or --items), enum strings take each allowed value in turn,
+other strings get eight words drawn from a small vocabulary. Point the
+OpenAI SDK at it with
+
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python scripts/idea_allocator.py
+
+Requests with "stream": true get the reply as server-sent chat.completion.chunk
+events, a few characters per chunk with --chunk-delay between them (plus a
+usage chunk when stream_options.include_usage is set). serve(reply=...)
+overrides the content of every reply; otherwise requests without a schema
+get "stub reply".
+
+With --rpm it also enforces a requests-per-minute limit the way the API
+does: x-ratelimit-*-requests headers on every reply and a 429 with
+retry-after once the sliding one-minute window is full.
+
+Usage: python scripts/openai_stub_server.py [--port 8765] [--latency 0.5] [--rpm 0]
+"""
+import argparse
+import collections
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("quiet", "hidden", "ancient", "rapid", "curious", "simple", "bright", "strange", "modern", "early",
+         "tiny", "giant", "rivers", "markets", "engines", "stars", "habits", "cities", "maps", "coins",
+         "clocks", "bridges", "forests", "voices", "numbers", "storms", "gardens", "machines", "letters",
+         "islands", "why", "how", "when", "secret", "lesson", "story", "rule", "trick", "myth", "idea")
+
+def fake_value(schema: dict, counter, items: int):
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: fake_value(v, counter, items) for k, v in schema.get("properties", {}).items()}
+    if kind == "array":
+        n = schema.get("minItems", items)
+        item = schema.get("items", {})
+        accounts = item.get("properties", {}).get("account", {}).get("enum")
+        if accounts:
+            # One entry per allowed account, in order
+            return [{**fake_value(item, counter, items), "account": a} for a in accounts]
+        return [fake_value(item, counter, items) for _ in range(n)]
+    if "enum" in schema:
+        return schema["enum"][next(counter) % len(schema["enum"])]
+    if kind in ("integer", "number"):
+        return next(counter)
+    if kind == "boolean":
+        return True
+    # Distinct word salad per string, so near-duplicate filtering keeps them
+    rng = random.Random(next(counter))
+    return " ".join(rng.sample(WORDS, 8))
+
+def reply_content(body: dict, items: int, counter, reply=None) -> str:
+    fmt = body.get("response_format") or {}
+    schema = (fmt.get("json_schema") or {}).get("schema")
+    if reply:
+        return reply(body)
+    return json.dumps(fake_value(schema, counter, items)) if schema else "stub reply"
+
+def usage(body: dict, content: str) -> dict:
+    # Rough 4-characters-per-token estimate, so cost reporting has something to show
+    prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": len(content) // 4, "total_tokens": prompt + len(content) // 4}
+
+def completion(body: dict, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                     "message": {"role": "assistant", "content": content, "refusal": None}}],
+        "usage": usage(body, content),
+    }
+
+def chunks(body: dict, content: str, size: int = 8):
+    """chat.completion.chunk events for a streamed reply."""
+    base = {"id": f"chatcmpl-stub-{int(time.time() * 1000)}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": body.get("model", "stub")}
+    yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+    for i in range(0, len(content), size):
+        yield {**base, "choices": [{"index": 0, "delta": {"content": content[i:i + size]}, "finish_reason": None}]}
+    yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield {**base, "choices": [], "usage": usage(body, content)}
+
+def make_handler(latency: float, items: int, stats: dict, rpm: int = 0, chunk_delay: float = 0.0, reply=None):
+    lock = threading.Lock()
+    counter = itertools.count(1)  # shared, so later requests get fresh strings
+    window = collections.deque()  # accepted request times in the last minute
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            with lock:
+                now = time.monotonic()
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                limited = bool(rpm) and len(window) >= rpm
+                if limited:
+                    stats["rate_limited"] += 1
+                    reset = 60 - (now - window[0])
+                else:
+                    window.append(now)
+                    headers = self.limit_headers(rpm - len(window), 60 - (now - window[0])) if rpm else {}
+                    stats["requests"] += 1
+                    stats["in_flight"] += 1
+                    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                    content = reply_content(body, items, counter, reply)
+            if limited:
+                error = {"error": {"message": "Rate limit reached for requests", "type": "requests",
+                                   "code": "rate_limit_exceeded"}}
+                self.reply(429, error, self.limit_headers(0, reset), retry_after=reset)
+                return
+            time.sleep(latency)
+            try:
+                if body.get("stream"):
+                    self.stream(body, content, headers)
+                else:
+                    self.reply(200, json.dumps(completion(body, content)).encode(), headers)
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def stream(self, body: dict, content: str, headers: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")  # no length: the body ends when the connection does
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.close_connection = True
+            for event in chunks(body, content):
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(chunk_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        @staticmethod
+        def limit_headers(remaining: int, reset: float) -> dict:
+            return {"x-ratelimit-limit-requests": str(rpm), "x-ratelimit-remaining-requests": str(remaining),
+                    "x-ratelimit-reset-requests": f"{reset:.3f}s"}
+
+        def reply(self, code: int, payload, headers: dict, retry_after: float | None = None):
+            if not isinstance(payload, bytes):
+                payload = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in headers.items():
+                self.send_header(k, v)
+            if retry_after is not None:
+                self.send_header("retry-after-ms", str(int(retry_after * 1000)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def serve(port: int = 8765, latency: float = 0.5, items: int = 20, host: str = "127.0.0.1", rpm: int = 0,
+          chunk_delay: float = 0.0, reply=None):
+    """Start the stub in a daemon thread; returns (server, stats). Port 0 picks a free port.
+
+    reply(body) -> str, when given, is the content of every reply.
+    """
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0, "rate_limited": 0}
+    server = ThreadingHTTPServer((host, port), make_handler(latency, items, stats, rpm, chunk_delay, reply))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.5, help="seconds before each reply")
+    ap.add_argument("--items", type=int, default=20, help="array length when the schema sets no minItems")
+    ap.add_argument("--rpm", type=int, default=0, help="requests per minute before answering 429 (0: no limit)")
+    ap.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    args = ap.parse_args()
+    server, _ = serve(args.port, args.latency, args.items, rpm=args.rpm, chunk_delay=args.chunk_delay)
+    print(f"OpenAI stub on http://127.0.0.1:{server.server_address[1]}/v1 ({args.latency}s latency)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
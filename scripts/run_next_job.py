@@ -1,30 +1,24 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import subprocess
 import os
+import sys
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
-QUEUE_DIR = REPO_ROOT / "data" / "queues"
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-def dequeue(queue_name: str) -> dict | None:
-    f = QUEUE_DIR / f"{queue_name}.json"
-    if not f.exists():
-        return None
-    items = json.loads(f.read_text())
-    if not items:
-        return None
-    job = items.pop(0)
-    f.write_text(json.dumps(items, indent=2))
-    return job
+from pipeline_modules.job_queue import READY_QUEUE_SUFFIX, dequeue
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("queue_name")
+    parser.add_argument("--cpu-slot", metavar="K/N", help="CPU slot of this worker among N concurrent workers")
     args = parser.parse_args()
 
-    job = dequeue(args.queue_name)
+    # Jobs whose script an offline batch already generated (see pipeline_modules/script_batch.py) go first
+    job = dequeue(args.queue_name + READY_QUEUE_SUFFIX) or dequeue(args.queue_name)
     if not job:
         print("Queue empty")
         return
@@ -38,6 +32,8 @@ def main():
 
     # Use the new Python orchestrator
     cmd = ["python", str(REPO_ROOT / "scripts" / "run_pipeline.py"), topic, tone, account]
+    if args.cpu_slot:
+        cmd += ["--cpu-slot", args.cpu_slot]
     env = os.environ.copy()
     env["PIPELINE_STYLE"] = str(style)
     env["PIPELINE_PRIORITY"] = str(priority)
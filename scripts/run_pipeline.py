@@ -4,10 +4,17 @@ import json
 import os
 import subprocess
 import sys
+from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Optional
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from pipeline_modules.logkit import TRACE_ID_ENV, span, trace_env
+from pipeline_modules.resource_planner import cpu_topology, log_plan, plan_resources, slot_topology, stage_env
+
 ENV_FILE = REPO_ROOT / ".env"
 
 VENV_XTTS = REPO_ROOT / "venv-xtts"
@@ -24,11 +31,13 @@ def venv_python(venv: Path) -> str:
         raise FileNotFoundError(f"Python not found in {venv}")
     return str(exe)
 
-def run_python_inline(venv: Path, code: str, env: Optional[dict] = None) -> None:
+def _inline_command(venv: Path, code: str, env: Optional[dict] = None):
     py = venv_python(venv)
     env_vars = os.environ.copy()
     if env:
         env_vars.update(env)
+    # The stage's spans become children of the orchestrator span that is open now
+    env_vars.update(trace_env())
     # Ensure repo modules are importable
     preamble = f"""
 import sys
@@ -36,9 +45,23 @@ from pathlib import Path
 BASE_DIR = Path('{REPO_ROOT.as_posix()}')
 if str(BASE_DIR / 'pipeline_modules') not in sys.path:
     sys.path.insert(0, str(BASE_DIR / 'pipeline_modules'))
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+# Pin to the stage's planned CPU slice before any work starts (no-op when unplanned)
+from pipeline_modules.resource_planner import apply_stage_plan
+apply_stage_plan()
 """
     joined = preamble + "\n" + code
-    subprocess.run([py, "-c", joined], check=True, env=env_vars)
+    return [py, "-c", joined], env_vars
+
+def run_python_inline(venv: Path, code: str, env: Optional[dict] = None) -> None:
+    cmd, env_vars = _inline_command(venv, code, env)
+    subprocess.run(cmd, check=True, env=env_vars)
+
+def start_python_inline(venv: Path, code: str, env: Optional[dict] = None) -> subprocess.Popen:
+    """run_python_inline without waiting, for stages that overlap."""
+    cmd, env_vars = _inline_command(venv, code, env)
+    return subprocess.Popen(cmd, env=env_vars)
 
 def has_module(venv: Path, module: str) -> bool:
     try:
@@ -76,7 +99,38 @@ print(f"Saved script to {{path}}")
 """
     run_python_inline(env_for_openai, code)
 
-def run_xtts_batch() -> None:
+def stream_script_to_xtts(topic: str, tone: str, account: str, env_for_openai: Path,
+                          env: Optional[dict] = None, producer_env: Optional[dict] = None) -> None:
+    """Generate the script with streaming while XTTS synthesises each line as soon as it is complete."""
+    echo("Streaming script generation into XTTS")
+    spool = DATA_DIR / "scripts" / ".stream" / "lines.jsonl"
+    spool.unlink(missing_ok=True)
+    producer = start_python_inline(env_for_openai, f"""
+from dotenv import load_dotenv
+from pathlib import Path
+from pipeline_modules.script_generator import script_generator_stream
+load_dotenv(dotenv_path=Path('{ENV_FILE.as_posix()}'))
+path = script_generator_stream({topic!r}, {tone!r}, {account!r}, spool_path=Path('{spool.as_posix()}'))
+print(f"Saved script to {{path}}")
+""", producer_env)
+    try:
+        run_python_inline(VENV_XTTS, f"""
+from dotenv import load_dotenv
+from pathlib import Path
+load_dotenv(dotenv_path=Path('{ENV_FILE.as_posix()}'))
+from pipeline_modules.run_xtts_batch import run_xtts_streaming
+run_xtts_streaming(Path('{spool.as_posix()}'))
+print("XTTS streaming synthesis completed")
+""", env)
+    except BaseException:
+        producer.kill()
+        raise
+    finally:
+        code = producer.wait()
+    if code != 0:
+        raise subprocess.CalledProcessError(code, "script_generator_stream")
+
+def run_xtts_batch(env: Optional[dict] = None) -> None:
     echo("Running XTTS batch synthesis")
     code = f"""
 from dotenv import load_dotenv
@@ -86,27 +140,27 @@ from pipeline_modules.run_xtts_batch import run_xtts
 run_xtts()
 print("XTTS conversion completed")
 """
-    run_python_inline(VENV_XTTS, code)
+    run_python_inline(VENV_XTTS, code, env)
 
-def run_rvc_batch(rvc_env: Path) -> None:
+def run_rvc_batch(rvc_env: Path, env: Optional[dict] = None) -> None:
     echo(f"Running RVC batch conversion in: {rvc_env}")
     code = """
 from pipeline_modules.convert_batch import batch_convert
 batch_convert()
 print("RVC conversion completed")
 """
-    run_python_inline(rvc_env, code)
+    run_python_inline(rvc_env, code, env)
 
-def generate_timing_maps(topic: str) -> None:
+def generate_timing_maps(topic: str, env: Optional[dict] = None) -> None:
     echo("Generating timing maps")
     code = f"""
 from pipeline_modules.generate_timing_maps import main as generate_timing_maps
 generate_timing_maps({topic!r}, phoneme_align=True)
 print("Timing maps generated")
 """
-    run_python_inline(VENV_ALIGN, code)
+    run_python_inline(VENV_ALIGN, code, env)
 
-def combine_audio(general_env: Path) -> None:
+def combine_audio(general_env: Path, env: Optional[dict] = None) -> None:
     echo("Combining audio tracks")
     code = f"""
 from pathlib import Path
@@ -118,40 +172,77 @@ OUT.parent.mkdir(parents=True, exist_ok=True)
 combine_wavs(CONVERTED_DIR, OUT)
 print(f"Combined audio written to {{OUT}}")
 """
-    run_python_inline(general_env, code)
+    run_python_inline(general_env, code, env)
 
-def build_subtitles(general_env: Path) -> None:
-    echo("Building ASS subtitles")
+SUBTITLE_MODES = ("highlight", "karaoke", "karaoke_fill")
+
+def build_subtitles(general_env: Path, mode: str = "highlight", env: Optional[dict] = None) -> None:
+    echo(f"Building ASS subtitles ({mode})")
     code = f"""
 from pathlib import Path
 from pipeline_modules.generate_ass import build_ass_from_whisperx as generate_ass_subtitles
 BASE_DIR = Path('{REPO_ROOT.as_posix()}')
-timestamps = BASE_DIR / 'data' / 'final' / 'word_timestamps.json'
+timestamps = BASE_DIR / 'data' / 'final' / 'timing'
 ass_file   = BASE_DIR / 'data' / 'final' / 'dialogue.ass'
 ass_file.parent.mkdir(parents=True, exist_ok=True)
-generate_ass_subtitles(timestamps, ass_file)
+generate_ass_subtitles(timestamps, ass_file, mode={mode!r})
 print(f"ASS subtitles written to {{ass_file}}")
 """
-    run_python_inline(general_env, code)
+    run_python_inline(general_env, code, env)
+
+RENDITION_FILES = {"mobile": "reel_mobile.mp4", "thumbnail": "reel_thumbnail.jpg", "preview": "reel_preview.mp4"}
 
-def assemble_reel(general_env: Path, topic: str) -> None:
-    echo("Assembling final reel")
+def assemble_reel(general_env: Path, topic: str, jobs: int = 1, profile: str = "final",
+                  renditions: Iterable[str] = (), backend: str = "ffmpeg",
+                  env: Optional[dict] = None) -> None:
+    echo(f"Assembling {profile} reel")
     code = f"""
 from pathlib import Path
-from pipeline_modules.assemble_reel import assemble_reel
+from pipeline_modules.assemble_reel import assemble_reel, _probe_duration
+from pipeline_modules.background_library import pick_background
 BASE_DIR = Path('{REPO_ROOT.as_posix()}')
-bg          = BASE_DIR / 'data' / 'backgrounds' / 'bg_full.mp4'
 audio_final = BASE_DIR / 'data' / 'final' / 'final_output.wav'
+# Prefer a pre-cut mezzanine segment from the background library
+picked = pick_background(_probe_duration(audio_final))
+bg, bg_offset = picked or (BASE_DIR / 'data' / 'backgrounds' / 'bg_full.mp4', 0.0)
+print(f"Background: {{bg}} @ {{bg_offset:.1f}}s")
 ass_file    = BASE_DIR / 'data' / 'final' / 'dialogue.ass'
 sentence_map= BASE_DIR / 'data' / 'final' / 'sentence_map.json'
 script_json = BASE_DIR / f'data/scripts/{topic}.json'
 images_dir  = BASE_DIR / 'data' / 'images'
-out_path    = BASE_DIR / 'data' / 'final' / 'reel_final.mp4'
+out_path    = BASE_DIR / 'data' / 'final' / 'reel_{profile}.mp4'
 out_path.parent.mkdir(parents=True, exist_ok=True)
-assemble_reel(bg, audio_final, ass_file, sentence_map, script_json, images_dir, out_path)
+renditions  = {{BASE_DIR / 'data' / 'final' / f: name for name, f in {[(r, RENDITION_FILES[r]) for r in renditions]!r}}}
+assemble_reel(bg, audio_final, ass_file, sentence_map, script_json, images_dir, out_path,
+              bg_offset=bg_offset, jobs={jobs}, profile={profile!r}, renditions=renditions,
+              backend={backend!r})
 print(f"Final reel written to {{out_path}}")
 """
-    run_python_inline(general_env, code)
+    run_python_inline(general_env, code, env)
+
+def parse_cpu_slot(value: str):
+    slot, _, slots = value.partition("/")
+    slot, slots = int(slot), int(slots or 1)
+    if not 1 <= slot <= slots:
+        raise argparse.ArgumentTypeError(f"expected K/N with 1 <= K <= N, got {value!r}")
+    return slot, slots
+
+def plan_stage_resources(cpu_slot, stream_script: bool = False) -> dict:
+    """Thread budget and CPU slice per stage, logged to the run log.
+
+    Stages that run one after another each get this run's whole slot. Stages
+    that overlap (the script producer and XTTS with --stream-script) are planned
+    together, so each gets its own disjoint share of the slot instead of both
+    being pinned to all of it. --cpu-slot K/N gives concurrent runs disjoint
+    slots of the machine.
+    """
+    slot, slots = cpu_slot
+    topology = slot_topology(slot - 1, slots) if slots > 1 else cpu_topology()
+    plan = {stage: plan_resources([stage], topology)[stage] for stage in ("xtts", "rvc", "align", "ffmpeg")}
+    if stream_script:
+        plan.update(plan_resources(["xtts", "script"], topology))
+    log_plan(plan, scope=f"slot {slot}/{slots}")
+    return {stage: stage_env(entry) for stage, entry in plan.items()}
 
 def choose_env_with_module(mod: str, candidates: Iterable[Path]) -> Path:
     for v in candidates:
@@ -161,43 +252,92 @@ def choose_env_with_module(mod: str, candidates: Iterable[Path]) -> Path:
 
 def clean_workspace() -> None:
     # Remove large intermediate artefacts to save space, keep only the final reel
-    keep = {FINAL_DIR / "final_output.wav", FINAL_DIR / "dialogue.ass", FINAL_DIR / "reel_final.mp4",
-            FINAL_DIR / "word_timestamps.json", FINAL_DIR / "sentence_map.json"}
+    keep = {FINAL_DIR / "final_output.wav", FINAL_DIR / "dialogue.ass", FINAL_DIR / "reel_final.mp4", FINAL_DIR / "reel_draft.mp4",
+            *(FINAL_DIR / f for f in RENDITION_FILES.values()),
+            FINAL_DIR / "word_timestamps.json", FINAL_DIR / "sentence_map.json",
+            DATA_DIR / "allocator_watermarks.json"}
+    keep_dirs = {FINAL_DIR / "timing", DATA_DIR / "fonts", DATA_DIR / "cache", DATA_DIR / "backgrounds" / "library",
+                 DATA_DIR / "logs", DATA_DIR / "topic_index", DATA_DIR / "metrics", DATA_DIR / "batches",
+                 DATA_DIR / "queues"}
     if not DATA_DIR.exists():
         return
     for root, dirs, files in os.walk(DATA_DIR):
         for f in files:
             p = Path(root) / f
-            if p not in keep:
+            if p not in keep and not any(d in p.parents for d in keep_dirs):
                 try:
                     p.unlink()
                 except Exception:
                     pass
 
+def run_job(args) -> None:
+    ensure_envs_exist()
+    stage_envs = plan_stage_resources(args.cpu_slot, args.stream_script and not args.render_only)
+    general_env = choose_general_env()
+
+    if not args.render_only:
+        # openai_env = choose_env_with_module("openai", [general_env, VENV_CORE, VENV_RVC, VENV_XTTS, VENV_ALIGN])
+        with span("choose_envs"):
+            rvc_env = choose_env_with_module("rvc", [VENV_RVC, VENV_CORE, general_env, VENV_XTTS, VENV_ALIGN])
+
+        # generate_script(args.topic, args.tone, args.account, openai_env)
+        # run_xtts_batch(stage_envs["xtts"])
+        if args.stream_script:
+            with span("script_xtts"):
+                openai_env = choose_env_with_module("openai", [general_env, VENV_CORE, VENV_RVC, VENV_XTTS, VENV_ALIGN])
+                stream_script_to_xtts(args.topic, args.tone, args.account, openai_env,
+                                      stage_envs["xtts"], stage_envs["script"])
+        with span("rvc"):
+            run_rvc_batch(rvc_env, stage_envs["rvc"])
+        with span("align"):
+            generate_timing_maps(args.topic, stage_envs["align"])
+        with span("combine_audio"):
+            combine_audio(general_env, stage_envs["ffmpeg"])
+        with span("subtitles", mode=args.subtitle_mode):
+            build_subtitles(general_env, args.subtitle_mode, stage_envs["ffmpeg"])
+    else:
+        missing = [p for p in (FINAL_DIR / "final_output.wav", FINAL_DIR / "dialogue.ass",
+                               FINAL_DIR / "sentence_map.json") if not p.exists()]
+        if missing:
+            raise SystemExit(f"--render-only needs a previous run's outputs; missing: {', '.join(map(str, missing))}")
+    with span("assemble", jobs=args.render_jobs, backend=args.render_backend):
+        assemble_reel(general_env, args.topic, args.render_jobs, args.profile, args.renditions,
+                      args.render_backend, stage_envs["ffmpeg"])
+
+    if not args.keep_intermediates:
+        clean_workspace()
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("topic")
     parser.add_argument("tone")
     parser.add_argument("account")
     parser.add_argument("--keep-intermediates", action="store_true", help="do not delete intermediate files")
+    parser.add_argument("--subtitle-mode", choices=SUBTITLE_MODES, default="highlight",
+                        help="per-word highlight events, or one karaoke-tagged event per window")
+    parser.add_argument("--render-jobs", type=int, default=1,
+                        help="render the reel as this many keyframe-aligned segments in parallel")
+    parser.add_argument("--profile", choices=("final", "draft"), default="final",
+                        help="draft renders a quick 540x960 QA preview")
+    parser.add_argument("--render-only", action="store_true",
+                        help="skip to assembly, reusing the audio, timing and subtitles of the last run")
+    parser.add_argument("--renditions", nargs="*", choices=sorted(RENDITION_FILES), default=[],
+                        help="extra outputs rendered from the same graph as the main reel")
+    parser.add_argument("--render-backend", choices=("ffmpeg", "pyav"), default="ffmpeg",
+                        help="pyav renders in-process (needs PyAV built against an FFmpeg with libass)")
+    parser.add_argument("--stream-script", action="store_true",
+                        help="generate the script with streaming and start XTTS on its first finished line")
+    parser.add_argument("--cpu-slot", type=parse_cpu_slot, default=(1, 1), metavar="K/N",
+                        help="run in CPU slot K of N pipelines sharing this machine (pins CPUs, caps threads)")
     args = parser.parse_args()
 
-    ensure_envs_exist()
-    general_env = choose_general_env()
-
-    # openai_env = choose_env_with_module("openai", [general_env, VENV_CORE, VENV_RVC, VENV_XTTS, VENV_ALIGN])
-    rvc_env = choose_env_with_module("rvc", [VENV_RVC, VENV_CORE, general_env, VENV_XTTS, VENV_ALIGN])
-
-    # generate_script(args.topic, args.tone, args.account, openai_env)
-    # run_xtts_batch()
-    run_rvc_batch(rvc_env)
-    generate_timing_maps(args.topic)
-    combine_audio(general_env)
-    build_subtitles(general_env)
-    assemble_reel(general_env, args.topic)
+    # One run id for every stage's event log and render summary rows
+    os.environ.setdefault("PIPELINE_RUN_ID", f"{datetime.now():%Y%m%d-%H%M%S}-{args.topic}")
+    # One trace per job; every stage subprocess inherits it (see logkit.trace_env)
+    os.environ[TRACE_ID_ENV] = os.urandom(16).hex()
 
-    if not args.keep_intermediates:
-        clean_workspace()
+    with span("job", topic=args.topic, tone=args.tone, account=args.account, profile=args.profile):
+        run_job(args)
 
     print("Pipeline complete")
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Persistent near-duplicate index over queued and produced topics.
+
+Each topic is normalised (lowercase, punctuation dropped), cut into
+character shingles, hashed with crc32 and reduced to a NUM_PERM-value
+MinHash signature. Signatures are split into BANDS bands of ROWS values; two
+topics sharing any band become candidates (LSH). A 32-value signature only
+estimates the shingle Jaccard similarity to within about +-0.15, too loosely
+to apply the threshold to (topics sharing a long prefix such as
+"<account seed>: ..." land either side of it), so each candidate is
+confirmed with the exact Jaccard of its shingles, recomputed from the stored
+topic text (candidates whose estimate is far below the threshold are
+dropped without it). A lookup is a handful of dict probes plus one exact comparison
+per candidate, independent of how many topics are indexed.
+
+On disk (data/topic_index/): signatures.bin holds the signatures as packed
+uint32 rows, topics.jsonl the matching topic records in the same order, and
+rejected.jsonl every rejected duplicate with what it matched. Both main files
+are append-only, so adding a batch of topics is two appends; loading cuts off
+a torn or unmatched last record so later appends stay aligned.
+
+Usage:
+  python scripts/topic_index.py seed          index every queue and produced script
+  python scripts/topic_index.py query <topic>
+  python scripts/topic_index.py stats
+"""
+import argparse
+import json
+import random
+import re
+import struct
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+INDEX_DIR = REPO_ROOT / "data" / "topic_index"
+QUEUE_DIR = REPO_ROOT / "data" / "queues"
+SCRIPTS_DIR = REPO_ROOT / "data" / "scripts"
+
+SHINGLE = 4              # characters per shingle
+NUM_PERM = 32
+BANDS, ROWS = 8, 4       # BANDS * ROWS == NUM_PERM; candidate curve midpoint ~(1/8)**(1/4) = 0.59
+THRESHOLD = 0.7          # exact shingle Jaccard at or above which a topic is a duplicate
+ESTIMATE_SLACK = 0.3     # candidates estimated this far below THRESHOLD skip the exact check (~4 sd at 32 hashes)
+_MASK64 = (1 << 64) - 1
+_ROW = struct.Struct(f"<{NUM_PERM}I")
+
+# Fixed seed: signatures must stay comparable across runs
+_rng = random.Random(0x70CC)
+_PERMS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalise(topic: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", topic.lower().replace("&", " and "))).strip()
+
+
+def shingles(topic: str) -> set:
+    text = f" {normalise(topic)} "
+    if len(text) <= SHINGLE:
+        return {zlib.crc32(text.encode())}
+    return {zlib.crc32(text[i:i + SHINGLE].encode()) for i in range(len(text) - SHINGLE + 1)}
+
+
+def signature(topic: str) -> Tuple[int, ...]:
+    # Multiply-shift hashing: the top 32 bits of (a*h + b) mod 2**64 for each (a, b)
+    hashes = shingles(topic)
+    return tuple(min([(a * h + b) & _MASK64 for h in hashes]) >> 32 for a, b in _PERMS)
+
+
+def _band_keys(sig) -> List[tuple]:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def similarity(a, b) -> float:
+    """MinHash estimate of the Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class TopicIndex:
+    def __init__(self, index_dir: Path = INDEX_DIR, threshold: float = THRESHOLD):
+        self.index_dir = Path(index_dir)
+        self.threshold = threshold
+        self.sigs: List[Tuple[int, ...]] = []
+        self.topics: List[str] = []
+        self.buckets: Dict[tuple, List[int]] = {}
+        self._load()
+
+    @property
+    def sig_path(self) -> Path:
+        return self.index_dir / "signatures.bin"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.index_dir / "topics.jsonl"
+
+    def _load(self) -> None:
+        if not self.sig_path.exists() or not self.meta_path.exists():
+            return
+        raw = self.sig_path.read_bytes()
+        lines = []
+        with open(self.meta_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    lines.append((line, json.loads(line)["topic"]))
+                except (json.JSONDecodeError, KeyError):
+                    # A torn last record from a crash mid-append
+                    break
+        # A crash between the two appends leaves one file a record ahead; trust the shorter
+        n = min(len(raw) // _ROW.size, len(lines))
+        for i, sig in enumerate(_ROW.iter_unpack(raw[:n * _ROW.size])):
+            self._insert(sig, lines[i][1])
+        # Cut both files back to the records they share, so later appends stay aligned
+        if len(raw) != n * _ROW.size:
+            with open(self.sig_path, "r+b") as f:
+                f.truncate(n * _ROW.size)
+        if self.meta_path.stat().st_size != sum(len(line.encode("utf-8")) for line, _ in lines[:n]):
+            self.meta_path.write_text("".join(line for line, _ in lines[:n]), encoding="utf-8")
+
+    def _insert(self, sig, topic: str) -> int:
+        i = len(self.sigs)
+        self.sigs.append(sig)
+        self.topics.append(topic)
+        for key in _band_keys(sig):
+            self.buckets.setdefault(key, []).append(i)
+        return i
+
+    def __len__(self) -> int:
+        return len(self.sigs)
+
+    def lookup(self, topic: str, sig=None) -> Optional[Tuple[str, float]]:
+        """Best indexed match at or above the threshold, as (topic, exact shingle Jaccard), else None."""
+        sig = sig or signature(topic)
+        own = shingles(topic)
+        best, best_sim = None, 0.0
+        seen = set()
+        for key in _band_keys(sig):
+            for i in self.buckets.get(key, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                # LSH only nominates candidates; the threshold applies to the exact similarity
+                if similarity(sig, self.sigs[i]) < self.threshold - ESTIMATE_SLACK:
+                    continue
+                sim = jaccard(own, shingles(self.topics[i]))
+                if sim > best_sim:
+                    best, best_sim = i, sim
+        if best is None or best_sim < self.threshold:
+            return None
+        return self.topics[best], best_sim
+
+    def _append(self, entries: List[Tuple[tuple, dict]]) -> None:
+        """Persist (signature, record) pairs and index them, with one write per file."""
+        if not entries:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.sig_path, "ab") as f:
+            f.write(b"".join(_ROW.pack(*sig) for sig, _ in entries))
+        with open(self.meta_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for _, r in entries))
+
+    def add(self, topic: str, sig=None, **meta) -> None:
+        sig = sig or signature(topic)
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        self._append([(sig, {"topic": topic, **meta, "indexed_at": now})])
+        self._insert(sig, topic)
+
+    def filter_new(self, items: List[dict], source: str) -> Tuple[List[dict], List[dict]]:
+        """Split queue items into (new, rejected), indexing the new ones as it goes.
+
+        Duplicates within items are caught too. Each rejected entry is
+        {"topic", "matched", "similarity", "source"} and is appended to rejected.jsonl.
+        """
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        accepted, rejected, entries = [], [], []
+        for item in items:
+            sig = signature(item["topic"])
+            match = self.lookup(item["topic"], sig)
+            if match is None:
+                self._insert(sig, item["topic"])
+                entries.append((sig, {"topic": item["topic"], "source": source,
+                                      "account": item.get("account"), "indexed_at": now}))
+                accepted.append(item)
+            else:
+                rejected.append({"topic": item["topic"], "matched": match[0],
+                                 "similarity": round(match[1], 3), "source": source})
+        self._append(entries)
+        if rejected:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.index_dir / "rejected.jsonl", "a", encoding="utf-8") as f:
+                for r in rejected:
+                    f.write(json.dumps({**r, "rejected_at": now}, ensure_ascii=False) + "\n")
+        return accepted, rejected
+
+
+def seed(index: TopicIndex, queue_dir: Path = QUEUE_DIR, scripts_dir: Path = SCRIPTS_DIR) -> Tuple[int, int]:
+    """Index every topic already queued or produced; returns (added, duplicates)."""
+    added = dupes = 0
+    for f in sorted(queue_dir.glob("*.json")):
+        accepted, rejected = index.filter_new(json.loads(f.read_text()), source=f"queue:{f.stem}")
+        added, dupes = added + len(accepted), dupes + len(rejected)
+    # Produced scripts are saved as data/scripts/<topic>.json
+    produced = [{"topic": f.stem.replace("_", " ")} for f in sorted(scripts_dir.glob("*.json"))]
+    accepted, rejected = index.filter_new(produced, source="produced")
+    return added + len(accepted), dupes + len(rejected)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("seed", help="index all queued and produced topics")
+    p_query = sub.add_parser("query", help="show the closest indexed duplicate of a topic")
+    p_query.add_argument("topic")
+    sub.add_parser("stats", help="index size and rejection count")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = ap.parse_args()
+
+    index = TopicIndex(threshold=args.threshold)
+    if args.cmd == "seed":
+        added, dupes = seed(index)
+        print(f"Indexed {added} topics, {dupes} near-duplicates skipped ({len(index)} total)")
+    elif args.cmd == "query":
+        match = index.lookup(args.topic)
+        print("No near-duplicate" if match is None else f"{match[1]:.2f}  {match[0]}")
+        sys.exit(0 if match is None else 1)
+    else:
+        rejected = index.index_dir / "rejected.jsonl"
+        n_rejected = sum(1 for _ in open(rejected, encoding="utf-8")) if rejected.exists() else 0
+        print(f"{len(index)} topics indexed, {len(index.buckets)} LSH buckets, {n_rejected} duplicates rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path in (REPO_ROOT, REPO_ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def run_log(tmp_path, monkeypatch):
+    """Route this process's logkit run log to tmp_path; returns a callable that drains it and returns the events."""
+    import json
+
+    from pipeline_modules import logkit
+
+    monkeypatch.setenv(logkit.RUN_ID_ENV, "test-run")
+    monkeypatch.setitem(logkit._run_loggers, "test-run", logkit.get_event_logger(tmp_path, "test-run"))
+    listener = logkit._listeners[-1]
+
+    def drain():
+        if listener in logkit._listeners:
+            logkit._listeners.remove(listener)
+            listener.stop()
+        return [json.loads(line) for line in (tmp_path / "test-run.jsonl").read_text().splitlines()]
+
+    yield drain
+    drain()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Start scripts/openai_stub_server.py with the given options and point the OpenAI client at it."""
+    pytest.importorskip("openai")
+    from openai_stub_server import serve
+
+    servers = []
+
+    def start(**kwargs):
+        server, stats = serve(port=0, **kwargs)
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        return stats
+
+    yield start
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+import allocator_daemon
+import idea_allocator
+from pipeline_modules import job_queue
+
+ACCOUNTS = {"Tech": "queue_tech", "History": "queue_history"}
+
+
+@pytest.fixture(autouse=True)
+def queues(tmp_path, monkeypatch):
+    """Queues, topic index and metrics under tmp_path."""
+    monkeypatch.setattr(job_queue, "QUEUE_DIR", tmp_path / "queues")
+    monkeypatch.setattr(idea_allocator, "TOPIC_INDEX_DIR", tmp_path / "topic_index")
+    monkeypatch.setattr(allocator_daemon, "METRICS_DIR", tmp_path / "metrics")
+    (tmp_path / "queues").mkdir()
+
+
+def fill(queue, n):
+    idea_allocator.save_queue(queue, [{"topic": f"{queue} {i}"} for i in range(n)])
+
+
+def test_plan_refills_tops_up_accounts_projected_below_low():
+    marks = {"Tech": (10, 30), "History": (10, 30), "Physics": (10, 30)}
+    depths = {"Tech": 25, "History": 14, "Physics": 5}
+    # History drains 30/h: 14 - 30 * 600/3600 = 9 projected, so it is due with that consumption added
+    plan = allocator_daemon.plan_refills(depths, {"History": 30.0}, marks, lead_seconds=600, max_refill=50)
+    assert plan == {"History": 21, "Physics": 25}
+
+
+def test_plan_refills_caps_at_max_refill():
+    plan = allocator_daemon.plan_refills({"Tech": 0}, {"Tech": 600.0}, {"Tech": (10, 30)},
+                                         lead_seconds=600, max_refill=50)
+    assert plan == {"Tech": 50}
+
+
+def test_observe_folds_drops_into_the_rate():
+    monitor = allocator_daemon.QueueMonitor(ACCOUNTS, alpha=0.5)
+    fill("queue_tech", 10)
+    fill("queue_history", 10)
+    assert monitor.observe(now=0.0) == {"Tech": 10, "History": 10}
+    assert monitor.rates == {"Tech": 0.0, "History": 0.0}
+
+    fill("queue_tech", 4)
+    fill("queue_history", 20)
+    monitor.observe(now=3600.0)
+    # Tech fell 6 in an hour; History grew, which is someone else enqueueing, not consumption
+    assert monitor.rates == {"Tech": 3.0, "History": 0.0}
+
+    fill("queue_tech", 4)
+    monitor.observe(now=7200.0)
+    assert monitor.rates["Tech"] == 1.5
+
+
+def test_jobs_moved_to_ready_are_not_consumption():
+    monitor = allocator_daemon.QueueMonitor(ACCOUNTS)
+    fill("queue_tech", 10)
+    monitor.observe(now=0.0)
+    # What script_batch.move_to_ready does once a batch's scripts are ingested
+    jobs = job_queue.load_queue("queue_tech")
+    job_queue.save_queue("queue_tech_ready", jobs[:6])
+    job_queue.save_queue("queue_tech", jobs[6:])
+    assert monitor.observe(now=3600.0)["Tech"] == 10
+    assert monitor.rates["Tech"] == 0.0
+
+    job_queue.dequeue("queue_tech_ready")
+    monitor.observe(now=7200.0)
+    assert monitor.rates["Tech"] > 0
+
+
+def test_run_cycle_rebaselines_after_its_own_refill(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monitor = allocator_daemon.QueueMonitor(ACCOUNTS)
+    marks = {a: (2, 6) for a in ACCOUNTS}
+    stats = {"cycles": 0, "llm_requests": 0, "topics_queued": 0}
+
+    snap = allocator_daemon.run_cycle(monitor, marks, stats)
+    assert {a: m["requested"] for a, m in snap["accounts"].items()} == {"Tech": 6, "History": 6}
+    assert stats["topics_queued"] == sum(monitor.depths().values()) > 0
+    assert stats["llm_requests"] == 0    # stub topics
+
+    idea_allocator.dequeue("queue_tech")
+    allocator_daemon.run_cycle(monitor, marks, stats, dry_run=True)
+    # Measured from the refilled depth, not the empty queue seen before the refill
+    assert monitor.rates["Tech"] > 0
+    assert monitor.rates["History"] == 0.0
+    metrics = json.loads((allocator_daemon.METRICS_DIR / "queue_depth.json").read_text())
+    assert metrics["cycles"] == 2
+
+
+def test_llm_requests_counts_only_requests_that_succeeded(stub):
+    def reply(body):
+        if body["response_format"]["json_schema"]["name"] == "accounts_topics_schema":
+            return "{truncated"
+        return json.dumps({"topics": [{"topic": f"stub topic {body['messages'][1]['content'][:40]}",
+                                       "tone": "dry"}] * 2})
+
+    server_stats = stub(latency=0.0, reply=reply)
+    monitor = allocator_daemon.QueueMonitor(ACCOUNTS)
+    stats = {"cycles": 0, "llm_requests": 0, "topics_queued": 0}
+    allocator_daemon.run_cycle(monitor, {a: (2, 6) for a in ACCOUNTS}, stats, single_call=True)
+    # The batched call failed and both accounts fell back to their own request
+    assert server_stats["requests"] == 1 + len(ACCOUNTS)
+    assert stats["llm_requests"] == len(ACCOUNTS)
+
+
+def test_load_watermarks_applies_overrides(tmp_path):
+    path = tmp_path / "watermarks.json"
+    path.write_text(json.dumps({"Tech": {"low": 5, "high": 40}, "History": {"high": 50}}))
+    assert allocator_daemon.load_watermarks(ACCOUNTS, 10, 30, path) == {"Tech": (5, 40), "History": (10, 50)}
+    assert allocator_daemon.load_watermarks(ACCOUNTS, 10, 30, tmp_path / "missing.json") == {
+        "Tech": (10, 30), "History": (10, 30)}
+
+
+@pytest.mark.parametrize("override", [{"low": 30, "high": 30}, {"low": 40}])
+def test_load_watermarks_rejects_high_not_above_low(tmp_path, override):
+    path = tmp_path / "watermarks.json"
+    path.write_text(json.dumps({"History": override}))
+    with pytest.raises(ValueError, match="History"):
+        allocator_daemon.load_watermarks(ACCOUNTS, 10, 30, path)
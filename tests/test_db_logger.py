@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+from pipeline_modules import db_logger
+
+ROW = dict(account="Tech", topic="Why the sky is blue", status="Script Generated", notes="Success",
+           input_tokens=800, output_tokens=600, total_tokens=1400,
+           estimated_cost_usd=0.01, estimated_cost_aud=0.015)
+
+
+def test_events_are_buffered_then_appended(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_logger, "FLUSH_EVENTS", 3)
+    monkeypatch.setattr(db_logger, "FLUSH_SECONDS", 3600)
+    log = db_logger.init_log(tmp_path / "log.jsonl")
+    for _ in range(2):
+        log = db_logger.log_event(log, **ROW)
+    assert not log.path.exists()
+    assert len(log) == 2
+    db_logger.log_event(log, **ROW)
+    assert len(log.path.read_text().splitlines()) == 3
+
+    db_logger.log_event(log, **{**ROW, "status": "Script Failed"})
+    db_logger.save_log(log)
+    lines = log.path.read_text().splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[-1])["status"] == "Script Failed"
+
+
+def test_appends_never_rewrite_existing_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    first = db_logger.init_log(path)
+    db_logger.log_event(first, **ROW)
+    db_logger.save_log(first)
+    before = path.read_bytes()
+    second = db_logger.init_log(path)
+    db_logger.log_event(second, **{**ROW, "account": "History"})
+    db_logger.save_log(second)
+    assert path.read_bytes().startswith(before)
+    assert [e["account"] for e in db_logger.read_events(path)] == ["Tech", "History"]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(json.dumps(ROW) + "\n" + '{"account": "Te')
+    assert len(list(db_logger.read_events(path))) == 1
+
+
+def test_legacy_csv_is_migrated_once(tmp_path):
+    legacy = tmp_path / "content_log.csv"
+    with open(legacy, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=db_logger.COLUMNS)
+        writer.writeheader()
+        writer.writerow({"timestamp": "2025-01-01T00:00:00", **ROW})
+        writer.writerow({"timestamp": "2025-01-02T00:00:00", **ROW, "input_tokens": "", "status": "Script Failed"})
+    log = db_logger.init_log(legacy)
+    assert log.path == tmp_path / "content_log.jsonl"
+    assert not legacy.exists() and (tmp_path / "content_log.csv.migrated").exists()
+    events = list(log)
+    assert events[0]["input_tokens"] == 800 and events[0]["estimated_cost_usd"] == 0.01
+    assert events[1]["input_tokens"] is None
+    assert len(list(db_logger.init_log(legacy))) == 2
+
+
+def test_report_and_export(tmp_path):
+    log = db_logger.init_log(tmp_path / "log.jsonl")
+    db_logger.log_event(log, **ROW)
+    db_logger.log_event(log, **{**ROW, "status": "Script Failed", "total_tokens": None, "estimated_cost_usd": None,
+                                "estimated_cost_aud": None})
+    db_logger.log_event(log, **{**ROW, "account": "History"})
+    groups = db_logger.report(log, by="account")
+    assert groups["Tech"]["events"] == 2 and groups["Tech"]["failed"] == 1
+    assert groups["Tech"]["tokens"] == 1400 and groups["History"]["cost_usd"] == 0.01
+
+    out = io.StringIO()
+    db_logger.export(db_logger.select(log, status="Script Failed"), out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [r["status"] for r in rows] == ["Script Failed"]
@@ -0,0 +1,29 @@
+import stat
+from datetime import datetime
+
+from pipeline_modules import ffmpeg_progress
+
+FAKE_FFMPEG = """#!/bin/sh
+printf 'frame=12\\nfps=24.0\\nout_time_us=500000\\nbitrate=812.5kbits/s\\nspeed=1.5x\\nprogress=continue\\n'
+printf 'frame=24\\nfps=24.0\\nout_time_us=1000000\\nbitrate=800.0kbits/s\\nspeed=2.0x\\ntotal_size=1000\\nprogress=end\\n'
+"""
+
+
+def test_run_ffmpeg_logs_progress_and_utc_summary(tmp_path, run_log):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG)
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+
+    summary = ffmpeg_progress.run_ffmpeg([str(ffmpeg), "-i", "in.mp4", "out.mp4"], "test",
+                                         summary_csv=tmp_path / "summary.csv")
+    events = run_log()
+
+    assert summary["frames"] == 24 and summary["speed"] == 2.0 and summary["out_time_s"] == 1.0
+    assert datetime.fromisoformat(summary["ts"]).utcoffset().total_seconds() == 0
+    assert (tmp_path / "summary.csv").read_text().splitlines()[0].startswith("run_id,ts,")
+
+    assert [e["frame"] for e in events if e["msg"] == "ffmpeg_progress"] == [12, 24]
+    finish = next(e for e in events if e["msg"] == "ffmpeg_finish")
+    # Every run-log line keeps the formatter's millisecond UTC ts
+    assert finish["ts"].endswith("+00:00") and "." in finish["ts"]
+    assert finish["finished_at"] == summary["ts"]
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import time
+
+import idea_allocator
+
+
+def test_concurrent_requests_reach_the_stub(stub):
+    stats = stub(latency=0.3)
+    accounts = idea_allocator.ACCOUNTS
+    t0 = time.perf_counter()
+    ideas, requests = asyncio.run(idea_allocator.allocate_async(accounts, 3, concurrency=len(accounts), rpm=6000))
+    wall = time.perf_counter() - t0
+    assert stats["requests"] == requests == len(accounts)
+    assert stats["max_in_flight"] == len(accounts)
+    assert wall < 2 * 0.3 + 0.5
+    assert list(ideas) == list(accounts)
+    assert all(len(items) == 3 for items in ideas.values())
+
+
+def test_failed_account_does_not_sink_the_others(stub):
+    def reply(body):
+        if "'History'" in body["messages"][1]["content"]:
+            return "not json"
+        return json.dumps({"topics": [{"topic": "stub topic", "tone": "dry"}] * 2})
+
+    stub(latency=0.0, reply=reply)
+    ideas, requests = asyncio.run(idea_allocator.allocate_async(idea_allocator.ACCOUNTS, 2, concurrency=5, rpm=6000))
+    assert "History" not in ideas
+    assert requests == len(idea_allocator.ACCOUNTS) - 1
+    assert set(ideas) == set(idea_allocator.ACCOUNTS) - {"History"}
+
+
+def test_single_call_failure_falls_back_per_account(stub):
+    def reply(body):
+        if body["response_format"]["json_schema"]["name"] == "accounts_topics_schema":
+            return "{truncated"
+        return json.dumps({"topics": [{"topic": "stub topic", "tone": "dry"}] * 2})
+
+    stats = stub(latency=0.0, reply=reply)
+    ideas, requests = asyncio.run(idea_allocator.allocate_async(idea_allocator.ACCOUNTS, 2, single_call=True,
+                                                                rpm=6000))
+    assert stats["requests"] == 1 + len(idea_allocator.ACCOUNTS)
+    # The truncated single call does not count as a request made
+    assert requests == len(idea_allocator.ACCOUNTS)
+    assert list(ideas) == list(idea_allocator.ACCOUNTS)
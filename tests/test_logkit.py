@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from pipeline_modules import logkit
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_json_formatter_writes_aware_utc_timestamps():
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO", "created": 1_700_000_000.25,
+                                    "stage": "xtts"})
+    line = json.loads(logkit.JsonFormatter().format(record))
+    assert line["ts"] == "2023-11-14T22:13:20.250+00:00"
+    assert datetime.fromisoformat(line["ts"]) == datetime.fromtimestamp(1_700_000_000.25, timezone.utc)
+    assert line["msg"] == "hello" and line["stage"] == "xtts"
+
+
+@pytest.fixture
+def trace(monkeypatch):
+    monkeypatch.setenv(logkit.TRACE_ID_ENV, "trace-1")
+    monkeypatch.delenv(logkit.PARENT_SPAN_ENV, raising=False)
+
+
+def test_spans_nest_through_the_context(run_log, trace):
+    with logkit.span("job", topic="t") as job:
+        with logkit.span("job.tts") as tts:
+            tts.set(lines=3)
+        with pytest.raises(RuntimeError):
+            with logkit.span("job.render"):
+                raise RuntimeError("boom")
+    spans = {e["span"]: e for e in run_log() if e["msg"] == "span"}
+    assert spans["job"]["parent_id"] is None and spans["job"]["span_id"] == job.span_id
+    assert spans["job.tts"]["parent_id"] == spans["job.render"]["parent_id"] == job.span_id
+    assert {s["trace_id"] for s in spans.values()} == {"trace-1"}
+    assert spans["job"]["attrs"] == {"topic": "t"} and spans["job.tts"]["attrs"] == {"lines": 3}
+    assert spans["job.render"]["status"] == "error" and spans["job.render"]["error"] == "RuntimeError: boom"
+    assert spans["job.tts"]["start_us"] >= spans["job"]["start_us"]
+
+
+def test_timed_accepts_any_extra_keys(run_log, trace):
+    lg = logkit.run_logger()
+    with logkit.timed(lg, {"name": "peter", "lg": "en"}, "tts"):
+        pass
+    events = run_log()
+    assert [e["msg"] for e in events] == ["start", "finish", "span"]
+    start, finish, span = events
+    assert start["name"] == "peter" and start["lg"] == "en" and start["step"] == "tts"
+    assert "extra" not in start
+    assert span["span"] == "tts" and span["attrs"] == {"name": "peter", "lg": "en"}
+    assert start["span_id"] == finish["span_id"] == span["span_id"]
+    assert finish["duration_ms"] >= 0
+
+
+def test_trace_env_makes_subprocess_spans_children(run_log, trace, tmp_path):
+    code = textwrap.dedent(f"""
+        import sys
+        from pathlib import Path
+        sys.path.insert(0, {str(REPO_ROOT)!r})
+        from pipeline_modules import logkit
+        logkit.run_logger(Path({str(tmp_path / "stage")!r}))
+        with logkit.span("stage.infer"):
+            pass
+    """)
+    with logkit.span("orchestrate") as parent:
+        subprocess.run([sys.executable, "-c", code], env={**os.environ, **logkit.trace_env()}, check=True)
+    [child] = logkit.read_spans(tmp_path / "stage" / "test-run.jsonl")
+    assert child["trace_id"] == "trace-1" and child["run_id"] == "test-run"
+    assert child["parent_id"] == parent.span_id
+    assert child["pid"] != os.getpid()
+
+
+def test_chrome_trace_names_processes_after_the_span_that_started_them():
+    spans = [
+        {"span": "stage.infer", "span_id": "c", "parent_id": "a", "start_us": 20, "dur_us": 5, "pid": 2, "tid": 2,
+         "status": "error", "error": "OSError: disk", "attrs": {"line": 1}},
+        {"span": "orchestrate", "span_id": "a", "parent_id": None, "start_us": 10, "dur_us": 50, "pid": 1,
+         "tid": 1, "status": "ok", "attrs": {}},
+        {"span": "orchestrate.wait", "span_id": "b", "parent_id": "a", "start_us": 15, "dur_us": 30, "pid": 1,
+         "tid": 1, "status": "ok", "attrs": {}},
+    ]
+    events = logkit.chrome_trace(spans)["traceEvents"]
+    slices = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in slices] == ["orchestrate", "orchestrate.wait", "stage.infer"]
+    assert slices[2] == {"name": "stage.infer", "cat": "stage", "ph": "X", "ts": 20, "dur": 5, "pid": 2, "tid": 2,
+                         "args": {"line": 1, "span_id": "c", "parent_id": "a", "status": "error",
+                                  "error": "OSError: disk"}}
+    names = {e["pid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert names == {1: "orchestrate [1]", 2: "orchestrate [2]"}
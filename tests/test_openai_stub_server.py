@@ -0,0 +1,24 @@
+import itertools
+
+from openai_stub_server import fake_value
+from pipeline_modules.script_schema import RESPONSE_FORMAT, SPEAKERS
+
+
+def test_enum_values_are_taken_in_turn():
+    counter = itertools.count(1)
+    schema = {"type": "string", "enum": ["a", "b", "c"]}
+    assert {fake_value(schema, counter, 3) for _ in range(3)} == {"a", "b", "c"}
+
+
+def test_stub_scripts_use_every_speaker():
+    script = fake_value(RESPONSE_FORMAT["json_schema"]["schema"], itertools.count(1), 4)
+    assert {c["name"] for c in script["characters"]} == set(SPEAKERS)
+
+
+def test_account_enum_gets_one_entry_per_account():
+    schema = {"type": "array", "items": {"type": "object", "properties": {
+        "account": {"type": "string", "enum": ["Tech", "History"]}, "topics": {"type": "array", "minItems": 2,
+                                                                                 "items": {"type": "string"}}}}}
+    entries = fake_value(schema, itertools.count(1), 5)
+    assert [e["account"] for e in entries] == ["Tech", "History"]
+    assert all(len(e["topics"]) == 2 for e in entries)
@@ -0,0 +1,46 @@
+import shutil
+import subprocess
+
+import pytest
+
+from pipeline_modules import assemble_reel as ar
+from pipeline_modules.overlay_cache import overlay_asset
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg on PATH")
+
+W, H = 320, 320
+
+
+def ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *args], check=True)
+
+
+def luma(cmd_inputs, filter_complex, label):
+    """Y plane of the first yuv420p frame, as the encoder would see it."""
+    out = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", *cmd_inputs,
+                          "-filter_complex", filter_complex, "-map", f"[{label}]", "-frames:v", "1",
+                          "-pix_fmt", "yuv420p", "-f", "rawvideo", "-"], capture_output=True, check=True).stdout
+    return out[:W * H]
+
+
+def test_transparent_margin_leaves_background_unchanged(tmp_path):
+    # 200x200 speaker image: an opaque red square inside a fully transparent 50px margin
+    src = tmp_path / "Peter.png"
+    ffmpeg("-f", "lavfi", "-i", "color=c=red:s=100x100,format=rgba",
+           "-vf", "pad=200:200:50:50:color=black@0", "-frames:v", "1", str(src))
+    cached = overlay_asset(src, 1.0, cache_dir=tmp_path / "cache")
+
+    bg = ["-f", "lavfi", "-i", f"color=c=0x404040:s={W}x{H}:d=1,format=yuv420p"]
+    plain = luma(bg, "[0:v]null[out]", "out")
+    graph, label = ar.build_filter_graph([{"speaker": "Peter", "start": 0, "end": 1}], {"Peter": 1},
+                                         None, prescaled=True)
+    composited = luma([*bg, "-i", str(cached)], graph, label)
+
+    # Overlay lands at x=15, y=H-200-BOTTOM_MARGIN; check its transparent top margin rows
+    top = H - 200 - ar.BOTTOM_MARGIN
+    for y in range(top + 5, top + 45):
+        row = slice(y * W + 20, y * W + 15 + 195)
+        assert composited[row] == plain[row], f"background changed under the transparent margin at row {y}"
+    # ...while the opaque centre is actually drawn
+    centre = (top + 100) * W + 115
+    assert composited[centre] != plain[centre]
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from pipeline_modules import quantize
+
+
+def test_source_hash_reads_file_only_when_it_changes(tmp_path, monkeypatch):
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"x" * 4096)
+    calls = []
+    real = quantize._file_hash
+    monkeypatch.setattr(quantize, "_file_hash", lambda p: calls.append(p) or real(p))
+
+    first = quantize.source_hash(weights, tmp_path / "cache")
+    assert quantize.source_hash(weights, tmp_path / "cache") == first
+    assert len(calls) == 1
+
+    weights.write_bytes(b"y" * 4096)
+    st = weights.stat()
+    os.utime(weights, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert quantize.source_hash(weights, tmp_path / "cache") != first
+    assert len(calls) == 2
+
+
+def test_cached_quantized_reuses_cache(tmp_path):
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"weights")
+    module = torch.nn.Sequential(torch.nn.Linear(8, 8))
+    q = quantize.cached_quantized(module, "demo", weights, tmp_path / "cache")
+    again = quantize.cached_quantized(torch.nn.Sequential(torch.nn.Linear(8, 8)), "demo", weights, tmp_path / "cache")
+    x = torch.randn(2, 8)
+    assert torch.allclose(q(x), again(x))
+    assert len(list((tmp_path / "cache").glob("demo_*.pt"))) == 1
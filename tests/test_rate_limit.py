@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from pipeline_modules.rate_limit import TokenBucket, parse_reset
+
+
+def test_token_bucket_allows_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=20.0, capacity=3)
+        stamps = []
+        t0 = time.monotonic()
+        for _ in range(7):
+            await bucket.acquire()
+            stamps.append(time.monotonic() - t0)
+        return stamps
+
+    stamps = asyncio.run(run())
+    # The burst goes through at once, the other four wait 1/20 s each
+    assert stamps[2] < 0.03
+    assert stamps[-1] == pytest.approx(4 / 20, abs=0.05)
+
+
+def test_token_bucket_shared_by_concurrent_callers():
+    async def run():
+        bucket = TokenBucket(rate=50.0, capacity=1)
+        t0 = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        return time.monotonic() - t0
+
+    assert asyncio.run(run()) == pytest.approx(5 / 50, abs=0.05)
+
+
+def test_observe_pauses_when_window_runs_out():
+    async def run():
+        bucket = TokenBucket(rate=1000.0, capacity=5)
+        bucket.observe({"x-ratelimit-remaining-requests": "1", "x-ratelimit-reset-requests": "150ms"}, in_flight=3)
+        t0 = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - t0
+
+    assert asyncio.run(run()) == pytest.approx(0.15, abs=0.05)
+
+
+def test_parse_reset():
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("120ms") == pytest.approx(0.12)
+    assert parse_reset(None) is None
@@ -0,0 +1,26 @@
+from pipeline_modules.resource_planner import plan_resources, slot_topology
+
+
+def test_concurrent_stages_get_disjoint_cpus():
+    topology = {0: list(range(8))}
+    plan = plan_resources(["xtts", "script"], topology)
+    xtts, script = set(plan["xtts"]["cpus"]), set(plan["script"]["cpus"])
+    assert xtts and script
+    assert not xtts & script
+    assert xtts | script == set(range(8))
+    assert len(xtts) > len(script)
+
+
+def test_all_stages_partition_the_machine():
+    topology = {0: list(range(6)), 1: list(range(6, 12))}
+    plan = plan_resources(["xtts", "rvc", "align", "ffmpeg"], topology)
+    seen = [c for entry in plan.values() for c in entry["cpus"]]
+    assert len(seen) == len(set(seen)) == 12
+    # Each share fits on one node, so no stage straddles both
+    assert all(len(entry["nodes"]) == 1 for entry in plan.values())
+
+
+def test_slots_are_disjoint():
+    topology = {0: list(range(8))}
+    a, b = (set(c for cs in slot_topology(i, 2, topology).values() for c in cs) for i in range(2))
+    assert a and b and not a & b
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+pytest.importorskip("TTS")
+
+from pipeline_modules import run_xtts_batch
+from pipeline_modules.script_stream import LineSpool, ScriptLineParser
+
+SCRIPT = {
+    "topic": "t", "tone": "dry",
+    "characters": [
+        {"name": "Stewie", "lines": ["Unvoiced one."]},
+        {"name": "Peter", "lines": ["First.", "Second."]},
+        {"name": "Stewie", "lines": ["Unvoiced two."]},
+        {"name": "Peter", "lines": ["Third."]},
+    ],
+}
+
+
+def test_batch_and_streaming_number_lines_alike(monkeypatch, tmp_path):
+    sample, style = tmp_path / "peter.wav", tmp_path / "style.wav"
+    sample.write_bytes(b""), style.write_bytes(b"")
+    monkeypatch.setattr(run_xtts_batch, "speaker_references",
+                        lambda: ({"Peter": [sample], "Stewie": []}, {"Peter": style, "Stewie": style}))
+    monkeypatch.setattr(run_xtts_batch, "load_xtts", lambda: None)
+    monkeypatch.setattr(run_xtts_batch, "OUTPUT_BASE", tmp_path / "out")
+    calls = []
+    monkeypatch.setattr(run_xtts_batch, "synthesize_line",
+                        lambda tts, index, name, line, samples, out_dir=None: calls.append((index, name, line)))
+
+    monkeypatch.setattr(run_xtts_batch, "ROOT", tmp_path)
+    (tmp_path / "data" / "scripts").mkdir(parents=True)
+    (tmp_path / "data" / "scripts" / "t.json").write_text(json.dumps(SCRIPT))
+    run_xtts_batch.run_xtts()
+    batch, calls[:] = list(calls), []
+
+    spool = LineSpool(tmp_path / "lines.jsonl")
+    ScriptLineParser(spool).feed(json.dumps(SCRIPT))
+    spool.close()
+    run_xtts_batch.run_xtts_streaming(tmp_path / "lines.jsonl")
+
+    assert batch == calls == [(1, "Peter", "First."), (2, "Peter", "Second."), (3, "Peter", "Third.")]
@@ -0,0 +1,71 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+from torch import nn
+
+from pipeline_modules import quantize, rvc_export
+
+
+class ToySynth(nn.Module):
+    """Stand-in for an RVC f0 synthesiser: length-dependent upsampling plus seeded noise, like net_g.infer."""
+
+    def __init__(self):
+        super().__init__()
+        self.proj = nn.Linear(768, 16)
+        self.emb = nn.Embedding(4, 16)
+        self.pitch = nn.Embedding(256, 16)
+        self.out = nn.Conv1d(16, 1, 3, padding=1)
+
+    def infer(self, phone, phone_lengths, pitch, nsff0, sid):
+        h = self.proj(phone) + self.pitch(pitch) + self.emb(sid).unsqueeze(1)
+        h = h * (nsff0.unsqueeze(-1) / 300) + 0.1 * torch.randn_like(h)
+        h = nn.functional.interpolate(h.transpose(1, 2), scale_factor=4.0)
+        return torch.tanh(self.out(h)), None
+
+
+class FakeVC:
+    version, if_f0, tgt_sr, n_spk = "v2", 1, 40000, 1
+
+    def __init__(self):
+        torch.manual_seed(0)
+        self.net_g = ToySynth()
+
+
+def test_traced_matches_eager_on_fixed_input():
+    vc = FakeVC()
+    traced, eager = rvc_export.trace_synthesizer(vc.net_g, vc.version, True)
+    torch.manual_seed(7)
+    inputs = rvc_export.example_inputs(vc.version, True, 250)
+    a, b = rvc_export._run(traced, inputs), rvc_export._run(eager, inputs)
+    assert a.shape == b.shape == (1, 1, 1000)
+    assert (a - b).abs().max().item() <= rvc_export.PARITY_ATOL
+
+
+@pytest.fixture(autouse=True)
+def hash_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantize, "QUANT_CACHE_DIR", tmp_path / "quantized")
+
+
+def test_export_round_trip_and_stale_key(tmp_path):
+    vc = FakeVC()
+    pth = tmp_path / "Peter.pth"
+    pth.write_bytes(b"weights")
+    out = rvc_export.export(vc, pth, "fp32")
+    assert out == tmp_path / "Peter.fp32.ts.pt"
+
+    exported = rvc_export.load_exported(pth, "fp32")
+    assert exported.meta["tgt_sr"] == 40000 and exported.meta["if_f0"] == 1
+    diff = rvc_export.parity(exported.module, rvc_export._Infer(vc.net_g).eval(), vc.version, True)
+    assert diff <= rvc_export.PARITY_ATOL
+
+    pth.write_bytes(b"retrained weights")
+    assert rvc_export.load_exported(pth, "fp32") is None
+
+
+def test_warm_start_does_not_rehash_unchanged_weights(tmp_path, monkeypatch):
+    vc = FakeVC()
+    pth = tmp_path / "Peter.pth"
+    pth.write_bytes(b"weights")
+    rvc_export.export(vc, pth, "fp32")
+    monkeypatch.setattr(quantize, "_file_hash", lambda path: pytest.fail("re-read unchanged weights"))
+    assert rvc_export.load_exported(pth, "fp32") is not None
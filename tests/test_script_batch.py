@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from openai_stub_server import serve
+from pipeline_modules import db_logger, job_queue, script_batch, script_generator
+
+SCRIPT = {
+    "topic": "stub", "tone": "dry",
+    "characters": [{"name": "Peter", "lines": ["Hey Stewie."]}, {"name": "Stewie", "lines": ["Go away."]}],
+}
+
+
+@pytest.fixture
+def batch_env(monkeypatch, tmp_path):
+    server, stats = serve(port=0, latency=0.0, reply=lambda body: json.dumps(SCRIPT))
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    monkeypatch.setattr(script_batch, "BATCH_DIR", tmp_path / "batches")
+    monkeypatch.setattr(script_batch, "READY_DIR", tmp_path / "batches" / "scripts")
+    monkeypatch.setattr(script_batch, "SCRIPTS_DIR", tmp_path / "scripts")
+    monkeypatch.setattr(job_queue, "QUEUE_DIR", tmp_path / "queues")
+    monkeypatch.setattr(script_generator, "_fetch_usd_aud", lambda: 1.6)
+    monkeypatch.setattr(script_generator, "FX_CACHE_PATH", tmp_path / "fx.json")
+    script_generator._fx_memo.clear()
+    (tmp_path / "queues").mkdir()
+    jobs = [{"topic": f"Topic {i}", "tone": "dry", "account": "Tech"} for i in range(4)]
+    (tmp_path / "queues" / "queue_tech.json").write_text(json.dumps(jobs))
+    gen = script_generator.ScriptGenerator("stub", "data/prompts/prompt_template.txt", tmp_path / "log.jsonl")
+    yield gen, tmp_path
+    server.shutdown()
+    script_generator._fx_memo.clear()
+
+
+def run_batch(gen, limit):
+    client = script_batch.LocalBatchClient(workers=2)
+    jobs = script_batch.queued_jobs("queue_tech", limit)
+    batch_dir = script_batch.submit(jobs, client, gen, queue="queue_tech")
+    script_batch.poll(client, batch_dir, interval=0.05)
+    return client, batch_dir
+
+
+def test_ingest_moves_jobs_to_ready_queue_once(batch_env):
+    gen, tmp_path = batch_env
+    client, batch_dir = run_batch(gen, limit=3)
+    summary = script_batch.ingest(client, batch_dir, gen)
+
+    assert summary["scripts"] == 3 and summary["dequeued"] == 3
+    assert sorted(p.name for p in (tmp_path / "batches" / "scripts").glob("*.json")) == [
+        "topic_0.json", "topic_1.json", "topic_2.json"]
+    queue = json.loads((tmp_path / "queues" / "queue_tech.json").read_text())
+    ready = json.loads((tmp_path / "queues" / "queue_tech_ready.json").read_text())
+    assert [j["topic"] for j in queue] == ["Topic 3"]
+    assert [j["topic"] for j in ready] == ["Topic 0", "Topic 1", "Topic 2"]
+
+    # A second ingest of the same batch changes nothing
+    assert script_batch.ingest(client, batch_dir, gen) == summary
+    assert len(list(db_logger.read_events(tmp_path / "log.jsonl"))) == 3
+    assert json.loads((tmp_path / "queues" / "queue_tech_ready.json").read_text()) == ready
+    assert (batch_dir / script_batch.INGESTED_MARKER).exists()
+
+
+def test_scripted_topics_are_not_batched_again_and_get_picked_up(batch_env):
+    gen, tmp_path = batch_env
+    client, batch_dir = run_batch(gen, limit=2)
+    script_batch.ingest(client, batch_dir, gen)
+    # Put a scripted job back on the queue: it already has a script, so it is skipped
+    (tmp_path / "queues" / "queue_tech.json").write_text(json.dumps([{"topic": "Topic 0"}, {"topic": "Topic 2"}]))
+    assert [j["topic"] for j in script_batch.queued_jobs("queue_tech")] == ["Topic 2"]
+
+    path = script_batch.take_ready_script("Topic 0", tmp_path / "scripts")
+    assert path == tmp_path / "scripts" / "topic_0.json"
+    assert json.loads(path.read_text())["characters"][0]["name"] == "Peter"
+    assert script_batch.take_ready_script("Topic 0", tmp_path / "scripts") is None
@@ -0,0 +1,62 @@
+import json
+import sys
+import time
+import types
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from openai_stub_server import serve
+from pipeline_modules import db_logger, script_generator
+
+SCRIPT = {
+    "topic": "stub", "tone": "dry",
+    "characters": [{"name": "Peter", "lines": ["Hey Stewie."]}, {"name": "Stewie", "lines": ["Go away."]}],
+}
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server, stats = serve(port=0, latency=0.2, reply=lambda body: json.dumps(SCRIPT))
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    fetches = []
+    monkeypatch.setattr(script_generator, "_fetch_usd_aud", lambda: fetches.append(1) or 1.6)
+    monkeypatch.setattr(script_generator, "FX_CACHE_PATH", tmp_path / "fx.json")
+    script_generator._fx_memo.clear()
+    yield stats, fetches
+    server.shutdown()
+    script_generator._fx_memo.clear()
+
+
+def test_batch_runs_concurrently_and_fetches_rate_once(stub, tmp_path):
+    stats, fetches = stub
+    gen = script_generator.ScriptGenerator("stub", "data/prompts/prompt_template.txt", tmp_path / "log.jsonl")
+    jobs = [{"topic": f"Topic {i}", "tone": "dry", "account": "Tech"} for i in range(6)]
+    results = gen.generate_scripts(jobs, output_dir=tmp_path / "scripts", concurrency=3, rpm=6000)
+
+    assert [r["topic"] for r in results] == [j["topic"] for j in jobs]
+    assert all(r["path"].exists() for r in results)
+    assert stats["requests"] == 6
+    assert stats["max_in_flight"] == 3
+    assert len(fetches) == 1
+    events = list(db_logger.read_events(tmp_path / "log.jsonl"))
+    assert len(events) == 6
+    assert all(e["estimated_cost_aud"] == pytest.approx(e["estimated_cost_usd"] * 1.6) for e in events)
+
+
+def test_rate_fetch_gives_up_after_timeout(monkeypatch):
+    class SlowRates:
+        def get_rate(self, base, dest):
+            time.sleep(2)
+            return 1.6
+
+    converter = types.ModuleType("forex_python.converter")
+    converter.CurrencyRates = SlowRates
+    monkeypatch.setitem(sys.modules, "forex_python", types.ModuleType("forex_python"))
+    monkeypatch.setitem(sys.modules, "forex_python.converter", converter)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        script_generator._fetch_usd_aud(timeout=0.1)
+    assert time.monotonic() - t0 < 1
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from pipeline_modules.script_schema import MAX_LINE_CHARS, ScriptValidationError, check_script, repair
+
+
+def dialogue(turns):
+    return {"topic": "t", "tone": "dry",
+            "characters": [{"name": "Peter" if i % 2 == 0 else "Stewie", "lines": [f"Turn {i + 1}."]}
+                           for i in range(turns)]}
+
+
+def test_alternating_dialogue_comes_through_unchanged():
+    script = dialogue(8)
+    fixed, fixes = check_script(json.dumps(script))
+    assert fixed == script
+    assert fixes == []
+
+
+def test_repair_keeps_order_and_only_merges_back_to_back_entries():
+    script = dialogue(4)
+    script["characters"].insert(1, {"name": "peter", "lines": ["  Also me.  "]})
+    script["characters"].insert(3, {"name": "Stewie", "lines": ["   "]})
+    script["characters"].append({"name": "Brian", "lines": ["Woof."]})
+    fixed, fixes = repair(script)
+    assert fixed["characters"] == [
+        {"name": "Peter", "lines": ["Turn 1.", "Also me."]},
+        {"name": "Stewie", "lines": ["Turn 2."]},
+        {"name": "Peter", "lines": ["Turn 3."]},
+        {"name": "Stewie", "lines": ["Turn 4."]},
+    ]
+    assert "merged consecutive Peter entries" in fixes
+    assert "dropped an empty Stewie entry" in fixes
+    assert "dropped an entry for unknown speaker 'Brian'" in fixes
+
+
+def test_long_lines_are_split_in_place():
+    long_line = " ".join(["This sentence keeps going well past what XTTS can say in one breath."] * 8)
+    script = dialogue(3)
+    script["characters"][1]["lines"] = [long_line]
+    fixed, _ = check_script(script)
+    assert [c["name"] for c in fixed["characters"]] == ["Peter", "Stewie", "Peter"]
+    assert all(len(line) <= MAX_LINE_CHARS for line in fixed["characters"][1]["lines"])
+    assert " ".join(fixed["characters"][1]["lines"]) == long_line
+
+
+def test_unrepairable_script_is_rejected():
+    with pytest.raises(ScriptValidationError):
+        check_script(json.dumps({"topic": "t", "tone": "dry", "characters": []}))
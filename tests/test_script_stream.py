@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from pipeline_modules.script_schema import MAX_LINE_CHARS, check_script
+from pipeline_modules.script_stream import ScriptLineParser
+
+
+def streamed(text, chunk=7):
+    lines = []
+    parser = ScriptLineParser(lines.append)
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i:i + chunk])
+    return [(line.index, line.character, line.text) for line in lines]
+
+
+def checked(text):
+    script, _ = check_script(text)
+    flat = [(c["name"], line) for c in script["characters"] for line in c["lines"]]
+    return [(i, name, line) for i, (name, line) in enumerate(flat, 1)]
+
+
+@pytest.mark.parametrize("characters", [
+    [{"name": "peter", "lines": ["Hey Lois!", "  "]},
+     {"name": "Lois", "lines": ["Peter, no."]},
+     {"name": "Stewie", "lines": ["Blast  you,\\n vile woman."]}],
+    # Lines before their name, an empty entry, a nameless entry and an over-long line
+    [{"lines": ["Who said that?"], "name": " STEWIE "},
+     {"name": "Peter", "lines": []},
+     {"lines": ["Nobody knows me."]},
+     {"name": "Peter", "lines": ["Roadhouse. " * (MAX_LINE_CHARS // 10)]}],
+])
+def test_streamed_lines_match_the_checked_script(characters):
+    text = "```json\n" + json.dumps({"topic": "t", "tone": "dry", "characters": characters}) + "\n```"
+    assert streamed(text) == checked(text)
+    assert {name for _, name, _ in streamed(text)} <= {"Peter", "Stewie"}
@@ -0,0 +1,70 @@
+import json
+
+import topic_index
+from topic_index import TopicIndex, jaccard, shingles
+
+
+def test_shared_prefix_with_different_endings_is_not_a_duplicate(tmp_path):
+    index = TopicIndex(tmp_path)
+    base = "personal finance tips & business concepts"
+    index.add(f"{base}: the simple version")
+    topic = f"{base}: tiny changes with big results"
+    assert jaccard(shingles(topic), shingles(f"{base}: the simple version")) < topic_index.THRESHOLD
+    assert index.lookup(topic) is None
+    endings = ["what most people miss", "step by step for beginners", "avoid these common mistakes",
+               "myth versus reality", "quick wins that actually work", "from confused to confident"]
+    accepted, rejected = index.filter_new([{"topic": f"{base}: {e}"} for e in endings], source="test")
+    assert rejected == [] and len(accepted) == len(endings)
+
+
+def test_near_duplicates_are_rejected_with_exact_similarity(tmp_path):
+    index = TopicIndex(tmp_path)
+    index.add("Why the sky is blue during the day")
+    topic, sim = index.lookup("why the sky is blue during the day?!")
+    assert topic == "Why the sky is blue during the day" and sim == 1.0
+    match = index.lookup("Why the sky is really blue during the day")
+    assert match is not None and match[1] == jaccard(shingles("Why the sky is really blue during the day"),
+                                                     shingles("Why the sky is blue during the day"))
+
+
+def test_duplicates_within_one_batch(tmp_path):
+    index = TopicIndex(tmp_path)
+    items = [{"topic": "How black holes evaporate slowly"}, {"topic": "The history of the printing press"},
+             {"topic": "how black holes evaporate, slowly!"}]
+    accepted, rejected = index.filter_new(items, source="test")
+    assert [i["topic"] for i in accepted] == [items[0]["topic"], items[1]["topic"]]
+    assert rejected[0]["matched"] == items[0]["topic"]
+    log = [json.loads(line) for line in (tmp_path / "rejected.jsonl").read_text().splitlines()]
+    assert [r["topic"] for r in log] == [items[2]["topic"]]
+    assert len(TopicIndex(tmp_path)) == 2
+
+
+def test_reload_after_partial_append(tmp_path):
+    index = TopicIndex(tmp_path)
+    index.filter_new([{"topic": "How volcanoes form islands"}, {"topic": "Why cats purr at night"}], source="t")
+    # A crash mid-append: half a signature row and a torn topic record
+    with open(index.sig_path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    with open(index.meta_path, "a", encoding="utf-8") as f:
+        f.write('{"topic": "The rise and fa')
+
+    reloaded = TopicIndex(tmp_path)
+    assert reloaded.topics == ["How volcanoes form islands", "Why cats purr at night"]
+    assert reloaded.lookup("why cats purr at night") is not None
+    reloaded.add("The rise and fall of the Roman empire")
+
+    again = TopicIndex(tmp_path)
+    assert len(again) == 3
+    assert again.lookup("the rise and fall of the roman empire")[0] == "The rise and fall of the Roman empire"
+    assert again.sigs == reloaded.sigs
+
+
+def test_signature_file_a_record_ahead(tmp_path):
+    index = TopicIndex(tmp_path)
+    index.add("How volcanoes form islands")
+    with open(index.sig_path, "ab") as f:
+        f.write(topic_index._ROW.pack(*topic_index.signature("Orphaned topic without a record")))
+    reloaded = TopicIndex(tmp_path)
+    assert len(reloaded) == 1
+    reloaded.add("Why cats purr at night")
+    assert TopicIndex(tmp_path).topics == ["How volcanoes form islands", "Why cats purr at night"]